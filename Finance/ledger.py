@@ -0,0 +1,149 @@
+"""
+Income and expense ledger (the balance sheet) computed by the database.
+
+Incomes (credits) and expenses (debits) of the period are merged with a
+``UNION ALL`` and ordered in SQL. The running balance and the period totals
+come from window functions in the same statement, so a page of the sheet
+costs one query however long the period is. The balance brought forward
+from before the period is the opening balance row; it is read from the stored
+totals of closed periods (see ``periods``) plus the rows of open ones.
+"""
+import math
+from dataclasses import dataclass
+
+from django.db import connection
+
+from .models import Expense, Income
+from .periods import balance_before
+
+PAGE_SIZE = 100
+
+BALANCE_SHEET_SQL = """
+WITH entries AS (
+    SELECT 'credit' AS type, id, date, perticulers, amount FROM {income}
+    WHERE date BETWEEN %(start)s AND %(end)s
+    UNION ALL
+    SELECT 'debit' AS type, id, date, perticulers, amount FROM {expense}
+    WHERE date BETWEEN %(start)s AND %(end)s
+),
+opening AS (
+    SELECT %(opening)s AS balance
+),
+ledger AS (
+    SELECT
+        type, id, date, perticulers, amount,
+        ROW_NUMBER() OVER (ORDER BY date, type, id) AS line,
+        SUM(CASE WHEN type = 'credit' THEN amount ELSE -amount END)
+            OVER (ORDER BY date, type, id ROWS UNBOUNDED PRECEDING) AS movement,
+        COUNT(*) OVER () AS total_lines,
+        SUM(CASE WHEN type = 'credit' THEN amount ELSE 0 END) OVER () AS total_income,
+        SUM(CASE WHEN type = 'debit' THEN amount ELSE 0 END) OVER () AS total_expense
+    FROM entries
+),
+page AS (
+    SELECT * FROM ledger ORDER BY line LIMIT %(limit)s OFFSET %(offset)s
+)
+SELECT
+    opening.balance, page.line, page.type, page.date, page.perticulers, page.amount,
+    opening.balance + page.movement, page.total_lines, page.total_income, page.total_expense
+FROM opening LEFT JOIN page ON 1 = 1
+ORDER BY page.line
+"""
+
+
+@dataclass
+class BalanceSheetPage:
+    """One page of the ledger with the totals of the whole period"""
+    lines: list
+    number: int
+    num_pages: int
+    count: int
+    opening_balance: float
+    total_income: float
+    total_expense: float
+
+    @property
+    def closing_balance(self):
+        return self.opening_balance + self.total_income - self.total_expense
+
+    @property
+    def brought_forward(self):
+        """Balance before the first line of this page"""
+        if not self.lines:
+            return self.opening_balance
+        first = self.lines[0]
+        return first['balance'] - (first['amount'] if first['type'] == 'credit' else -first['amount'])
+
+    def has_next(self):
+        return self.number < self.num_pages
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.num_pages > 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+def _page(start_date, end_date, opening, number, page_size):
+    sql = BALANCE_SHEET_SQL.format(
+        income=connection.ops.quote_name(Income._meta.db_table),
+        expense=connection.ops.quote_name(Expense._meta.db_table),
+    )
+    params = {
+        'start': start_date, 'end': end_date, 'opening': opening,
+        'limit': page_size, 'offset': (number - 1) * page_size,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    opening = float(rows[0][0] or 0)
+    lines = [
+        {
+            'line': line, 'type': entry_type, 'date': entry_date, 'perticulers': perticulers,
+            'amount': float(amount), 'balance': float(balance),
+        }
+        for _, line, entry_type, entry_date, perticulers, amount, balance, _, _, _ in rows
+        if line is not None
+    ]
+    if lines:
+        count, total_income, total_expense = rows[0][7], float(rows[0][8]), float(rows[0][9])
+    else:
+        count, total_income, total_expense = None, 0.0, 0.0
+    return lines, opening, count, total_income, total_expense
+
+
+def balance_sheet(start_date, end_date, page=1, page_size=PAGE_SIZE):
+    """
+    Page ``page`` (1-based) of the ledger between two dates, inclusive.
+    A page past the end shows the last page.
+    """
+    number = max(int(page), 1)
+    opening = balance_before(start_date)
+    lines, opening, count, total_income, total_expense = _page(start_date, end_date, opening, number, page_size)
+    if count is None and number > 1:
+        # Past the end: the window totals are only known from a page that has rows
+        lines, opening, count, total_income, total_expense = _page(start_date, end_date, opening, 1, page_size)
+        if count:
+            number = math.ceil(count / page_size)
+            lines, opening, count, total_income, total_expense = _page(
+                start_date, end_date, opening, number, page_size
+            )
+    if count is None:
+        number, count = 1, 0
+
+    return BalanceSheetPage(
+        lines=lines,
+        number=number,
+        num_pages=max(math.ceil(count / page_size), 1),
+        count=count,
+        opening_balance=opening,
+        total_income=total_income,
+        total_expense=total_expense,
+    )
@@ -0,0 +1,55 @@
+# management/commands/reconcile_income_payments.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Finance.models import Income
+from Finance.reconciliation import (
+    book_missing_incomes, drifted, link, payments_without_income, sync_incomes, sync_payments, unlinked,
+)
+
+
+class Command(BaseCommand):
+    help = 'Find Income rows out of step with their fee payments and repair them in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift, do not write')
+        parser.add_argument(
+            '--trust', choices=['income', 'payment'], default='income',
+            help='Which side wins when amounts differ (default: income, as when an income is edited)',
+        )
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Book an income for completed payments that have none',
+        )
+
+    def handle(self, *args, **options):
+        incomes = Income.objects.all()
+
+        unlinked_count = unlinked(incomes).count()
+        drifted_count = drifted(incomes).count()
+        missing_count = payments_without_income().count()
+
+        for income_id, amount, payment_id, net_amount in drifted(incomes).values_list(
+            'pk', 'amount', 'payment__payment_id', 'payment__net_amount'
+        ).order_by('pk')[:50]:
+            self.stdout.write(f'  Drift: income {income_id} = {amount:.2f}, payment {payment_id} = {net_amount}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Found {unlinked_count} unlinked income(s), {drifted_count} amount mismatch(es) '
+                f'and {missing_count} completed payment(s) without income.'
+            ))
+            return
+
+        with transaction.atomic():
+            linked = link(incomes)
+            if options['trust'] == 'income':
+                repaired = sync_payments(incomes)
+            else:
+                repaired = sync_incomes(incomes)
+            created = book_missing_incomes() if options['create_missing'] else 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Linked {linked} income(s), repaired {repaired} amount mismatch(es), booked {created} missing income(s).'
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_incomes(apps, schema_editor):
+    """Point every income at the payment whose ID it carries as bill number, in one UPDATE"""
+    Income = apps.get_model('Finance', 'Income')
+    Payment = apps.get_model('payments', 'Payment')
+    payment = Payment.objects.filter(payment_id=models.OuterRef('bill_number')).values('pk')[:1]
+    Income.objects.filter(models.Exists(payment)).update(payment=models.Subquery(payment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0006_alter_income_date'),
+        ('payments', '0008_studentaccountsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='income',
+            name='payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incomes', to='payments.payment'),
+        ),
+        migrations.RunPython(link_incomes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0007_income_payment'),
+        ('payments', '0008_studentaccountsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date'], name='expense_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['date'], name='income_date_idx'),
+        ),
+    ]
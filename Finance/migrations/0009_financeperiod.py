@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0008_income_expense_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancePeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month', unique=True)),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_expense', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('breakdown', models.JSONField(blank=True, default=dict)),
+                ('is_closed', models.BooleanField(default=False)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('reopened_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('reopened_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 class Income(models.Model):
@@ -6,6 +7,15 @@ class Income(models.Model):
     amount = models.FloatField()
     bill_number = models.CharField(max_length=20, default="No Bill")
     other = models.CharField(max_length=255, default=" ", null=True, blank=True)
+    # The fee payment this income was booked for; bill_number keeps the payment ID for display
+    payment = models.ForeignKey(
+        'payments.Payment', on_delete=models.SET_NULL, null=True, blank=True, related_name='incomes'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='income_date_idx'),
+        ]
 
 
 class Expense(models.Model):
@@ -14,3 +24,39 @@ class Expense(models.Model):
     amount = models.FloatField()
     bill_number = models.CharField(max_length=20, default="No Bill")
     other = models.CharField(max_length=255, default=" ",null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='expense_date_idx'),
+        ]
+
+
+class FinancePeriod(models.Model):
+    """
+    A calendar month of the books. Closing it stores the month's totals and
+    locks its Income and Expense rows until it is explicitly re-opened.
+    """
+    month = models.DateField(unique=True, help_text="First day of the month")
+    total_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Income by payment method and by fee category at the time of closing
+    breakdown = models.JSONField(default=dict, blank=True)
+    is_closed = models.BooleanField(default=False)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    reopened_at = models.DateTimeField(null=True, blank=True)
+    reopened_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    class Meta:
+        ordering = ['-month']
+
+    @property
+    def net(self):
+        return self.total_income - self.total_expense
+
+    def __str__(self):
+        return f"{self.month:%B %Y} ({'closed' if self.is_closed else 'open'})"
@@ -0,0 +1,167 @@
+"""
+Closed accounting periods.
+
+Closing a month stores its income and expense totals on a ``FinancePeriod``
+row and locks the month's Income and Expense rows. Totals over a date range
+then add up the stored totals of the closed months the range covers and only
+aggregate the rows of the open stretches, so a balance brought forward over
+years of history reads a few dozen stored rows instead of every income and
+expense. Changing a row of a closed month raises ``PeriodClosed`` until the
+month is re-opened.
+"""
+import calendar
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Expense, FinancePeriod, Income
+
+OTHER_INCOME = 'Other income'
+
+
+class PeriodClosed(ValidationError):
+    """The row belongs to a closed month"""
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def is_closed(day):
+    return FinancePeriod.objects.filter(month=month_start(day), is_closed=True).exists()
+
+
+def check_open(*days):
+    """Raise PeriodClosed when any of these dates falls in a closed month"""
+    months = {month_start(day) for day in days if day}
+    if not months:
+        return
+    closed = FinancePeriod.objects.filter(month__in=months, is_closed=True).order_by('month').first()
+    if closed:
+        raise PeriodClosed(
+            f"{closed.month:%B %Y} is closed. Re-open the period before changing its income or expenses."
+        )
+
+
+def closed_months(days):
+    """The first days of the closed months among these dates"""
+    months = {month_start(day) for day in days if day}
+    return set(FinancePeriod.objects.filter(month__in=months, is_closed=True).values_list('month', flat=True))
+
+
+def in_open_periods(queryset, field='date'):
+    """Rows of ``queryset`` whose ``field`` date falls in a month that is not closed"""
+    return queryset.exclude(Exists(
+        FinancePeriod.objects.filter(is_closed=True, month=TruncMonth(OuterRef(field)))
+    ))
+
+
+def _open_segments(start, end, months):
+    """Date ranges of ``start``..``end`` not covered by ``months`` (sorted, inside the range); start may be None"""
+    segments = []
+    cursor = start
+    for month in months:
+        if cursor is None or month > cursor:
+            segments.append((cursor, month - timedelta(days=1)))
+        cursor = month_end(month) + timedelta(days=1)
+    if cursor is None or cursor <= end:
+        segments.append((cursor, end))
+    return segments
+
+
+def _live_total(model, segments):
+    if not segments:
+        return 0.0
+    condition = Q()
+    for segment_start, segment_end in segments:
+        if segment_start is None:
+            condition |= Q(date__lte=segment_end)
+        else:
+            condition |= Q(date__range=(segment_start, segment_end))
+    return model.objects.filter(condition).aggregate(total=Sum('amount'))['total'] or 0.0
+
+
+def range_totals(start, end):
+    """
+    ``(income, expense)`` from ``start`` to ``end`` inclusive; ``start`` None means since the beginning.
+    Closed months fully inside the range come from their stored totals.
+    """
+    periods = FinancePeriod.objects.filter(is_closed=True, month__lte=month_start(end))
+    if end != month_end(end):
+        periods = periods.exclude(month=month_start(end))
+    if start is not None:
+        periods = periods.filter(month__gte=start if start.day == 1 else month_end(start) + timedelta(days=1))
+    stored = list(periods.order_by('month').values_list('month', 'total_income', 'total_expense'))
+
+    segments = _open_segments(start, end, [month for month, _, _ in stored])
+    income = sum(float(total_income) for _, total_income, _ in stored) + _live_total(Income, segments)
+    expense = sum(float(total_expense) for _, _, total_expense in stored) + _live_total(Expense, segments)
+    return income, expense
+
+
+def balance_before(day):
+    """Income minus expense of everything dated before ``day``"""
+    income, expense = range_totals(None, day - timedelta(days=1))
+    return income - expense
+
+
+def _breakdown(start, end):
+    incomes = Income.objects.filter(date__range=(start, end))
+    by_method = {
+        (method or OTHER_INCOME): round(total, 2)
+        for method, total in incomes.values_list('payment__payment_method').annotate(total=Sum('amount'))
+    }
+
+    from payments.models import PaymentItem
+
+    by_category = {
+        name: float(total)
+        for name, total in PaymentItem.objects.filter(payment__incomes__in=incomes)
+        .values_list('fee_category__name').annotate(total=Sum('net_amount'))
+    }
+    other = incomes.filter(payment__isnull=True).aggregate(total=Sum('amount'))['total']
+    if other:
+        by_category[OTHER_INCOME] = round(other, 2)
+    return {'income_by_payment_method': by_method, 'income_by_fee_category': by_category}
+
+
+def close_period(month, user=None):
+    """Store the month's totals and lock it"""
+    start, end = month_start(month), month_end(month)
+    with transaction.atomic():
+        period, _ = FinancePeriod.objects.select_for_update().get_or_create(month=start)
+        period.total_income = round(
+            Income.objects.filter(date__range=(start, end)).aggregate(total=Sum('amount'))['total'] or 0, 2
+        )
+        period.total_expense = round(
+            Expense.objects.filter(date__range=(start, end)).aggregate(total=Sum('amount'))['total'] or 0, 2
+        )
+        period.breakdown = _breakdown(start, end)
+        period.is_closed = True
+        period.closed_at = timezone.now()
+        period.closed_by = user
+        period.save()
+    return period
+
+
+def reopen_period(month, user=None):
+    """
+    Unlock the month; its stored totals are ignored until it is closed again.
+    Returns None when the month is not closed.
+    """
+    period = FinancePeriod.objects.filter(month=month_start(month), is_closed=True).first()
+    if period is None:
+        return None
+    period.is_closed = False
+    period.reopened_at = timezone.now()
+    period.reopened_by = user
+    period.save(update_fields=['is_closed', 'reopened_at', 'reopened_by'])
+    return period
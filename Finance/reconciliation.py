@@ -0,0 +1,132 @@
+"""
+Keeping Income rows and the fee payments they were booked for in step.
+
+Incomes point at their payment through ``Income.payment``. Every function here
+works on a queryset and issues a fixed number of statements, so syncing one
+income from a signal and repairing a whole ledger from
+``reconcile_income_payments`` take the same path.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, Exists, F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast
+
+from payments.models import Payment, PaymentItem
+from payments.services import delete_payments
+from .models import Income
+from .periods import check_open, in_open_periods
+
+# Income.amount is a float; differences below half a cent are rounding, not drift
+TOLERANCE = Decimal('0.005')
+
+
+def _payment_by_bill_number():
+    return Payment.objects.filter(payment_id=OuterRef('bill_number')).values('pk')[:1]
+
+
+def unlinked(incomes):
+    """Incomes without a payment link whose bill number is a payment ID"""
+    return incomes.filter(payment__isnull=True).filter(Exists(_payment_by_bill_number()))
+
+
+def link(incomes):
+    """Link unlinked incomes to the payment named by their bill number, in one UPDATE"""
+    return unlinked(incomes).update(payment=Subquery(_payment_by_bill_number()))
+
+
+def drifted(incomes):
+    """Linked incomes whose amount differs from their payment's net amount"""
+    return incomes.filter(
+        Q(amount__gt=F('payment__net_amount') + TOLERANCE) |
+        Q(amount__lt=F('payment__net_amount') - TOLERANCE)
+    )
+
+
+def sync_payments(incomes):
+    """
+    Make the net amount of each drifted income's payment equal the income amount.
+    The difference goes onto the payment total and its first item, as when an
+    income is edited by hand. Returns the number of payments changed.
+    """
+    changed = list(drifted(incomes).values_list('payment_id', 'payment__student_id', 'payment__payment_date'))
+    if not changed:
+        return 0
+    payment_ids = [payment_id for payment_id, _, _ in changed]
+
+    def income_amount(payment_ref):
+        return Cast(
+            Subquery(Income.objects.filter(payment_id=payment_ref).order_by('id').values('amount')[:1]),
+            DecimalField(max_digits=10, decimal_places=2),
+        )
+
+    # Items first: the difference is taken against the payment's net amount before it changes
+    difference = income_amount(OuterRef('payment_id')) - Subquery(
+        Payment.objects.filter(pk=OuterRef('payment_id')).values('net_amount')[:1]
+    )
+    first_item = PaymentItem.objects.filter(payment_id=OuterRef('payment_id')).order_by('id').values('id')[:1]
+    PaymentItem.objects.filter(payment_id__in=payment_ids, id=Subquery(first_item)).update(
+        amount=F('amount') + difference, net_amount=F('net_amount') + difference,
+    )
+    Payment.objects.filter(pk__in=payment_ids).update(
+        total_amount=F('total_amount') + income_amount(OuterRef('pk')) - F('net_amount'),
+        net_amount=income_amount(OuterRef('pk')),
+    )
+
+    # update() skips the payment signals
+    from payments.signals import invalidate_closed_month_summaries, schedule_summary_refresh
+
+    schedule_summary_refresh(student_id for _, student_id, _ in changed)
+    for payment_date in {payment_date for _, _, payment_date in changed}:
+        invalidate_closed_month_summaries(payment_date)
+    return len(payment_ids)
+
+
+def sync_incomes(incomes):
+    """Set each drifted income's amount to its payment's net amount, in one UPDATE; closed months are left alone"""
+    return Income.objects.filter(pk__in=in_open_periods(drifted(incomes)).values('pk')).update(
+        amount=Cast(
+            Subquery(Payment.objects.filter(pk=OuterRef('payment_id')).values('net_amount')[:1]),
+            FloatField(),
+        )
+    )
+
+
+def payments_without_income():
+    """Completed payments no income was booked for"""
+    return Payment.objects.filter(payment_status='completed').exclude(
+        Exists(Income.objects.filter(payment_id=OuterRef('pk')))
+    )
+
+
+def book_missing_incomes(batch_size=1000):
+    """Create the missing Income rows of completed payments in batched inserts, except in closed months"""
+    payments = in_open_periods(payments_without_income(), 'payment_date').select_related('student').order_by('pk')
+    return len(Income.objects.bulk_create((
+        Income(
+            perticulers=f"Fee payment of  {payment.student.get_full_name()} against {payment.remarks} "
+                        f"by {payment.payment_method}",
+            amount=payment.net_amount,
+            bill_number=payment.payment_id[:20],
+            date=payment.payment_date,
+            payment=payment,
+        )
+        for payment in payments.iterator(chunk_size=batch_size)
+    ), batch_size=batch_size))
+
+
+def delete_incomes(incomes):
+    """
+    Delete incomes together with the payments they were booked for (items,
+    ledger rows and the amounts paid onto installments), in a fixed number of
+    statements and one transaction. Raises ``PeriodClosed`` when any income
+    falls in a closed month. Returns the counts of what was removed.
+    """
+    with transaction.atomic():
+        rows = list(incomes.values_list('pk', 'date', 'payment_id'))
+        check_open(*{income_date for _, income_date, _ in rows})
+        counts = delete_payments({payment_id for _, _, payment_id in rows if payment_id})
+        selected = Income.objects.filter(pk__in=[pk for pk, _, _ in rows])
+        # The pre/post delete receivers were covered above for the whole batch
+        counts['incomes'] = selected._raw_delete(selected.db)
+    return counts
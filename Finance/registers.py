@@ -0,0 +1,133 @@
+"""
+Income and expense registers.
+
+The register pages and their JSON data-table endpoint share one filter: a
+month or a date range, plus a text search over particulars and bill number.
+Only one page of rows is read at a time, and the row count and amount total
+of the whole filtered register come from a single ``aggregate()`` query, so
+the registers stay fast after years of history.
+"""
+from dataclasses import dataclass
+from datetime import date
+from urllib.parse import urlencode
+
+from django.core.paginator import Paginator
+from django.db.models import Count, Q, Sum
+from django.utils.dateparse import parse_date
+
+from .periods import month_end
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Data-table column index -> model field; the checkbox and action columns do not sort
+ORDER_COLUMNS = {1: 'date', 2: 'perticulers', 3: 'bill_number', 4: 'amount'}
+DEFAULT_ORDER = ('-date', '-id')
+
+
+def _parse_month(value):
+    """``YYYY-MM`` (an <input type="month">) to the first day of that month"""
+    try:
+        year, month = (int(part) for part in (value or '').split('-'))
+        return date(year, month, 1)
+    except ValueError:
+        return None
+
+
+@dataclass
+class RegisterFilter:
+    month: date = None
+    start: date = None
+    end: date = None
+    search: str = ''
+
+    @classmethod
+    def from_params(cls, params):
+        # ``search[value]`` is the search box of a server-side data table
+        search = (params.get('q') or params.get('search[value]') or '').strip()
+        month = _parse_month(params.get('month'))
+        if month:
+            return cls(month=month, start=month, end=month_end(month), search=search)
+        return cls(
+            start=parse_date(params.get('sdate') or ''),
+            end=parse_date(params.get('edate') or ''),
+            search=search,
+        )
+
+    def apply(self, queryset):
+        if self.start:
+            queryset = queryset.filter(date__gte=self.start)
+        if self.end:
+            queryset = queryset.filter(date__lte=self.end)
+        if self.search:
+            queryset = queryset.filter(Q(perticulers__icontains=self.search) | Q(bill_number__icontains=self.search))
+        return queryset
+
+    def query_string(self):
+        """The filter as URL parameters, for pagination links"""
+        if self.month:
+            params = {'month': self.month.strftime('%Y-%m')}
+        else:
+            params = {'sdate': self.start or '', 'edate': self.end or ''}
+        params['q'] = self.search
+        return urlencode({key: value for key, value in params.items() if value})
+
+
+def register_totals(queryset):
+    """Row count and amount total of the filtered register, in one query"""
+    totals = queryset.aggregate(count=Count('pk'), amount=Sum('amount'))
+    return totals['count'], round(totals['amount'] or 0, 2)
+
+
+def register_page(model, params, page=1):
+    """One page of the filtered register for the HTML view, with its filter and totals"""
+    register_filter = RegisterFilter.from_params(params)
+    queryset = register_filter.apply(model.objects.all())
+    count, amount = register_totals(queryset)
+
+    paginator = Paginator(queryset.order_by(*DEFAULT_ORDER), PAGE_SIZE)
+    # The aggregate already counted the rows
+    paginator.count = count
+    return {
+        'page_obj': paginator.get_page(page),
+        'filter': register_filter,
+        'filter_query': register_filter.query_string(),
+        'total_count': count,
+        'total_amount': amount,
+    }
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def register_data(model, params, row):
+    """
+    A page of the register in the DataTables server-side format. ``row``
+    turns an instance into the JSON object of one table row.
+    """
+    register_filter = RegisterFilter.from_params(params)
+    queryset = register_filter.apply(model.objects.all())
+    count, amount = register_totals(queryset)
+
+    field = ORDER_COLUMNS.get(_int(params.get('order[0][column]'), None))
+    if field:
+        prefix = '-' if params.get('order[0][dir]') == 'desc' else ''
+        ordering = (prefix + field, prefix + 'id')
+    else:
+        ordering = DEFAULT_ORDER
+
+    start = max(_int(params.get('start'), 0), 0)
+    length = _int(params.get('length'), PAGE_SIZE)
+    length = PAGE_SIZE if length <= 0 else min(length, MAX_PAGE_SIZE)
+
+    return {
+        'draw': _int(params.get('draw'), 0),
+        'recordsTotal': model.objects.count() if register_filter != RegisterFilter() else count,
+        'recordsFiltered': count,
+        'totalAmount': amount,
+        'data': [row(instance) for instance in queryset.order_by(*ordering)[start:start + length]],
+    }
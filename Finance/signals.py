@@ -1,48 +1,60 @@
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Income
-from decimal import Decimal
+from django.utils import timezone
+from .models import Expense, Income
+from .periods import check_open
+
+
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=Expense)
+def reject_save_in_closed_period(sender, instance, **kwargs):
+    """Rows of a closed month cannot be added, changed or moved out of it"""
+    days = [instance.date or timezone.localdate()]
+    if instance.pk:
+        days += sender.objects.filter(pk=instance.pk).values_list('date', flat=True)
+    check_open(*days)
+
+
+@receiver(pre_delete, sender=Income)
+@receiver(pre_delete, sender=Expense)
+def reject_delete_in_closed_period(sender, instance, **kwargs):
+    check_open(instance.date)
+
+
+@receiver(pre_save, sender=Income)
+def link_income_to_payment(sender, instance, **kwargs):
+    """
+    Incomes entered by hand with a payment ID as bill number are linked to that
+    payment once, when saved. Incomes booked by the payment code carry the link already.
+    """
+    from payments.models import Payment
+
+    if instance.payment_id is None and instance.bill_number and instance.bill_number != "No Bill":
+        instance.payment_id = Payment.objects.filter(
+            payment_id=instance.bill_number
+        ).values_list('pk', flat=True).first()
+
 
 @receiver(post_delete, sender=Income)
 def delete_payment_on_income_delete(sender, instance, **kwargs):
     """
-    When an Income item is deleted, delete the corresponding Payment
-    if bill_number matches any payment_id.
+    When an Income item is deleted, delete the Payment it was booked for. Its
+    items go with it, its ledger rows stay as history (``payment`` SET_NULL).
+    Selected incomes deleted together go through ``reconciliation.delete_incomes``.
     """
     from payments.models import Payment
-    
-    if instance.bill_number and instance.bill_number != "No Bill":
-        # Using filter().delete() is safer than get() in case of duplicates or missing
-        Payment.objects.filter(payment_id=instance.bill_number).delete()
+
+    if instance.payment_id:
+        Payment.objects.filter(pk=instance.payment_id).delete()
+
 
 @receiver(post_save, sender=Income)
 def update_payment_on_income_update(sender, instance, **kwargs):
     """
-    When an Income item is updated, update the corresponding Payment's total_amount.
+    When an Income item is updated, update the linked Payment's total_amount
+    so that its net amount (after discounts and late fees) matches the income.
     """
-    from payments.models import Payment
-    
-    if instance.bill_number and instance.bill_number != "No Bill":
-        payments = Payment.objects.filter(payment_id=instance.bill_number)
-        for payment in payments:
-            # Convert float to Decimal for currency
-            try:
-                # Use string conversion to avoid float precision issues
-                new_amount = Decimal(str(instance.amount))
-                
-                # Update if different (comparing Decimal vs Decimal)
-                if payment.total_amount != new_amount:
-                    payment.total_amount = new_amount
-                    payment.save()
-                    
-                    # Update first payment item to reflect the change
-                    first_item = payment.payment_items.first()
-                    if first_item:
-                        # Calculate sum of other items
-                        other_items_total = sum(item.amount for item in payment.payment_items.all() if item.id != first_item.id)
-                        # New amount for first item = New Total - Other Items
-                        first_item.amount = new_amount - other_items_total
-                        first_item.save()
-
-            except (ValueError, TypeError):
-                pass
+    from .reconciliation import sync_payments
+
+    if instance.payment_id:
+        sync_payments(Income.objects.filter(pk=instance.pk))
@@ -4,6 +4,8 @@ from .import views
 urlpatterns = [
     path("income",views.income, name= "income"),
     path("expense",views.expense, name= "expense"),
+    path("income/data", views.income_data, name="income_data"),
+    path("expense/data", views.expense_data, name="expense_data"),
     path("balance_sheet",views.balance_sheet, name= "balance_sheet"),
     path("balance_sheet_selected",views.balance_sheet_selected, name= "balance_sheet_selected"),
     path('add_income/', views.add_income, name='add_income'),
@@ -15,6 +17,7 @@ urlpatterns = [
 
     path("delete_bulk_income",views.delete_bulk_income,name="delete_bulk_income"),
     path("delete_bulk_expense",views.delete_bulk_expense,name="delete_bulk_expense"),
+    path("periods/", views.finance_periods, name="finance_periods"),
 
 
     
@@ -1,4 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404, HttpResponse
+from django.http import JsonResponse
+from django.urls import reverse
 from django.contrib import messages
 from .models import *
 
@@ -6,20 +8,53 @@ from .forms import *
 from django.shortcuts import render
 from django.utils.timezone import now
 from .models import Income, Expense
-from itertools import chain
 from operator import attrgetter
 from django.template.loader import get_template
 from django.contrib.auth.decorators import login_required 
+from django.utils.dateparse import parse_date
+import calendar
+from datetime import timedelta
+from .ledger import balance_sheet as ledger_balance_sheet
+from .periods import PeriodClosed, close_period, month_start, reopen_period
+from .reconciliation import delete_incomes
+from .registers import register_data, register_page
 
 
 @login_required(login_url="SignIn")
 def income(request):
-    income = Income.objects.all().order_by("-id")
+    context = register_page(Income, request.GET, request.GET.get('page'))
+    context["income"] = context['page_obj']
+    return render(request,"finance/income.html",context)
+
 
-    context = {
-        "income":income
+def _register_row(instance, update_url, delete_url):
+    return {
+        'id': instance.id,
+        'date': instance.date.isoformat(),
+        'perticulers': instance.perticulers,
+        'bill_number': instance.bill_number,
+        'amount': instance.amount,
+        'update_url': reverse(update_url, args=[instance.id]),
+        'delete_url': reverse(delete_url, args=[instance.id]),
     }
-    return render(request,"finance/income.html",context)
+
+
+@login_required(login_url="SignIn")
+def income_data(request):
+    """Server-side data-table endpoint of the income register"""
+    return JsonResponse(register_data(
+        Income, request.GET, lambda row: _register_row(row, 'update_income', 'delete_income')
+    ))
+
+
+def _save_unless_closed(form):
+    """Save the form, turning a closed period into a form error"""
+    try:
+        form.save()
+    except PeriodClosed as e:
+        form.add_error(None, e)
+        return False
+    return True
 
 
 @login_required(login_url="SignIn")
@@ -28,8 +63,7 @@ def add_income(request):
 
     if request.method == 'POST':
         form = IncomeForm(request.POST)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _save_unless_closed(form):
             messages.success(request, "Income record added successfully.")
             return redirect('income')  # Redirect to the same page or another view
  
@@ -42,8 +76,7 @@ def update_income(request,pk):
 
     if request.method == 'POST':
         form = IncomeForm(request.POST,instance=income)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _save_unless_closed(form):
             messages.success(request, "Income Update successfully.")
             return redirect('income')  # Redirect to the same page or another view
  
@@ -53,7 +86,11 @@ def update_income(request,pk):
 @login_required(login_url="SignIn")
 def delete_income(request,pk):
     income = get_object_or_404(Income,id = pk)
-    income.delete()
+    try:
+        income.delete()
+    except PeriodClosed as e:
+        messages.error(request, e.message)
+        return redirect("income")
     messages.success(request,"Income deleted success.....")
     return redirect("income")
 
@@ -61,17 +98,27 @@ def delete_income(request,pk):
 
 @login_required(login_url="SignIn")
 def expense(request):
-    ex = Expense.objects.all().order_by("-id")
-    context = {
-        "expense":ex
-    }
+    context = register_page(Expense, request.GET, request.GET.get('page'))
+    context["expense"] = context['page_obj']
     return render(request,"finance/Expense.html",context)
 
 
+@login_required(login_url="SignIn")
+def expense_data(request):
+    """Server-side data-table endpoint of the expense register"""
+    return JsonResponse(register_data(
+        Expense, request.GET, lambda row: _register_row(row, 'update_expense', 'delete_expense')
+    ))
+
+
 @login_required(login_url="SignIn")
 def delete_expense(request,pk):
     expense = get_object_or_404(Expense,id = pk)
-    expense.delete()
+    try:
+        expense.delete()
+    except PeriodClosed as e:
+        messages.error(request, e.message)
+        return redirect("expense")
     messages.success(request,"Expense deleted success.....")
     return redirect("expense")
 
@@ -80,8 +127,7 @@ def delete_expense(request,pk):
 def add_expense(request):
     if request.method == 'POST':
         form = ExpenseForm(request.POST)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _save_unless_closed(form):
             messages.success(request, "Expense record added successfully.")
             return redirect('Expense')  # Redirect to the same page or another view
     else:
@@ -92,8 +138,7 @@ def update_expense(request,pk):
     expense = get_object_or_404(Expense, id = pk)
     if request.method == 'POST':
         form = ExpenseForm(request.POST,instance=expense)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _save_unless_closed(form):
             messages.success(request, "Expense record added successfully.")
             return redirect('Expense')  # Redirect to the same page or another view
     else:
@@ -104,78 +149,49 @@ def update_expense(request,pk):
 
 
 def balance_sheet(request):
-    # Get the current date
-    current_date = now()
+    # Current month, computed and paged by the database
+    current_date = now().date()
     month = current_date.strftime("%B")
+    start_date = current_date.replace(day=1)
+    end_date = current_date.replace(day=calendar.monthrange(current_date.year, current_date.month)[1])
 
-    # Filter income and expenses for the current month
-    income_list = Income.objects.filter(date__year=current_date.year, date__month=current_date.month)
-    expense_list = Expense.objects.filter(date__year=current_date.year, date__month=current_date.month)
+    sheet = ledger_balance_sheet(start_date, end_date, page=_page_number(request))
 
-    # Convert to lists with 'type' field indicating credit (income) or debit (expense)
-    income_data = [{'type': 'credit', 'date': income.date, 'perticulers': income.perticulers, 'amount': income.amount} for income in income_list]
-    expense_data = [{'type': 'debit', 'date': expense.date, 'perticulers': expense.perticulers, 'amount': expense.amount} for expense in expense_list]
-
-    # Combine both lists and order by date
-    combined_list = sorted(
-        chain(income_data, expense_data),
-        key=lambda x: x['date']
-    )
-
-    # Calculate totals
-    total_income = sum(income['amount'] for income in income_data)
-    total_expense = sum(expense['amount'] for expense in expense_data)
-
-    # Pass data to the template
     return render(request, "finance/balancesheet.html", {
-        'combined_list': combined_list,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        "month":month
+        'sheet': sheet,
+        'period_start': start_date,
+        'combined_list': sheet.lines,
+        'total_income': sheet.total_income,
+        'total_expense': sheet.total_expense,
+        "month": month
     })
 
 
-from django.shortcuts import render
-from django.utils.timezone import now
-from .models import Income, Expense
-from itertools import chain
-from operator import attrgetter
+def _page_number(request):
+    try:
+        return int(request.GET.get('page', 1))
+    except ValueError:
+        return 1
 
-def balance_sheet_selected(request):
-    if request.method == "POST":
-    # Get start and end dates from form submission (default to current month if not provided)
-        start_date = request.POST.get('sdate')
-        end_date = request.POST.get('edate')
-
-    if start_date and end_date:
-        # Filter by selected date range
-        income_list = Income.objects.filter(date__range=[start_date, end_date])
-        expense_list = Expense.objects.filter(date__range=[start_date, end_date])
-    else:
-        # Default to current month if no dates are provided
-        current_date = now()
-        income_list = Income.objects.filter(date__year=current_date.year, date__month=current_date.month)
-        expense_list = Expense.objects.filter(date__year=current_date.year, date__month=current_date.month)
 
-    # Convert to lists with 'type' field indicating credit (income) or debit (expense)
-    income_data = [{'type': 'credit', 'date': income.date, 'perticulers': income.perticulers, 'amount': income.amount} for income in income_list]
-    expense_data = [{'type': 'debit', 'date': expense.date, 'perticulers': expense.perticulers, 'amount': expense.amount} for expense in expense_list]
+def balance_sheet_selected(request):
+    # Date range from the search form (POST) or from the page links (GET)
+    data = request.POST if request.method == "POST" else request.GET
+    start_date = parse_date(data.get('sdate') or '')
+    end_date = parse_date(data.get('edate') or '')
 
-    # Combine both lists and order by date
-    combined_list = sorted(
-        chain(income_data, expense_data),
-        key=lambda x: x['date']
-    )
+    if not (start_date and end_date):
+        # Default to current month if no dates are provided
+        return redirect('balance_sheet')
 
-    # Calculate totals
-    total_income = sum(income['amount'] for income in income_data)
-    total_expense = sum(expense['amount'] for expense in expense_data)
+    sheet = ledger_balance_sheet(start_date, end_date, page=_page_number(request))
 
-    # Pass data to the template
     return render(request, "finance/balancesheet.html", {
-        'combined_list': combined_list,
-        'total_income': total_income,
-        'total_expense': total_expense,
+        'sheet': sheet,
+        'period_start': start_date,
+        'combined_list': sheet.lines,
+        'total_income': sheet.total_income,
+        'total_expense': sheet.total_expense,
         'start_date': start_date,
         'end_date': end_date,
         "month": f"{start_date} to {end_date}"
@@ -192,8 +208,17 @@ def delete_bulk_income(request):
         selected_ids = request.POST.getlist('contact_id[]')  # Get the selected IDs from the form
         print(selected_ids,"----------------------------------")
         if selected_ids:
-            Income.objects.filter(id__in=selected_ids).delete()
-            messages.success(request, 'Selected items have been deleted.')
+            try:
+                removed = delete_incomes(Income.objects.filter(id__in=selected_ids))
+            except PeriodClosed as e:
+                messages.error(request, e.message)
+            else:
+                messages.success(
+                    request,
+                    f"Deleted {removed['incomes']} income(s), {removed['payments']} payment(s) with "
+                    f"{removed['items']} item(s) and {removed['ledger_entries']} ledger entr(ies); "
+                    f"{removed['installments']} installment(s) updated."
+                )
         else:
             messages.warning(request, 'No items were selected for deletion.')
     return redirect("income")
@@ -203,8 +228,46 @@ def delete_bulk_expense(request):
         selected_ids = request.POST.getlist('contact_id[]')  # Get the selected IDs from the form
         print(selected_ids,"----------------------------------")
         if selected_ids:
-            Expense.objects.filter(id__in=selected_ids).delete()
-            messages.success(request, 'Selected items have been deleted.')
+            try:
+                Expense.objects.filter(id__in=selected_ids).delete()
+            except PeriodClosed as e:
+                messages.error(request, e.message)
+            else:
+                messages.success(request, 'Selected items have been deleted.')
         else:
             messages.warning(request, 'No items were selected for deletion.')
-    return redirect("expense")
\ No newline at end of file
+    return redirect("expense")
+
+
+@login_required(login_url="SignIn")
+def finance_periods(request):
+    """Close a month (store its totals and lock its rows) or re-open it"""
+    if request.method == 'POST':
+        month = parse_date(request.POST.get('month') or '')
+        if month is None:
+            messages.error(request, 'Select a month.')
+        elif request.POST.get('action') == 'reopen':
+            if reopen_period(month, request.user) is None:
+                messages.warning(request, f"{month:%B %Y} is not closed.")
+            else:
+                messages.success(request, f"{month:%B %Y} re-opened. Close it again once the corrections are done.")
+        else:
+            period = close_period(month, request.user)
+            messages.success(
+                request,
+                f"{period.month:%B %Y} closed: income {period.total_income:,.2f}, "
+                f"expense {period.total_expense:,.2f}, net {period.net:,.2f}."
+            )
+        return redirect('finance_periods')
+
+    current = month_start(now().date())
+    periods = {period.month: period for period in FinancePeriod.objects.all()}
+    months = [current]
+    for _ in range(11):
+        months.append(month_start(months[-1] - timedelta(days=1)))
+    months = sorted(set(months) | set(periods), reverse=True)
+
+    return render(request, 'finance/periods.html', {
+        'rows': [(month, periods.get(month)) for month in months],
+        'current_month': current,
+    })
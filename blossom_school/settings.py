@@ -91,6 +91,16 @@ DATABASES = {
     }
 }
 
+# Cache shared by every worker process through the database, so that an
+# invalidation (student statistics, typeahead index, payment summaries) made
+# in one worker reaches the others. The table is created by a home migration.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
 
 
 # Password validation
@@ -0,0 +1,112 @@
+# management/commands/benchmark_search.py
+
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from home.search import normalize, ranked_search
+from payments.models import Payment
+from students import typeahead
+from students.models import Student
+
+FIRST_NAMES = [
+    'Aisha', 'Omar', 'Fatima', 'Yousef', 'Maryam', 'Khalid', 'Noor', 'Hamdan',
+    'Layla', 'Zayed', 'Sara', 'Rashid', 'Hessa', 'Saeed', 'Amna', 'Majid',
+]
+LAST_NAMES = [
+    'Al Mansoori', 'Al Nuaimi', 'Al Falasi', 'Al Suwaidi', 'Haddad', 'Khoury',
+    'Rahman', 'Siddiqui', 'Fernandes', 'Menon', 'Okafor', 'Novak', 'Müller',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure name and ID search latency over scratch students and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help='Scratch students (default: 10000)')
+        parser.add_argument('--payments', type=int, default=200000, help='Scratch payments (default: 200000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query (default: 20)')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        today = timezone.now().date()
+
+        self.stdout.write(f'Creating {options["students"]} students and {options["payments"]} payments...')
+        students = []
+        for index in range(options['students']):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            student_id = f'BENCHS{index:06d}'
+            students.append(Student(
+                student_id=student_id, search_text=normalize(first_name, last_name, student_id),
+                first_name=first_name, last_name=last_name, nationality='-', gender='M',
+                date_of_birth=today, father_name='-', father_nationality='-',
+                mother_name='-', mother_nationality='-', full_home_address='-',
+                first_contact_person='-', first_contact_relationship='-', first_contact_telephone='-',
+                year_of_admission=today.year, is_active=False,
+            ))
+        Student.objects.bulk_create(students, batch_size=1000)
+        # bulk_create skips the signals that keep the typeahead index current
+        typeahead.invalidate()
+        Payment.objects.bulk_create((
+            Payment(
+                payment_id=f'BENCH-SEARCH-{index:07d}', student=rng.choice(students),
+                total_amount=Decimal('100'), net_amount=Decimal('100'),
+                payment_method='cash', payment_date=today, payment_status='completed',
+            )
+            for index in range(options['payments'])
+        ), batch_size=2000)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE students_student')
+                cursor.execute('ANALYZE payments_payment')
+
+        try:
+            terms = ['fatima', 'al mansoori', 'muller', 'BENCHS004217', 'fatma al']
+            typeahead.lookup('warm up')
+            for term in terms:
+                self.report(f'typeahead "{term}"', options['repeat'], lambda: typeahead.lookup(term))
+                self.report(f'students "{term}"', options['repeat'], lambda: list(
+                    ranked_search(Student.objects.all(), term)[:50]
+                ))
+                self.report('  legacy icontains', options['repeat'], lambda: list(
+                    Student.objects.filter(
+                        Q(first_name__icontains=term) | Q(last_name__icontains=term) |
+                        Q(student_id__icontains=term)
+                    )[:50]
+                ))
+                self.report(f'payments "{term}"', options['repeat'], lambda: list(
+                    ranked_search(
+                        Payment.objects.select_related('student').order_by('-created_at', '-id'),
+                        term, 'student__search_text',
+                    )[:50]
+                ))
+                self.report('  legacy icontains', options['repeat'], lambda: list(
+                    Payment.objects.select_related('student').filter(
+                        Q(student__first_name__icontains=term) | Q(student__last_name__icontains=term)
+                    ).order_by('-created_at')[:50]
+                ))
+        finally:
+            # Clean up benchmark data. Nothing references the scratch payments, so skip
+            # the per-row delete signals and remove them with one statement
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {Payment._meta.db_table} WHERE payment_id LIKE %s', ['BENCH-SEARCH-%']
+                )
+            Student.objects.filter(student_id__startswith='BENCHS').delete()
+            typeahead.invalidate()
+
+    def report(self, label, repeat, query):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f'{label:<32} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms')
@@ -0,0 +1,56 @@
+# management/commands/stress_id_allocator.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from home.models import IdentifierCounter
+from home.sequences import reserve_ids
+
+
+class Command(BaseCommand):
+    help = 'Allocate IDs from parallel writers and verify that no number is handed out twice'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Number of parallel writers (default: 8)')
+        parser.add_argument('--allocations', type=int, default=200, help='Allocations per writer (default: 200)')
+        parser.add_argument('--block-size', type=int, default=1, help='IDs reserved per allocation (default: 1)')
+        parser.add_argument('--prefix', default='STRESS-', help='Scratch prefix, removed afterwards')
+
+    def handle(self, *args, **options):
+        writers = options['writers']
+        allocations = options['allocations']
+        block_size = options['block_size']
+        prefix = options['prefix']
+
+        IdentifierCounter.objects.filter(prefix=prefix).delete()
+
+        def writer(_):
+            numbers = []
+            try:
+                for _ in range(allocations):
+                    numbers.extend(reserve_ids(prefix, block_size))
+            finally:
+                connection.close()
+            return numbers
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            results = list(pool.map(writer, range(writers)))
+        elapsed = time.perf_counter() - started
+
+        issued = [number for numbers in results for number in numbers]
+        expected = writers * allocations * block_size
+        IdentifierCounter.objects.filter(prefix=prefix).delete()
+
+        self.stdout.write(f'Writers: {writers}, allocations per writer: {allocations}, block size: {block_size}')
+        self.stdout.write(f'Issued {len(issued)} IDs in {elapsed:.2f}s ({len(issued) / elapsed:.0f} IDs/s)')
+
+        if len(set(issued)) != len(issued):
+            raise CommandError(f'{len(issued) - len(set(issued))} duplicate IDs were issued')
+        if sorted(issued) != list(range(1, expected + 1)):
+            raise CommandError('Issued IDs are not a contiguous 1..N sequence')
+
+        self.stdout.write(self.style.SUCCESS('No duplicates, sequence is contiguous.'))
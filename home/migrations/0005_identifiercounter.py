@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_feecategory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentifierCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=30, unique=True)),
+                ('last_value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
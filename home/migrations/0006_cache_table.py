@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:20
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    """The table of the database cache backend (settings.CACHES); existing tables are left alone"""
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_identifiercounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
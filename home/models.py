@@ -77,3 +77,13 @@ class FeeCategory(models.Model):
 
     def __str__(self):
         return str(self.name)
+
+
+class IdentifierCounter(models.Model):
+    """Per-prefix counter backing the human readable IDs (PAY..., BS..., TCH-...)"""
+    prefix = models.CharField(max_length=30, unique=True)
+    last_value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.prefix} -> {self.last_value}"
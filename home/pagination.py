@@ -0,0 +1,159 @@
+# pagination.py
+"""
+Keyset (cursor) pagination for the long list views.
+
+A page is fetched with ``WHERE (key) < (last key seen) ORDER BY key LIMIT n``
+instead of ``OFFSET``, so page 200 costs the same as page 1 and no
+``COUNT(*)`` is needed to render it. The total shown next to the list is the
+planner's row estimate on PostgreSQL; an exact count is only run when the
+request asks for it with ``?count=exact``. Requests carrying ``?page=`` keep
+the old offset pagination so existing links and bookmarks still work.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+
+def estimated_count(queryset):
+    """Row estimate from the query planner, or None when the database cannot provide one"""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPage:
+    """The subset of Django's Page interface the list templates use"""
+
+    def __init__(self, object_list, next_cursor, is_first, count=None, count_is_estimate=False):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+        self.count = count
+        self.count_is_estimate = count_is_estimate
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return not self.is_first
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class Keyset:
+    """
+    A cursor over ``ordering``, which must end with a unique field (normally
+    ``id``) so that every row has a distinct key. Ordering fields may be
+    annotations of the queryset. Used by the list views through
+    ``KeysetPaginationMixin`` and directly by JSON list endpoints.
+    """
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+
+    def fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def filter(self, values):
+        """(a, b) after (x, y) in the page order: a beyond x, or a = x and b beyond y"""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.fields(), values):
+            beyond = Q(**{f'{name}__lt' if descending else f'{name}__gt': value}, **equal)
+            condition |= beyond
+            equal[name] = value
+        return condition
+
+    def encode(self, obj):
+        values = []
+        for name, _ in self.fields():
+            try:
+                values.append(obj._meta.get_field(name).value_to_string(obj))
+            except FieldDoesNotExist:
+                # An annotation (which must never be NULL for the cursor to work)
+                values.append(str(getattr(obj, name)))
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode(self, queryset, cursor):
+        """Return the key values of the cursor, or None (first page) when it cannot be read"""
+        annotations = queryset.query.annotations
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            fields = [
+                annotations[name].output_field if name in annotations else queryset.model._meta.get_field(name)
+                for name, _ in self.fields()
+            ]
+            if len(values) != len(fields):
+                return None
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def page(self, queryset, cursor, page_size):
+        """
+        ``(rows, next_cursor, values)``: the page of ``queryset`` after ``cursor``,
+        the cursor of the following page (None on the last one) and the decoded
+        key values (None on the first page).
+        """
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode(queryset, cursor) if cursor else None
+        if values is not None:
+            queryset = queryset.filter(self.filter(values))
+
+        rows = list(queryset[:page_size + 1])
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = self.encode(rows[-1])
+        return rows, next_cursor, values
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin replacing OFFSET pagination with a cursor on ``keyset_ordering``
+    (see ``Keyset``). The cursor travels as ``?after=``. Views whose ordering
+    is not a keyset (e.g. ranked search results) return None from
+    ``get_keyset_ordering`` and are paginated by offset.
+    """
+    keyset_ordering = ('-id',)
+    cursor_param = 'after'
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.request.GET.get(self.page_kwarg) or self.kwargs.get(self.page_kwarg):
+            return self.paginate_by_offset(queryset, page_size)
+        if not self.get_keyset_ordering():
+            return self.paginate_by_offset(queryset, page_size)
+
+        keyset = Keyset(self.get_keyset_ordering())
+        object_list, next_cursor, values = keyset.page(
+            queryset, self.request.GET.get(self.cursor_param), page_size
+        )
+
+        unpaged = queryset.order_by(*keyset.ordering)
+        if self.request.GET.get('count') == 'exact':
+            count, is_estimate = unpaged.count(), False
+        else:
+            count, is_estimate = estimated_count(unpaged), True
+
+        page = KeysetPage(object_list, next_cursor, values is None, count, is_estimate)
+        return None, page, object_list, page.has_other_pages()
+
+    def paginate_by_offset(self, queryset, page_size):
+        """Django's offset pagination, its page carrying the exact count the templates show"""
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        page.count, page.count_is_estimate = paginator.count, False
+        return paginator, page, object_list, is_paginated
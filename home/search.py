@@ -0,0 +1,83 @@
+# search.py
+"""
+Name and ID search shared by the student, payment, installment and teacher lists.
+
+Searchable models keep a ``search_text`` column: the searchable fields joined,
+lowercased and stripped of accents (see ``normalize``). On PostgreSQL that
+column carries a ``pg_trgm`` GIN index, which serves both the substring match
+(``LIKE '%term%'``) and the fuzzy ``%`` operator (a misspelt match needs the
+server's ``pg_trgm.similarity_threshold``, 0.3 by default), and results are
+ranked by trigram similarity. Other databases fall back to substring matching
+on the same normalised column, ranked by prefix match.
+"""
+import unicodedata
+
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+
+def normalize(*values):
+    """Lowercase, strip accents and collapse whitespace of the given values into one string"""
+    text = ' '.join(str(value) for value in values if value)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().replace('_', ' ').split())
+
+
+def search(queryset, term, field='search_text'):
+    """
+    Filter ``queryset`` to rows whose normalised ``field`` matches ``term`` and
+    annotate a ``search_rank`` (higher is better). ``field`` may follow
+    relations, e.g. ``student__search_text``. The caller decides the ordering.
+    """
+    term = normalize(term)
+    if not term:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    every_word = Q()
+    for word in term.split():
+        every_word &= Q(**{f'{field}__contains': word})
+
+    if connections[queryset.db].vendor == 'postgresql':
+        from django.contrib.postgres.lookups import TrigramSimilar
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return queryset.filter(
+            every_word | TrigramSimilar(F(field), term)
+        ).annotate(search_rank=TrigramSimilarity(field, term))
+
+    return queryset.filter(every_word).annotate(search_rank=Case(
+        When(**{f'{field}__startswith': term}, then=Value(1.0)),
+        When(**{f'{field}__contains': f' {term}'}, then=Value(0.75)),
+        default=Value(0.5),
+        output_field=FloatField(),
+    ))
+
+
+def ranked_search(queryset, term, field='search_text'):
+    """``search`` ordered by rank, best match first, then the queryset's own ordering"""
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return search(queryset, term, field).order_by('-search_rank', *ordering)
+
+
+def create_trigram_index(table, column, index_name):
+    """
+    Migration operation creating a pg_trgm GIN index on ``table.column``.
+    A no-op on databases other than PostgreSQL.
+    """
+    from django.db import migrations
+
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+    return migrations.RunPython(forwards, backwards)
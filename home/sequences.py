@@ -0,0 +1,64 @@
+# sequences.py
+"""
+Race-free allocation of the human readable document numbers used across the
+project (payment IDs, student IDs, teacher IDs).
+
+Every prefix (e.g. ``PAY202610``, ``BS2026``, ``TCH-``) owns one
+``IdentifierCounter`` row. Allocation is a single ``UPDATE ... SET last_value =
+last_value + n`` which takes the row lock on Postgres and the write lock on
+SQLite, so two cashiers saving at the same moment can never receive the same
+number. Because the counter is updated inside the caller's transaction, a
+rolled back payment also gives its number back.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import IdentifierCounter
+
+
+def highest_suffix(queryset, field, prefix, width=None):
+    """
+    Return the largest numeric suffix already used for ``prefix`` in ``field``.
+    Only used once per prefix to seed a counter from legacy rows.
+    """
+    values = queryset.filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True)
+    highest = 0
+    for value in values.iterator():
+        suffix = value[len(prefix):]
+        if width:
+            suffix = suffix[-width:]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest
+
+
+def reserve_ids(prefix, count=1, seed=None):
+    """
+    Reserve ``count`` consecutive numbers for ``prefix`` and return them as a range.
+
+    ``seed`` is an optional callable returning the highest number already in use;
+    it is only called the first time a prefix is seen.
+    """
+    if count < 1:
+        raise ValueError('count must be at least 1')
+
+    with transaction.atomic():
+        updated = IdentifierCounter.objects.filter(prefix=prefix).update(
+            last_value=F('last_value') + count
+        )
+        if not updated:
+            start = seed() if seed else 0
+            try:
+                with transaction.atomic():
+                    IdentifierCounter.objects.create(prefix=prefix, last_value=start + count)
+            except IntegrityError:
+                # Another writer created the counter first, take the next block from it
+                IdentifierCounter.objects.filter(prefix=prefix).update(
+                    last_value=F('last_value') + count
+                )
+
+        last_value = IdentifierCounter.objects.filter(prefix=prefix).values_list(
+            'last_value', flat=True
+        ).get()
+
+    return range(last_value - count + 1, last_value + 1)
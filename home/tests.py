@@ -1,3 +1,62 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from .sequences import reserve_ids
+
+
+class ReserveIdsTests(TestCase):
+
+    def test_consecutive_blocks(self):
+        self.assertEqual(list(reserve_ids('TEST-')), [1])
+        self.assertEqual(list(reserve_ids('TEST-', 3)), [2, 3, 4])
+        self.assertEqual(list(reserve_ids('OTHER-')), [1])
+
+    def test_seed_only_read_for_a_new_prefix(self):
+        calls = []
+
+        def seed():
+            calls.append(1)
+            return 41
+
+        self.assertEqual(list(reserve_ids('TEST-', seed=seed)), [42])
+        self.assertEqual(list(reserve_ids('TEST-', seed=seed)), [43])
+        self.assertEqual(len(calls), 1)
+
+    def test_count_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            reserve_ids('TEST-', 0)
+
+
+# SQLite has a single writer, parallel transactions there only fail with "database is locked"
+@skipUnless(connection.vendor == 'postgresql', 'needs a database with concurrent writers')
+class ReserveIdsConcurrencyTests(TransactionTestCase):
+    WRITERS = 8
+    ALLOCATIONS = 50
+
+    def allocate_in_parallel(self, prefix, block_size):
+        def writer(_):
+            numbers = []
+            try:
+                for _ in range(self.ALLOCATIONS):
+                    numbers.extend(reserve_ids(prefix, block_size))
+            finally:
+                connection.close()
+            return numbers
+
+        with ThreadPoolExecutor(max_workers=self.WRITERS) as pool:
+            results = list(pool.map(writer, range(self.WRITERS)))
+        return [number for numbers in results for number in numbers]
+
+    def assert_no_gaps_or_duplicates(self, issued, block_size):
+        self.assertEqual(len(issued), len(set(issued)), 'an ID was issued twice')
+        self.assertEqual(sorted(issued), list(range(1, self.WRITERS * self.ALLOCATIONS * block_size + 1)))
+
+    def test_single_ids(self):
+        # The first allocations also race to create the counter row
+        self.assert_no_gaps_or_duplicates(self.allocate_in_parallel('RACE-', 1), 1)
+
+    def test_blocks(self):
+        self.assert_no_gaps_or_duplicates(self.allocate_in_parallel('RACE-BLOCK-', 5), 5)
@@ -31,6 +31,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 from students.models import Student
+from students.stats import student_stats
 from utils.models import Teacher, Attendance, MonthlySalary
 from payments.models import (
     Payment, PaymentInstallment, StudentFeeAssignment, 
@@ -59,22 +60,8 @@ def dashboard_data_api(request):
     last_month = (first_day_of_month - timedelta(days=1)).month
     last_month_year = (first_day_of_month - timedelta(days=1)).year
     
-    # STUDENT STATISTICS
-    total_students = Student.objects.all().count()
-    students_active = Student.objects.filter(is_active=True).count()
-    students_by_status = Student.objects.values('status').annotate(count=Count('id'))
-    
-    # Students enrolled this month
-    students_this_month = Student.objects.filter(
-        created_at__month=current_month,
-        created_at__year=current_year,
-        is_active=True
-    ).count()
-    
-    # Students by class
-    students_by_class = ClassRooms.objects.annotate(
-        student_count=Count('student')
-    ).values('class_name', 'student_count')
+    # STUDENT STATISTICS (one cached grouped query, shared with the student list)
+    stats = student_stats()
     
     # TEACHER STATISTICS
     total_teachers = Teacher.objects.all().count()
@@ -253,11 +240,12 @@ def dashboard_data_api(request):
     # Compile all data
     dashboard_data = {
         'students': {
-            'total': total_students,
-            'active': students_active,
-            'this_month': students_this_month,
-            'by_status': list(students_by_status),
-            'by_class': list(students_by_class)
+            'total': stats['total'],
+            'active': stats['active'],
+            'this_month': stats['this_month_active'],
+            'by_status': [{'status': row['value'], 'count': row['count']} for row in stats['by_status']],
+            'by_class': [{'class_name': row['label'], 'student_count': row['count']} for row in stats['by_class'] if row['value']],
+            'admissions_by_month': stats['admissions_by_month']
         },
         'teachers': {
             'total': total_teachers,
@@ -305,9 +293,10 @@ def dashboard_data_api(request):
 
 def get_class_distribution(request):
     """Get class-wise student distribution"""
-    classes = ClassRooms.objects.annotate(
-        student_count=Count('student', filter=Q(student__is_active=True))
-    ).values('class_name', 'student_count')
+    classes = [
+        {'class_name': row['label'], 'student_count': row['active']}
+        for row in student_stats()['by_class'] if row['value']
+    ]
     
     class_data = []
     for cls in classes:
@@ -358,7 +347,7 @@ from django.utils import timezone
 @unauthenticated_user
 def index(request):
     today = timezone.now()
-    students_count = Student.objects.filter(status = "enrolled").count()
+    students_count = next((row['count'] for row in student_stats()['by_status'] if row['value'] == 'enrolled'), 0)
     staff_count = Teacher.objects.filter(status = 'active').count()
     total_revenue =  (
         Income.objects
@@ -378,7 +367,7 @@ def index(request):
 @unauthenticated_user
 def index_employee(request):
     today = timezone.now()
-    students_count = Student.objects.filter(status = "enrolled").count()
+    students_count = next((row['count'] for row in student_stats()['by_status'] if row['value'] == 'enrolled'), 0)
     staff_count = Teacher.objects.filter(status = 'active').count()
     total_revenue =  (
         Income.objects
@@ -0,0 +1,158 @@
+"""
+Spreading a lump-sum payment over a student's outstanding installments.
+
+Installments are settled oldest due date first (ties by id) and, within an
+installment, the late fee is settled before the principal. ``paid_amount``
+covers the late fee first, so what is still owed of it is
+``late_fee - paid_amount``. The split is worked out in memory from one ordered
+query; callers write the installments back with a single bulk_update.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from home.models import FeeCategory
+from .models import PaymentInstallment, StudentAccountSummary
+
+# Money left over once every outstanding installment is settled is booked under this category
+ADVANCE_CATEGORY = 'Advance Payment'
+
+
+class Allocation(namedtuple('Allocation', ['installment', 'late_fee', 'principal'])):
+    """The part of a payment applied to one installment"""
+    __slots__ = ()
+
+    @property
+    def amount(self):
+        return self.late_fee + self.principal
+
+
+def outstanding_installments(student_ids, lock=False):
+    """
+    Outstanding installments of these students grouped by student id, in settlement order.
+    With ``lock`` the rows are locked (``select_for_update``) until the transaction ends.
+    """
+    installments = PaymentInstallment.objects.filter(
+        payment_plan__student_id__in=student_ids,
+        status__in=StudentAccountSummary.OUTSTANDING_STATUSES,
+    ).select_related('payment_plan__fee_category').order_by('due_date', 'id')
+    if lock:
+        installments = installments.select_for_update(of=('self',))
+
+    by_student = defaultdict(list)
+    for installment in installments:
+        if installment.get_outstanding_amount() > 0:
+            by_student[installment.payment_plan.student_id].append(installment)
+    return by_student
+
+
+def allocate(installments, amount):
+    """
+    Split ``amount`` over ``installments`` (already in settlement order).
+
+    Returns ``(allocations, unallocated)``: a list of ``Allocation`` and what is
+    left once every installment is settled. The installments are not modified.
+    """
+    remaining = Decimal(amount)
+    allocations = []
+    for installment in installments:
+        if remaining <= 0:
+            break
+        share = min(installment.get_outstanding_amount(), remaining)
+        if share <= 0:
+            continue
+        late_fee = min(max(installment.late_fee - installment.paid_amount, Decimal('0')), share)
+        allocations.append(Allocation(installment, late_fee, share - late_fee))
+        remaining -= share
+    return allocations, remaining
+
+
+def allocate_payment(student, amount, lock=True):
+    """
+    Allocate ``amount`` over the student's outstanding installments.
+    With ``lock`` (the default) this must run inside ``transaction.atomic()``.
+    """
+    installments = outstanding_installments([student.pk], lock=lock).get(student.pk, [])
+    return allocate(installments, amount)
+
+
+def settle(allocations, payment_date):
+    """Add the allocated amounts to the installments in memory and return them"""
+    installments = []
+    for allocation in allocations:
+        installment = allocation.installment
+        installment.paid_amount += allocation.amount
+        installment.paid_date = payment_date
+        installment.update_status()
+        installments.append(installment)
+    return installments
+
+
+def apply_allocations(allocations, payment_date):
+    """Settle the allocations and write every touched installment back in one statement"""
+    installments = settle(allocations, payment_date)
+    PaymentInstallment.objects.bulk_update(installments, ['paid_amount', 'paid_date', 'status', 'is_overdue'])
+    return installments
+
+
+def needs_advance_category(allocations, unallocated):
+    """Whether booking this allocation needs the advance payment fee category"""
+    return unallocated > 0 or any(
+        allocation.installment.payment_plan.fee_category_id is None for allocation in allocations
+    )
+
+
+def advance_category():
+    category, _ = FeeCategory.objects.get_or_create(name=ADVANCE_CATEGORY)
+    return category
+
+
+def allocation_items(allocations, unallocated, advance=None):
+    """
+    Payment item dicts (the format ``services.record_payment`` takes) for an allocation.
+    ``advance`` is the fee category of the unallocated remainder and of plans without one.
+    """
+    items = [
+        {
+            'fee_category': allocation.installment.payment_plan.fee_category or advance,
+            'amount': allocation.principal,
+            'discount': Decimal('0'),
+            'late_fee': allocation.late_fee,
+            'description': f'Installment {allocation.installment.installment_number}',
+            'installment_id': allocation.installment.pk,
+            # ``settle`` adds the late fee and the principal to the installment
+            'applied_amount': allocation.amount,
+        }
+        for allocation in allocations
+    ]
+    if unallocated > 0:
+        items.append({
+            'fee_category': advance,
+            'amount': unallocated,
+            'discount': Decimal('0'),
+            'late_fee': Decimal('0'),
+            'description': ADVANCE_CATEGORY,
+            'installment_id': None,
+        })
+    return items
+
+
+def allocation_as_json(allocations, unallocated):
+    return {
+        'allocations': [
+            {
+                'installment_id': allocation.installment.pk,
+                'installment_number': allocation.installment.installment_number,
+                'due_date': allocation.installment.due_date.isoformat(),
+                'fee_category': (
+                    allocation.installment.payment_plan.fee_category.name
+                    if allocation.installment.payment_plan.fee_category else ADVANCE_CATEGORY
+                ),
+                'outstanding': str(allocation.installment.get_outstanding_amount()),
+                'late_fee': str(allocation.late_fee),
+                'principal': str(allocation.principal),
+                'amount': str(allocation.amount),
+            }
+            for allocation in allocations
+        ],
+        'unallocated': str(unallocated),
+    }
@@ -5,6 +5,7 @@ from .models import (
     Payment, PaymentItem, PaymentPlan, FeeStructure, 
     StudentFeeAssignment, FeeCategory, Student, PaymentInstallment
 )
+from home.models import ClassRooms
 
 
 class PaymentForm(forms.ModelForm):
@@ -162,6 +163,66 @@ class PaymentPlanForm(forms.ModelForm):
         return installments
 
 
+class BulkPaymentPlanForm(forms.Form):
+    """Plan template applied to every active student of a class"""
+    class_room = forms.ModelChoiceField(
+        queryset=ClassRooms.objects.all().order_by('class_name'),
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    academic_year = forms.IntegerField(
+        min_value=2020,
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    fee_category = forms.ModelChoiceField(
+        queryset=FeeCategory.objects.all().order_by('name'),
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    plan_type = forms.ChoiceField(
+        choices=[choice for choice in PaymentPlan.PLAN_TYPE_CHOICES if choice[0] != 'custom'],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    session_type = forms.ChoiceField(
+        choices=PaymentPlan.SESSION_TYPE_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    total_amount = forms.DecimalField(
+        max_digits=10, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'})
+    )
+    number_of_installments = forms.IntegerField(
+        min_value=1, max_value=52, initial=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    installment_frequency = forms.IntegerField(
+        min_value=1, initial=30, required=False,
+        help_text="Days between installments for weekly and day based plans",
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    start_date = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    def clean_total_amount(self):
+        total_amount = self.cleaned_data.get('total_amount')
+        if total_amount is not None and total_amount <= 0:
+            raise forms.ValidationError("Total amount must be greater than zero.")
+        return total_amount
+
+
+class PaymentImportForm(forms.Form):
+    """Bank-transfer or card settlement statement to import"""
+    statement = forms.FileField(
+        help_text="CSV or XLSX with student ID or reference, amount and payment date columns",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+
+    def clean_statement(self):
+        statement = self.cleaned_data['statement']
+        if not statement.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return statement
+
+
 class FeeStructureForm(forms.ModelForm):
     """Form for managing fee structures"""
     class Meta:
@@ -0,0 +1,387 @@
+"""
+Importing bank-transfer and card settlement files.
+
+Statements are read row by row (``csv`` for .csv files, openpyxl in read-only
+mode for .xlsx), so a file with tens of thousands of lines is never held in
+memory at once. Rows are handled in chunks: one query matches a chunk's rows
+to students, one query finds payments that were already recorded and one
+locked query loads the outstanding installments the amounts are spread over.
+Payments, items, ledger entries and Income rows are then inserted with
+bulk_create. Every row ends up in the report, either with what it was (or
+would be, on a dry run) allocated to or with the reason it was rejected.
+"""
+import codecs
+import csv
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from Finance.models import Income
+from Finance.periods import closed_months, month_start
+from students.models import Student
+from .allocation import (
+    advance_category, allocate, allocation_items, needs_advance_category, outstanding_installments, settle,
+)
+from .models import Payment, PaymentInstallment, PaymentItem, StudentLedger
+from .schedules import CENT
+from .signals import invalidate_closed_month_summaries, schedule_summary_refresh
+
+# Accepted spellings of the column headers, normalized to the keys used below
+COLUMN_ALIASES = {
+    'student_id': 'student_id',
+    'student': 'student_id',
+    'transaction_reference': 'transaction_reference',
+    'reference': 'transaction_reference',
+    'amount': 'amount',
+    'payment_date': 'payment_date',
+    'date': 'payment_date',
+    'value_date': 'payment_date',
+    'payment_method': 'payment_method',
+    'method': 'payment_method',
+    'remarks': 'remarks',
+    'description': 'remarks',
+}
+
+PAYMENT_METHODS = {
+    'bank_transfer': 'bank_transfer',
+    'bank transfer': 'bank_transfer',
+    'transfer': 'bank_transfer',
+    'credit_card': 'credit_card',
+    'credit card': 'credit_card',
+    'card': 'credit_card',
+    'debit_card': 'debit_card',
+    'debit card': 'debit_card',
+    'online': 'online',
+}
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y']
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be read (unknown format, missing columns)"""
+
+
+@dataclass
+class ImportRow:
+    row_number: int
+    student_key: str = ''
+    transaction_reference: str = ''
+    amount: Decimal = None
+    payment_date: date = None
+    payment_method: str = 'bank_transfer'
+    remarks: str = ''
+    student: Student = None
+    allocations: list = field(default_factory=list)
+    unallocated: Decimal = Decimal('0')
+    payment_id: str = ''
+    error: str = ''
+
+    @property
+    def ok(self):
+        return not self.error
+
+
+@dataclass
+class ImportResult:
+    dry_run: bool
+    rows: list = field(default_factory=list)
+
+    @property
+    def imported(self):
+        return [row for row in self.rows if row.ok]
+
+    @property
+    def errors(self):
+        return [row for row in self.rows if not row.ok]
+
+    @property
+    def total_amount(self):
+        return sum((row.amount for row in self.imported), Decimal('0'))
+
+
+def read_rows(file, filename):
+    """Yield ``(row_number, values)`` for each data row of a .csv or .xlsx file, header excluded"""
+    name = filename.lower()
+    if name.endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            yield from _with_header(rows)
+        finally:
+            workbook.close()
+    elif name.endswith('.csv'):
+        yield from _with_header(csv.reader(codecs.iterdecode(file, 'utf-8-sig')))
+    else:
+        raise ImportFileError('Upload a .csv or .xlsx file')
+
+
+def _with_header(rows):
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFileError('The file is empty')
+    columns = [COLUMN_ALIASES.get(str(name or '').strip().lower().replace(' ', '_')) for name in header]
+    if 'amount' not in columns or 'payment_date' not in columns:
+        raise ImportFileError('The file needs an amount and a payment date column')
+    if 'student_id' not in columns and 'transaction_reference' not in columns:
+        raise ImportFileError('The file needs a student ID or a transaction reference column')
+
+    for row_number, values in enumerate(rows, start=2):
+        if not any(value not in (None, '') for value in values):
+            continue
+        yield row_number, {
+            column: value for column, value in zip(columns, values) if column
+        }
+
+
+def parse_row(row_number, values):
+    """Turn raw cell values into an ImportRow, recording the first problem found as its error"""
+    row = ImportRow(row_number=row_number)
+    row.student_key = _text(values.get('student_id'))
+    row.transaction_reference = _text(values.get('transaction_reference'))[:100]
+    row.remarks = _text(values.get('remarks'))
+
+    if not row.student_key and not row.transaction_reference:
+        row.error = 'No student ID or transaction reference'
+        return row
+
+    try:
+        row.amount = Decimal(str(values.get('amount')).replace(',', '').strip()).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        row.error = f'Invalid amount "{values.get("amount")}"'
+        return row
+    if row.amount <= 0:
+        row.error = 'Amount must be positive'
+        return row
+
+    row.payment_date = _parse_date(values.get('payment_date'))
+    if row.payment_date is None:
+        row.error = f'Invalid payment date "{values.get("payment_date")}"'
+        return row
+
+    method = _text(values.get('payment_method')).lower()
+    if method:
+        row.payment_method = PAYMENT_METHODS.get(method)
+        if row.payment_method is None:
+            row.error = f'Unknown payment method "{method}"'
+    return row
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = _text(value)
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def import_payments(rows, dry_run=False, collected_by=None, chunk_size=500):
+    """
+    Import ``(row_number, values)`` pairs as produced by ``read_rows``.
+
+    Each chunk is matched, allocated and written in its own transaction. With
+    ``dry_run`` nothing is written and installments are not locked; the report
+    shows what the import would do.
+    """
+    result = ImportResult(dry_run=dry_run)
+    seen_keys = set()
+    # A dry run writes nothing, so installments already part-paid by earlier chunks are carried over
+    carried = {} if dry_run else None
+    rows = iter(rows)
+    while True:
+        chunk = [parse_row(row_number, values) for row_number, values in islice(rows, chunk_size)]
+        if not chunk:
+            break
+        if dry_run:
+            _process_chunk(chunk, seen_keys, dry_run=True, carried=carried)
+        else:
+            with transaction.atomic():
+                _process_chunk(chunk, seen_keys, dry_run=False, collected_by=collected_by)
+        result.rows.extend(chunk)
+    return result
+
+
+def _process_chunk(chunk, seen_keys, dry_run, collected_by=None, carried=None):
+    pending = [row for row in chunk if row.ok]
+    _reject_closed_months(pending)
+    pending = [row for row in pending if row.ok]
+    _match_students(pending)
+    _reject_duplicates([row for row in pending if row.ok], seen_keys)
+
+    pending = [row for row in pending if row.ok]
+    if not pending:
+        return
+
+    by_student = outstanding_installments({row.student.pk for row in pending}, lock=not dry_run)
+    if carried is not None:
+        for student_id, installments in by_student.items():
+            installments = [carried.setdefault(installment.pk, installment) for installment in installments]
+            by_student[student_id] = [
+                installment for installment in installments if installment.get_outstanding_amount() > 0
+            ]
+    for row in pending:
+        row.allocations, row.unallocated = allocate(by_student.get(row.student.pk, []), row.amount)
+        # Later rows of the same student continue where this one stopped
+        settle(row.allocations, row.payment_date)
+
+    if not dry_run:
+        _write_chunk(pending, collected_by)
+
+
+def _match_students(rows):
+    """Resolve every row's student with one query: by student ID, else by the ID quoted as reference"""
+    keys = set()
+    for row in rows:
+        keys.update(key for key in (row.student_key, row.transaction_reference) if key)
+        keys.update(key.upper() for key in (row.student_key, row.transaction_reference) if key)
+    students = {student.student_id.upper(): student for student in Student.objects.filter(student_id__in=keys)}
+
+    for row in rows:
+        if row.student_key:
+            row.student = students.get(row.student_key.upper())
+            if row.student is None:
+                row.error = f'No student with ID "{row.student_key}"'
+        else:
+            row.student = students.get(row.transaction_reference.upper())
+            if row.student is None:
+                row.error = f'No student matches reference "{row.transaction_reference}"'
+
+
+def _reject_closed_months(rows):
+    """Rows dated in a closed accounting month would book income into it"""
+    closed = closed_months(row.payment_date for row in rows)
+    for row in rows:
+        if month_start(row.payment_date) in closed:
+            row.error = f'{row.payment_date:%B %Y} is closed for accounting'
+
+
+def _duplicate_key(student_id, payment_date, amount, reference):
+    return student_id, payment_date, amount, reference or ''
+
+
+def _reject_duplicates(rows, seen):
+    """
+    Rows paying the same amount to the same student on the same day under the
+    same reference (or both without one) as a payment already recorded, or as
+    an earlier row of the file, are rejected. A reference alone is no key: a
+    student ID quoted as reference comes back every month.
+    """
+    if not rows:
+        return
+    existing = {
+        _duplicate_key(*values)
+        for values in Payment.objects.filter(
+            student__in={row.student.pk for row in rows},
+            payment_date__in={row.payment_date for row in rows},
+            net_amount__in={row.amount for row in rows},
+        ).exclude(payment_status__in=['failed', 'cancelled']).values_list(
+            'student_id', 'payment_date', 'net_amount', 'transaction_reference'
+        )
+    }
+
+    for row in rows:
+        key = _duplicate_key(row.student.pk, row.payment_date, row.amount, row.transaction_reference)
+        described = f'AED {row.amount:,.2f} on {row.payment_date:%d/%m/%Y}'
+        if row.transaction_reference:
+            described += f' with reference "{row.transaction_reference}"'
+        if key in existing:
+            row.error = f'{described} was already recorded for this student'
+        elif key in seen:
+            row.error = f'{described} appears more than once in the file'
+        else:
+            seen.add(key)
+
+
+def _write_chunk(rows, collected_by):
+    advance = None
+    if any(needs_advance_category(row.allocations, row.unallocated) for row in rows):
+        advance = advance_category()
+
+    payment_ids = Payment.allocate_payment_ids(len(rows))
+    payments = []
+    for row, payment_id in zip(rows, payment_ids):
+        row.payment_id = payment_id
+        payments.append(Payment(
+            payment_id=payment_id,
+            student=row.student,
+            total_amount=sum(allocation.principal for allocation in row.allocations) + row.unallocated,
+            late_fee_amount=sum(allocation.late_fee for allocation in row.allocations),
+            net_amount=row.amount,
+            payment_method=row.payment_method,
+            payment_date=row.payment_date,
+            transaction_reference=row.transaction_reference,
+            remarks=row.remarks or 'Imported bank statement line',
+            payment_status='completed',
+            collected_by=collected_by,
+        ))
+    Payment.objects.bulk_create(payments)
+
+    payment_items = []
+    ledger_entries = []
+    incomes = []
+    installments = {}
+    for row, payment in zip(rows, payments):
+        for item in allocation_items(row.allocations, row.unallocated, advance):
+            net_item_amount = item['amount'] + item['late_fee']
+            payment_items.append(PaymentItem(
+                payment=payment,
+                fee_category=item['fee_category'],
+                installment_id=item['installment_id'],
+                description=item['description'],
+                amount=item['amount'],
+                late_fee=item['late_fee'],
+                net_amount=net_item_amount,
+                applied_amount=item['applied_amount'] if item['installment_id'] else 0,
+            ))
+            ledger_entries.append(StudentLedger(
+                student=row.student,
+                transaction_date=row.payment_date,
+                transaction_type='credit',
+                fee_category=item['fee_category'],
+                payment=payment,
+                amount=net_item_amount,
+                description=f"Payment - {item['description']}",
+                reference_number=payment.payment_id,
+            ))
+        for allocation in row.allocations:
+            installments[allocation.installment.pk] = allocation.installment
+
+        incomes.append(Income(
+            perticulers=f"Fee payment of  {row.student.get_full_name()} against "
+                        f"{row.transaction_reference or row.remarks} by {row.payment_method}",
+            amount=row.amount,
+            bill_number=payment.payment_id,
+            date=row.payment_date,
+            payment=payment,
+        ))
+
+    PaymentItem.objects.bulk_create(payment_items)
+    StudentLedger.objects.bulk_create(ledger_entries)
+    Income.objects.bulk_create(incomes)
+    PaymentInstallment.objects.bulk_update(
+        list(installments.values()), ['paid_amount', 'paid_date', 'status', 'is_overdue']
+    )
+
+    # bulk_create and bulk_update skip the model signals
+    schedule_summary_refresh({row.student.pk for row in rows})
+    for payment_date in {row.payment_date for row in rows}:
+        invalidate_closed_month_summaries(payment_date)
@@ -0,0 +1,87 @@
+# management/commands/benchmark_overdue_sweep.py
+
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from home.models import FeeCategory
+from payments.models import FeeStructure, PaymentInstallment, PaymentPlan, StudentFeeAssignment
+from payments.services import sweep_overdue_installments
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Time the overdue sweep over a large number of past-due installments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--installments', type=int, default=50000, help='Past-due installments (default: 50000)')
+        parser.add_argument('--per-student', type=int, default=10, help='Installments per student (default: 10)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Installments per UPDATE (default: 5000)')
+
+    def handle(self, *args, **options):
+        per_student = max(options['per_student'], 1)
+        student_count = max(options['installments'] // per_student, 1)
+        today = timezone.now().date()
+
+        self.stdout.write(f'Creating {student_count * per_student} past-due installments...')
+        fee_category, _ = FeeCategory.objects.get_or_create(name='Benchmark Overdue Fee')
+        fee_structure, _ = FeeStructure.objects.get_or_create(
+            academic_year=today.year, fee_category=fee_category,
+            defaults={'amount': Decimal('1000'), 'late_fee_percentage': Decimal('5')},
+        )
+
+        students = Student.objects.bulk_create([
+            self.build_student(index) for index in range(student_count)
+        ], batch_size=500)
+        StudentFeeAssignment.objects.bulk_create([
+            StudentFeeAssignment(student=student, fee_structure=fee_structure, start_date=today)
+            for student in students
+        ], batch_size=500)
+        plans = PaymentPlan.objects.bulk_create([
+            PaymentPlan(
+                student=student, plan_type='monthly', academic_year=today.year,
+                total_amount=Decimal('1000') * per_student, installment_amount=Decimal('1000'),
+                balance_amount=0, number_of_installments=per_student,
+                start_date=today - timedelta(days=30 * per_student), fee_category=fee_category,
+            )
+            for student in students
+        ], batch_size=500)
+        PaymentInstallment.objects.bulk_create([
+            PaymentInstallment(
+                payment_plan=plan, installment_number=number + 1,
+                due_date=today - timedelta(days=30 * (per_student - number)), amount=Decimal('1000'),
+            )
+            for plan in plans
+            for number in range(per_student)
+        ], batch_size=1000)
+
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                updated = sweep_overdue_installments(chunk_size=options['chunk_size'])
+                elapsed = time.perf_counter() - started
+
+            self.stdout.write(f'Chunk size: {options["chunk_size"]}, queries: {len(queries)}')
+            self.stdout.write(self.style.SUCCESS(
+                f'{updated} installments swept in {elapsed:.2f}s -> {updated / elapsed:.0f} installments/s'
+            ))
+        finally:
+            # Clean up benchmark data
+            Student.objects.filter(id__in=[student.id for student in students]).delete()
+            fee_structure.delete()
+            fee_category.delete()
+
+    def build_student(self, index):
+        return Student(
+            student_id=f'BENCH-OD-{index:06d}',
+            first_name='Benchmark', last_name=f'Overdue {index + 1}', nationality='-', gender='M',
+            date_of_birth=timezone.now().date(), father_name='-', father_nationality='-',
+            mother_name='-', mother_nationality='-', full_home_address='-',
+            first_contact_person='-', first_contact_relationship='-', first_contact_telephone='-',
+            year_of_admission=timezone.now().year, is_active=False,
+        )
@@ -0,0 +1,96 @@
+# management/commands/benchmark_payments.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from Finance.models import Income
+from home.models import FeeCategory
+from payments.models import PaymentPlan, PaymentInstallment
+from payments.services import record_payment
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Measure payments per second through the cashier write path under concurrent submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cashiers', type=int, default=4, help='Concurrent cashiers (default: 4)')
+        parser.add_argument('--payments', type=int, default=50, help='Payments per cashier (default: 50)')
+        parser.add_argument('--lines', type=int, default=6, help='Lines per payment (default: 6)')
+
+    def handle(self, *args, **options):
+        cashiers = options['cashiers']
+        payments_per_cashier = options['payments']
+        lines = options['lines']
+        today = timezone.now().date()
+
+        fee_category, _ = FeeCategory.objects.get_or_create(name='Benchmark Fee')
+        students = [self.create_student(index) for index in range(cashiers)]
+
+        # One plan per cashier so that every line also updates an installment
+        installment_ids = []
+        for student in students:
+            plan = PaymentPlan.objects.create(
+                student=student, plan_type='monthly', academic_year=today.year,
+                total_amount=Decimal('1000000'), installment_amount=0, balance_amount=0,
+                number_of_installments=lines, start_date=today, fee_category=fee_category,
+            )
+            PaymentInstallment.objects.bulk_create([
+                PaymentInstallment(
+                    payment_plan=plan, installment_number=number + 1,
+                    due_date=today + timedelta(days=30 * number), amount=plan.installment_amount,
+                )
+                for number in range(lines)
+            ])
+            installment_ids.append(list(plan.installments.values_list('id', flat=True)))
+
+        def cashier(index):
+            student = students[index]
+            items = [
+                {
+                    'fee_category': fee_category,
+                    'amount': Decimal('10.00'),
+                    'discount': Decimal('0'),
+                    'late_fee': Decimal('0'),
+                    'description': f'Benchmark line {line + 1}',
+                    'installment_id': installment_ids[index][line],
+                }
+                for line in range(lines)
+            ]
+            try:
+                for _ in range(payments_per_cashier):
+                    with transaction.atomic():
+                        record_payment(student, items, payment_method='cash', payment_date=today)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=cashiers) as pool:
+            list(pool.map(cashier, range(cashiers)))
+        elapsed = time.perf_counter() - started
+
+        total = cashiers * payments_per_cashier
+        self.stdout.write(f'Cashiers: {cashiers}, payments each: {payments_per_cashier}, lines per payment: {lines}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} payments in {elapsed:.2f}s -> {total / elapsed:.1f} payments/s'
+        ))
+
+        # Clean up benchmark data
+        Income.objects.filter(payment__student__in=students).delete()
+        Student.objects.filter(id__in=[student.id for student in students]).delete()
+        fee_category.delete()
+
+    def create_student(self, index):
+        return Student.objects.create(
+            first_name='Benchmark', last_name=f'Cashier {index + 1}', nationality='-', gender='M',
+            date_of_birth=timezone.now().date(), father_name='-', father_nationality='-',
+            mother_name='-', mother_nationality='-', full_home_address='-',
+            first_contact_person='-', first_contact_relationship='-', first_contact_telephone='-',
+            year_of_admission=timezone.now().year, is_active=False,
+        )
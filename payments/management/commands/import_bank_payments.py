@@ -0,0 +1,33 @@
+# management/commands/import_bank_payments.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.imports import ImportFileError, import_payments, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import a bank-transfer or card settlement statement (.csv or .xlsx)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Statement file')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be imported without saving')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows per transaction (default: 500)')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as statement:
+                result = import_payments(
+                    read_rows(statement, options['path']),
+                    dry_run=options['dry_run'], chunk_size=options['chunk_size'],
+                )
+        except (ImportFileError, OSError) as e:
+            raise CommandError(str(e))
+
+        for row in result.errors:
+            self.stderr.write(f'Row {row.row_number}: {row.error}')
+
+        verb = 'would be imported' if result.dry_run else 'imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(result.imported)} payment(s) {verb} totalling {result.total_amount:,.2f}, '
+            f'{len(result.errors)} row(s) rejected.'
+        ))
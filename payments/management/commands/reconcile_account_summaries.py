@@ -0,0 +1,47 @@
+# management/commands/reconcile_account_summaries.py
+
+from django.core.management.base import BaseCommand
+
+from payments.models import StudentAccountSummary
+from students.models import Student
+
+SUMMARY_FIELDS = [
+    'total_billed', 'total_paid', 'outstanding', 'overdue_amount',
+    'overdue_count', 'next_due_date', 'last_payment_date',
+]
+
+
+class Command(BaseCommand):
+    help = 'Recompute every StudentAccountSummary row and repair the ones that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift, do not write')
+        parser.add_argument('--batch-size', type=int, default=500, help='Students per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+
+        missing = drifted = 0
+        for start in range(0, len(student_ids), batch_size):
+            batch = student_ids[start:start + batch_size]
+            stored = StudentAccountSummary.objects.in_bulk(batch)
+
+            to_refresh = []
+            for row in StudentAccountSummary.computed_rows(batch):
+                current = stored.get(row.student_id)
+                if current is None:
+                    missing += 1
+                    to_refresh.append(row.student_id)
+                elif any(getattr(current, field) != getattr(row, field) for field in SUMMARY_FIELDS):
+                    drifted += 1
+                    to_refresh.append(row.student_id)
+                    self.stdout.write(f'  Drift: {row.student_id}')
+
+            if to_refresh and not options['dry_run']:
+                StudentAccountSummary.refresh(to_refresh)
+
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(student_ids)} student(s): {missing} missing and {drifted} drifted summaries {action}.'
+        ))
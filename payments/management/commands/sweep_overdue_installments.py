@@ -0,0 +1,16 @@
+# management/commands/sweep_overdue_installments.py
+
+from django.core.management.base import BaseCommand
+
+from payments.services import sweep_overdue_installments
+
+
+class Command(BaseCommand):
+    help = 'Mark past-due installments as overdue and apply late fees (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Installments per UPDATE (default: 5000)')
+
+    def handle(self, *args, **options):
+        updated = sweep_overdue_installments(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Completed! {updated} installment(s) marked overdue.'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_identifiercounter'),
+        ('payments', '0006_alter_paymentplan_session_type'),
+        ('students', '0009_alter_student_child_emirates_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentledger',
+            index=models.Index(fields=['student', '-id'], name='ledger_student_latest_idx'),
+        ),
+    ]
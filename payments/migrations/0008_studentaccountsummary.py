@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_studentledger_running_balance'),
+        ('students', '0009_alter_student_child_emirates_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAccountSummary',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='account_summary', serialize=False, to='students.student')),
+                ('total_billed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('overdue_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('overdue_count', models.PositiveIntegerField(default=0)),
+                ('next_due_date', models.DateField(blank=True, null=True)),
+                ('last_payment_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-outstanding'], name='summary_outstanding_idx'), models.Index(fields=['-overdue_amount'], name='summary_overdue_idx'), models.Index(fields=['next_due_date'], name='summary_next_due_idx')],
+            },
+        ),
+    ]
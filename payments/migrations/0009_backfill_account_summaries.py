@@ -0,0 +1,85 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:12
+
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 500
+# StudentAccountSummary.OUTSTANDING_STATUSES when this migration was written
+OUTSTANDING_STATUSES = ['pending', 'overdue', 'partially_paid']
+
+
+def fill_account_summaries(apps, schema_editor):
+    """
+    Summaries of every existing student, computed as StudentAccountSummary.computed_rows
+    does (one grouped query per source table and batch); the signals keep them current afterwards.
+    """
+    Student = apps.get_model('students', 'Student')
+    PaymentInstallment = apps.get_model('payments', 'PaymentInstallment')
+    Payment = apps.get_model('payments', 'Payment')
+    StudentAccountSummary = apps.get_model('payments', 'StudentAccountSummary')
+
+    outstanding_q = models.Q(status__in=OUTSTANDING_STATUSES)
+    overdue_q = models.Q(status='overdue') | (models.Q(is_overdue=True) & outstanding_q)
+    due = models.F('amount') + models.F('late_fee') - models.F('paid_amount')
+
+    student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(student_ids), BATCH_SIZE):
+        batch = student_ids[start:start + BATCH_SIZE]
+        installment_totals = {
+            row['payment_plan__student_id']: row
+            for row in PaymentInstallment.objects.filter(
+                payment_plan__student_id__in=batch
+            ).order_by().values('payment_plan__student_id').annotate(
+                total_billed=models.Sum(models.F('amount') + models.F('late_fee'), filter=~models.Q(status='cancelled')),
+                outstanding=models.Sum(due, filter=outstanding_q),
+                overdue_amount=models.Sum(due, filter=overdue_q),
+                overdue_count=models.Count('id', filter=overdue_q),
+                next_due_date=models.Min('due_date', filter=outstanding_q),
+            )
+        }
+        payment_totals = {
+            row['student_id']: row
+            for row in Payment.objects.filter(
+                student_id__in=batch, payment_status='completed'
+            ).order_by().values('student_id').annotate(
+                total_paid=models.Sum('net_amount'),
+                last_payment_date=models.Max('payment_date'),
+            )
+        }
+
+        rows = []
+        for student_id in batch:
+            installments = installment_totals.get(student_id, {})
+            payments = payment_totals.get(student_id, {})
+            rows.append(StudentAccountSummary(
+                student_id=student_id,
+                total_billed=installments.get('total_billed') or 0,
+                total_paid=payments.get('total_paid') or 0,
+                outstanding=installments.get('outstanding') or 0,
+                overdue_amount=installments.get('overdue_amount') or 0,
+                overdue_count=installments.get('overdue_count') or 0,
+                next_due_date=installments.get('next_due_date'),
+                last_payment_date=payments.get('last_payment_date'),
+                updated_at=timezone.now(),
+            ))
+        # Rows the signals already wrote are recomputed the same way
+        StudentAccountSummary.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['student'],
+            update_fields=[
+                'total_billed', 'total_paid', 'outstanding', 'overdue_amount',
+                'overdue_count', 'next_due_date', 'last_payment_date', 'updated_at',
+            ],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_studentaccountsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_account_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+def fill_applied_amount(apps, schema_editor):
+    """
+    Items linked to an installment were credited with their amount, the
+    convention of the cashier form. Items without one applied nothing.
+    """
+    PaymentItem = apps.get_model('payments', 'PaymentItem')
+    PaymentItem.objects.filter(installment__isnull=False).update(applied_amount=models.F('amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_backfill_account_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentitem',
+            name='applied_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(fill_applied_amount, migrations.RunPython.noop),
+    ]
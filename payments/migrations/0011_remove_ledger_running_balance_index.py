@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:57
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0010_paymentitem_applied_amount'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='studentledger',
+            name='ledger_student_latest_idx',
+        ),
+    ]
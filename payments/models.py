@@ -5,6 +5,7 @@ from django.utils import timezone
 from decimal import Decimal
 import uuid
 from home.models import  FeeCategory
+from home.sequences import reserve_ids, highest_suffix
 from students.models import Student
 
 User =  get_user_model()
@@ -263,21 +264,21 @@ class Payment(models.Model):
 
     def generate_payment_id(self):
         """Generate unique payment ID"""
+        return self.allocate_payment_ids(1)[0]
+
+    @classmethod
+    def allocate_payment_ids(cls, count):
+        """Reserve a block of consecutive payment IDs for the current month (bulk imports)"""
         import datetime
         year = datetime.datetime.now().year
         month = datetime.datetime.now().month
-        
-        last_payment = Payment.objects.filter(
-            payment_id__startswith=f'PAY{year}{month:02d}'
-        ).order_by('-payment_id').first()
-        
-        if last_payment:
-            last_number = int(last_payment.payment_id[-4:])
-            new_number = last_number + 1
-        else:
-            new_number = 1
-        
-        return f'PAY{year}{month:02d}{new_number:04d}'
+        prefix = f'PAY{year}{month:02d}'
+
+        numbers = reserve_ids(
+            prefix, count,
+            seed=lambda: highest_suffix(cls.objects.all(), 'payment_id', prefix, width=4)
+        )
+        return [f'{prefix}{number:04d}' for number in numbers]
 
     def __str__(self):
         return f"Payment {self.payment_id} - {self.student.get_full_name()} - ${self.net_amount}"
@@ -293,6 +294,8 @@ class PaymentItem(models.Model):
     discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     late_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     net_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # What this item added to the installment's paid amount, taken back when the payment is deleted
+    applied_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     def save(self, *args, **kwargs):
         self.net_amount = self.amount - self.discount_amount + self.late_fee
@@ -353,4 +356,105 @@ class StudentLedger(models.Model):
         ordering = ['-transaction_date', '-created_at']
 
     def __str__(self):
-        return f"{self.student.get_full_name()} - {self.transaction_type} - ${self.amount}"
\ No newline at end of file
+        return f"{self.student.get_full_name()} - {self.transaction_type} - ${self.amount}"
+
+
+class StudentAccountSummary(models.Model):
+    """Denormalized per-student balances, kept current by payments.signals"""
+    OUTSTANDING_STATUSES = ['pending', 'overdue', 'partially_paid']
+
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name='account_summary')
+    total_billed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    outstanding = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    overdue_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    overdue_count = models.PositiveIntegerField(default=0)
+    next_due_date = models.DateField(null=True, blank=True)
+    last_payment_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-outstanding'], name='summary_outstanding_idx'),
+            models.Index(fields=['-overdue_amount'], name='summary_overdue_idx'),
+            models.Index(fields=['next_due_date'], name='summary_next_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - outstanding {self.outstanding}"
+
+    @classmethod
+    def computed_rows(cls, student_ids):
+        """Recompute summary rows for the given students with one grouped query per source table"""
+        outstanding_q = models.Q(status__in=cls.OUTSTANDING_STATUSES)
+        overdue_q = models.Q(status='overdue') | (models.Q(is_overdue=True) & outstanding_q)
+        due = models.F('amount') + models.F('late_fee') - models.F('paid_amount')
+
+        installment_totals = {
+            row['payment_plan__student_id']: row
+            for row in PaymentInstallment.objects.filter(
+                payment_plan__student_id__in=student_ids
+            ).order_by().values('payment_plan__student_id').annotate(
+                total_billed=models.Sum(models.F('amount') + models.F('late_fee'), filter=~models.Q(status='cancelled')),
+                outstanding=models.Sum(due, filter=outstanding_q),
+                overdue_amount=models.Sum(due, filter=overdue_q),
+                overdue_count=models.Count('id', filter=overdue_q),
+                next_due_date=models.Min('due_date', filter=outstanding_q),
+            )
+        }
+        payment_totals = {
+            row['student_id']: row
+            for row in Payment.objects.filter(
+                student_id__in=student_ids, payment_status='completed'
+            ).order_by().values('student_id').annotate(
+                total_paid=models.Sum('net_amount'),
+                last_payment_date=models.Max('payment_date'),
+            )
+        }
+
+        rows = []
+        for student_id in student_ids:
+            installments = installment_totals.get(student_id, {})
+            payments = payment_totals.get(student_id, {})
+            rows.append(cls(
+                student_id=student_id,
+                total_billed=installments.get('total_billed') or 0,
+                total_paid=payments.get('total_paid') or 0,
+                outstanding=installments.get('outstanding') or 0,
+                overdue_amount=installments.get('overdue_amount') or 0,
+                overdue_count=installments.get('overdue_count') or 0,
+                next_due_date=installments.get('next_due_date'),
+                last_payment_date=payments.get('last_payment_date'),
+                updated_at=timezone.now(),
+            ))
+        return rows
+
+    @classmethod
+    def refresh(cls, student_ids, batch_size=500):
+        """Upsert the summaries of existing students, returns the number of rows written"""
+        student_ids = list(student_ids)
+        written = 0
+        for start in range(0, len(student_ids), batch_size):
+            # Students deleted in the meantime have lost their summary through the cascade
+            batch = list(Student.objects.filter(pk__in=student_ids[start:start + batch_size]).values_list('pk', flat=True))
+            rows = cls.computed_rows(batch)
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['student'],
+                update_fields=[
+                    'total_billed', 'total_paid', 'outstanding', 'overdue_amount',
+                    'overdue_count', 'next_due_date', 'last_payment_date', 'updated_at',
+                ],
+            )
+            written += len(rows)
+        return written
+
+    @classmethod
+    def for_student(cls, student):
+        """Summary row for one student, built on first access"""
+        summary = cls.objects.filter(student=student).first()
+        if summary is None:
+            cls.refresh([student.pk])
+            summary = cls.objects.get(student=student)
+        return summary
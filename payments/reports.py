@@ -0,0 +1,295 @@
+"""
+Database-side report queries for the payments reports.
+
+The views only format what these helpers return; sorting, totals and paging
+all happen in SQL so the reports stay fast as the number of students grows.
+"""
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Sum, Window
+from django.utils import timezone
+
+from home.models import FeeCategory
+from .models import Payment, PaymentItem, StudentAccountSummary
+
+# Aging buckets by days since the oldest outstanding due date: (min days, max days)
+AGING_BUCKETS = {
+    '0_30': (0, 30),
+    '31_60': (31, 60),
+    '61_90': (61, 90),
+    '90_plus': (91, None),
+}
+
+AGING_BUCKET_CHOICES = [
+    ('0_30', '0 - 30 days'),
+    ('31_60', '31 - 60 days'),
+    ('61_90', '61 - 90 days'),
+    ('90_plus', 'Over 90 days'),
+]
+
+
+def encode_defaulter_cursor(overdue_amount, student_id):
+    return f'{overdue_amount}~{student_id.hex}'
+
+
+def decode_defaulter_cursor(cursor):
+    """Return (overdue_amount, student_id) or None for a missing or malformed cursor"""
+    try:
+        amount, student_hex = cursor.split('~', 1)
+        return Decimal(amount), uuid.UUID(hex=student_hex)
+    except (AttributeError, ValueError, ArithmeticError):
+        return None
+
+
+def defaulter_page(after=None, before=None, aging=None, page_size=50, today=None):
+    """
+    One page of students in arrears, sorted by overdue amount (largest first).
+
+    Rows and the grand totals come from a single statement: a CTE over the
+    account summaries carries ``COUNT(*) OVER ()`` and ``SUM(...) OVER ()``
+    and the outer query keyset-paginates on (overdue_amount, student_id).
+    ``after`` reads the page following a row, ``before`` the page preceding
+    one (in reverse order, flipped back here). One row more than the page is
+    read to tell whether another page follows in that direction.
+    Returns ``(rows, totals, next_cursor, previous_cursor)``.
+    """
+    today = today or timezone.now().date()
+
+    defaulters = StudentAccountSummary.objects.filter(overdue_count__gt=0)
+    if aging in AGING_BUCKETS:
+        min_days, max_days = AGING_BUCKETS[aging]
+        defaulters = defaulters.filter(next_due_date__lte=today - timedelta(days=min_days))
+        if max_days is not None:
+            defaulters = defaulters.filter(next_due_date__gte=today - timedelta(days=max_days))
+
+    defaulters = defaulters.order_by().annotate(
+        total_defaulters=Window(Count('pk')),
+        total_overdue_amount=Window(Sum('overdue_amount')),
+    ).values(
+        'student_id', 'overdue_amount', 'overdue_count', 'next_due_date',
+        'total_defaulters', 'total_overdue_amount',
+    )
+    inner_sql, params = defaulters.query.sql_with_params()
+    params = list(params)
+
+    sql = (
+        f'WITH defaulters AS ({inner_sql}) '
+        'SELECT student_id, overdue_amount, overdue_count, next_due_date, '
+        'total_defaulters, total_overdue_amount FROM defaulters'
+    )
+
+    backwards = bool(before) and not after
+    cursor_key = decode_defaulter_cursor(before if backwards else after)
+    if cursor_key:
+        amount, student_id = cursor_key
+        amount_field = StudentAccountSummary._meta.get_field('overdue_amount')
+        student_field = StudentAccountSummary._meta.pk
+        amount = amount_field.get_db_prep_value(amount, connection)
+        student_id = student_field.get_db_prep_value(student_id, connection)
+        beyond = '>' if backwards else '<'
+        sql += f' WHERE overdue_amount {beyond} %s OR (overdue_amount = %s AND student_id {beyond} %s)'
+        params += [amount, amount, student_id]
+    else:
+        backwards = False
+
+    if backwards:
+        sql += ' ORDER BY overdue_amount ASC, student_id ASC LIMIT %s'
+    else:
+        sql += ' ORDER BY overdue_amount DESC, student_id DESC LIMIT %s'
+    params.append(page_size + 1)
+
+    rows = list(StudentAccountSummary.objects.raw(sql, params))
+    more = len(rows) > page_size
+    if backwards and not more and len(rows) < page_size:
+        # Rows were removed since the cursor was handed out; show a full first page instead
+        return defaulter_page(aging=aging, page_size=page_size, today=today)
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    if rows:
+        totals = {
+            'total_defaulters': rows[0].total_defaulters,
+            'total_overdue_amount': Decimal(str(rows[0].total_overdue_amount or 0)),
+        }
+    else:
+        # Past the last page the window columns are not available
+        totals = defaulters.order_by().aggregate(
+            total_defaulters=Count('pk'), total_overdue_amount=Sum('overdue_amount')
+        )
+        totals['total_overdue_amount'] = totals['total_overdue_amount'] or 0
+
+    # Going forwards from a cursor, the cursor's row precedes this page; going backwards, it follows it
+    next_cursor = previous_cursor = None
+    if rows and (backwards or more):
+        next_cursor = encode_defaulter_cursor(rows[-1].overdue_amount, rows[-1].student_id)
+    if rows and (more if backwards else cursor_key):
+        previous_cursor = encode_defaulter_cursor(rows[0].overdue_amount, rows[0].student_id)
+
+    return rows, totals, next_cursor, previous_cursor
+
+
+# Cache entries are keyed by this generation, bumped when a closed month changes
+SUMMARY_GENERATION_KEY = 'payment_summary:generation'
+# Closed months rarely change, but a payment recorded or deleted in one may
+# race the generation bump; a cached summary is never older than a day
+CLOSED_SUMMARY_TIMEOUT = 24 * 60 * 60
+SUMMARY_DAYS = 30
+
+
+def _as_decimal(value):
+    # SQLite returns SUM() over decimal columns as float or int
+    if value is None:
+        return Decimal('0.00')
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(Decimal('0.01'))
+
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def is_closed_range(date_to, today=None):
+    """True when every day of the range lies in a month that has already ended"""
+    today = today or timezone.now().date()
+    return date_to is not None and date_to < today.replace(day=1)
+
+
+def invalidate_payment_summaries():
+    try:
+        cache.incr(SUMMARY_GENERATION_KEY)
+    except ValueError:
+        cache.set(SUMMARY_GENERATION_KEY, 1, None)
+
+
+def payment_summary(date_from=None, date_to=None):
+    """
+    Totals, per-method, per-day and per-fee-category breakdowns of completed
+    payments in one grouped pass. Ranges that lie entirely in closed months are cached.
+    """
+    if not is_closed_range(date_to):
+        return _compute_payment_summary(date_from, date_to)
+
+    generation = cache.get_or_set(SUMMARY_GENERATION_KEY, 1, None)
+    key = f'payment_summary:{generation}:{date_from}:{date_to}'
+    summary = cache.get(key)
+    if summary is None:
+        summary = _compute_payment_summary(date_from, date_to)
+        cache.set(key, summary, CLOSED_SUMMARY_TIMEOUT)
+    return summary
+
+
+def _compute_payment_summary(date_from, date_to):
+    """
+    Payments and their items are stacked into one source (items only carry the
+    fee category and their own net amount) and grouped four ways at once:
+    GROUPING SETS on PostgreSQL, the equivalent UNION ALL of GROUP BYs elsewhere.
+    """
+    conditions = ["p.payment_status = 'completed'"]
+    params = []
+    if date_from:
+        conditions.append('p.payment_date >= %s')
+        params.append(date_from)
+    if date_to:
+        conditions.append('p.payment_date <= %s')
+        params.append(date_to)
+    where = ' AND '.join(conditions)
+
+    payment_table = Payment._meta.db_table
+    item_table = PaymentItem._meta.db_table
+    source = (
+        'WITH source AS ('
+        f"SELECT 'payment' AS kind, p.payment_method, p.payment_date, NULL AS fee_category_id, "
+        f'p.net_amount, p.discount_amount, p.late_fee_amount FROM {payment_table} p WHERE {where} '
+        'UNION ALL '
+        f"SELECT 'item', NULL, NULL, i.fee_category_id, i.net_amount, 0, 0 "
+        f'FROM {item_table} i INNER JOIN {payment_table} p ON p.id = i.payment_id WHERE {where}'
+        ') '
+    )
+    params += params
+
+    measures = (
+        "COUNT(CASE WHEN kind = 'payment' THEN 1 END) AS payments, "
+        "SUM(CASE WHEN kind = 'payment' THEN net_amount END) AS net_amount, "
+        "SUM(CASE WHEN kind = 'payment' THEN discount_amount END) AS discount_amount, "
+        "SUM(CASE WHEN kind = 'payment' THEN late_fee_amount END) AS late_fee_amount, "
+        "COUNT(CASE WHEN kind = 'item' THEN 1 END) AS items, "
+        "SUM(CASE WHEN kind = 'item' THEN net_amount END) AS item_amount"
+    )
+
+    if connection.vendor == 'postgresql':
+        sql = source + (
+            'SELECT CASE GROUPING(payment_method, payment_date, fee_category_id) '
+            "WHEN 7 THEN 'total' WHEN 3 THEN 'method' WHEN 5 THEN 'day' ELSE 'category' END, "
+            f'payment_method, payment_date, fee_category_id, {measures} FROM source '
+            'GROUP BY GROUPING SETS ((), (payment_method), (payment_date), (fee_category_id))'
+        )
+    else:
+        sql = source + ' UNION ALL '.join([
+            f"SELECT 'total', NULL, NULL, NULL, {measures} FROM source",
+            f"SELECT 'method', payment_method, NULL, NULL, {measures} FROM source GROUP BY payment_method",
+            f"SELECT 'day', NULL, payment_date, NULL, {measures} FROM source GROUP BY payment_date",
+            f"SELECT 'category', NULL, NULL, fee_category_id, {measures} FROM source GROUP BY fee_category_id",
+        ])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    method_names = dict(Payment.PAYMENT_METHOD_CHOICES)
+    summary = {
+        'total_payments': 0,
+        'total_amount': Decimal('0.00'),
+        'total_discount': Decimal('0.00'),
+        'total_late_fees': Decimal('0.00'),
+        'payment_method_summary': [],
+        'daily_summary': [],
+        'fee_category_summary': [],
+    }
+    for (grouping, method, payment_date, fee_category_id,
+         payments, net_amount, discount_amount, late_fee_amount, items, item_amount) in rows:
+        if grouping == 'total':
+            summary.update({
+                'total_payments': payments,
+                'total_amount': _as_decimal(net_amount),
+                'total_discount': _as_decimal(discount_amount),
+                'total_late_fees': _as_decimal(late_fee_amount),
+            })
+        elif grouping == 'method' and payments:
+            summary['payment_method_summary'].append({
+                'payment_method': method,
+                'payment_method_display': method_names.get(method, method),
+                'count': payments,
+                'total': _as_decimal(net_amount),
+            })
+        elif grouping == 'day' and payments:
+            summary['daily_summary'].append({
+                'payment_date': _as_date(payment_date),
+                'count': payments,
+                'total': _as_decimal(net_amount),
+            })
+        elif grouping == 'category' and items:
+            summary['fee_category_summary'].append({
+                'fee_category_id': fee_category_id,
+                'count': items,
+                'total': _as_decimal(item_amount),
+            })
+
+    summary['payment_method_summary'].sort(key=lambda row: row['payment_method'])
+    summary['daily_summary'].sort(key=lambda row: row['payment_date'], reverse=True)
+    del summary['daily_summary'][SUMMARY_DAYS:]
+
+    categories = FeeCategory.objects.in_bulk(
+        [row['fee_category_id'] for row in summary['fee_category_summary'] if row['fee_category_id']]
+    )
+    for row in summary['fee_category_summary']:
+        category = categories.get(row['fee_category_id'])
+        row['fee_category'] = category.name if category else 'Uncategorised'
+    summary['fee_category_summary'].sort(key=lambda row: row['total'], reverse=True)
+
+    return summary
@@ -0,0 +1,142 @@
+"""
+Installment schedules for payment plans.
+
+``build_schedule`` works out every due date and amount in memory, so the plan
+form can preview a schedule and the plan views can insert it with a single
+``bulk_create``. Month based plans stay on the configured day of the month
+(``FeeStructure.due_date``): a plan due on the 31st falls due on the 28th or
+29th in February and on the 31st again in March, instead of drifting by 30
+day steps. Amounts are split to the cent and the remainder cents go to the
+first installments, so the schedule always adds up to the balance.
+"""
+import calendar
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import ROUND_DOWN, Decimal
+
+from .models import FeeStructure, PaymentInstallment
+from .signals import schedule_summary_refresh
+
+ScheduledInstallment = namedtuple('ScheduledInstallment', ['number', 'due_date', 'amount'])
+
+CENT = Decimal('0.01')
+
+# Months between installments of the calendar based plan types
+MONTH_STEPS = {
+    'monthly': 1,
+    '3_months': 3,
+    'quarterly': 3,
+    '6_months': 6,
+}
+
+
+def add_months(start, months, day=None):
+    """``start`` moved by ``months`` months on ``day`` (default: start's day), clamped to the month end"""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    day = day or start.day
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def first_due_date(start_date, due_day):
+    """First ``due_day`` of a month on or after ``start_date``"""
+    candidate = add_months(start_date, 0, due_day)
+    if candidate < start_date:
+        candidate = add_months(start_date, 1, due_day)
+    return candidate
+
+
+def split_amount(total, parts):
+    """Split ``total`` into ``parts`` amounts that differ by at most one cent and add up exactly"""
+    total = Decimal(total).quantize(CENT)
+    base = (total / parts).quantize(CENT, rounding=ROUND_DOWN)
+    remainder_cents = int((total - base * parts) / CENT)
+    return [base + CENT if index < remainder_cents else base for index in range(parts)]
+
+
+def resolve_due_day(academic_year, fee_category):
+    """The day of month installments of this fee fall due, or None when no fee structure sets one"""
+    if fee_category is None:
+        return None
+    return FeeStructure.objects.filter(
+        academic_year=academic_year, fee_category=fee_category, is_active=True
+    ).values_list('due_date', flat=True).first()
+
+
+def build_schedule(plan_type, balance_amount, number_of_installments, start_date,
+                   installment_frequency=30, due_day=None, custom_installments=None):
+    """
+    Return the list of ``ScheduledInstallment`` for a plan.
+
+    ``custom_installments`` (custom plans only) is a list of ``{'date', 'amount'}``
+    dicts as posted by the plan form; their sum must match ``balance_amount``.
+    Raises ValueError for input a plan cannot be built from.
+    """
+    balance_amount = Decimal(balance_amount)
+
+    if plan_type == 'custom':
+        if not custom_installments:
+            raise ValueError('At least one installment is required')
+        schedule = [
+            ScheduledInstallment(
+                index + 1,
+                entry['date'] if isinstance(entry['date'], date) else date.fromisoformat(entry['date']),
+                Decimal(str(entry['amount'])).quantize(CENT),
+            )
+            for index, entry in enumerate(custom_installments)
+        ]
+        installments_total = sum(entry.amount for entry in schedule)
+        if abs(installments_total - balance_amount) > CENT:
+            raise ValueError(
+                f'Sum of installments ({installments_total}) must match balance amount ({balance_amount})'
+            )
+        return schedule
+
+    number_of_installments = int(number_of_installments)
+    if number_of_installments < 1:
+        raise ValueError('A plan needs at least one installment')
+
+    if plan_type in MONTH_STEPS:
+        step = MONTH_STEPS[plan_type]
+        anchor = first_due_date(start_date, due_day) if due_day else start_date
+        day = due_day or start_date.day
+        due_dates = [add_months(anchor, step * index, day) for index in range(number_of_installments)]
+    else:
+        days = 7 if plan_type == 'weekly' else int(installment_frequency or 30)
+        due_dates = [start_date + timedelta(days=days * index) for index in range(number_of_installments)]
+
+    amounts = split_amount(balance_amount, number_of_installments)
+    return [
+        ScheduledInstallment(index + 1, due_date, amount)
+        for index, (due_date, amount) in enumerate(zip(due_dates, amounts))
+    ]
+
+
+def create_installments(payment_plan, schedule):
+    """Insert a built schedule for ``payment_plan`` with one bulk_create"""
+    return create_plan_installments([payment_plan], schedule)
+
+
+def create_plan_installments(payment_plans, schedule, batch_size=1000):
+    """Insert the same built schedule for every plan in ``payment_plans`` in batched inserts"""
+    installments = PaymentInstallment.objects.bulk_create([
+        PaymentInstallment(
+            payment_plan=payment_plan,
+            installment_number=entry.number,
+            due_date=entry.due_date,
+            amount=entry.amount,
+            status='pending',
+        )
+        for payment_plan in payment_plans
+        for entry in schedule
+    ], batch_size=batch_size)
+    # bulk_create skips post_save, so the students' account summaries are refreshed here
+    schedule_summary_refresh([payment_plan.student_id for payment_plan in payment_plans])
+    return installments
+
+
+def schedule_as_json(schedule):
+    return [
+        {'number': entry.number, 'due_date': entry.due_date.isoformat(), 'amount': str(entry.amount)}
+        for entry in schedule
+    ]
@@ -0,0 +1,345 @@
+"""
+Write paths shared by the payment views, imports and management commands.
+
+Everything here expects to run inside ``transaction.atomic()`` and keeps the
+number of round trips independent of the number of payment lines.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Max, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Round
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from Finance.models import Income
+from home.models import FeeCategory
+from .allocation import advance_category, allocate_payment, allocation_items, apply_allocations, needs_advance_category
+from .models import FeeStructure, Payment, PaymentItem, PaymentInstallment, PaymentPlan, StudentLedger
+from .schedules import build_schedule, create_plan_installments, resolve_due_day
+from .signals import invalidate_closed_month_summaries, schedule_summary_refresh
+
+
+class PlanConflictError(ValueError):
+    """Students were given a plan for the same year and fee category while the plans were being assigned"""
+
+    def __init__(self, students):
+        self.students = students
+        super().__init__(
+            f"{len(students)} student(s) were given a plan for this year and fee category meanwhile: "
+            + ', '.join(student.get_full_name() for student in students[:10])
+            + (', ...' if len(students) > 10 else '')
+        )
+
+
+def resolve_fee_categories(fee_category_ids):
+    """Fetch every fee category used by a payment in one query, keyed by id"""
+    return FeeCategory.objects.in_bulk(set(fee_category_ids))
+
+
+def record_payment(student, items, payment_method, payment_date, collected_by=None,
+                   transaction_reference='', remarks='', income_particulars=None, installments_applied=False):
+    """
+    Create a completed payment with its items, ledger entries and Income row,
+    and apply the item amounts to the installments they reference.
+
+    ``items`` is a list of dicts with ``fee_category``, ``amount``, ``discount``,
+    ``late_fee``, ``description`` and an optional ``installment_id``. Pass
+    ``installments_applied`` when the caller has already written the amounts to
+    the installments (see ``record_allocated_payment``); the items then carry
+    the ``applied_amount`` they added.
+    """
+    total_amount = sum(item['amount'] for item in items)
+    total_discount = sum(item['discount'] for item in items)
+    total_late_fee = sum(item['late_fee'] for item in items)
+    net_amount = total_amount - total_discount + total_late_fee
+
+    payment = Payment.objects.create(
+        student=student,
+        total_amount=total_amount,
+        discount_amount=total_discount,
+        late_fee_amount=total_late_fee,
+        net_amount=net_amount,
+        payment_method=payment_method,
+        payment_date=payment_date,
+        transaction_reference=transaction_reference,
+        remarks=remarks,
+        payment_status='completed',
+        collected_by=collected_by,
+    )
+
+    # income saving to db
+    Income.objects.create(
+        perticulers=income_particulars or f"Fee payment of  {str(student.get_full_name())} against {remarks} by {payment_method}",
+        amount=net_amount,
+        bill_number=payment.payment_id,
+        date=payment_date,
+        payment=payment,
+    )
+
+    if installments_applied:
+        touched = {int(item['installment_id']) for item in items if item.get('installment_id')}
+    else:
+        touched = {installment.id for installment in apply_to_installments(items, payment_date)}
+
+    payment_items = []
+    ledger_entries = []
+    for item in items:
+        installment_id = int(item['installment_id']) if item.get('installment_id') else None
+        if installment_id not in touched:
+            installment_id, applied_amount = None, 0
+        elif installments_applied:
+            applied_amount = item['applied_amount']
+        else:
+            applied_amount = item['amount']
+        net_item_amount = item['amount'] - item['discount'] + item['late_fee']
+        payment_items.append(PaymentItem(
+            payment=payment,
+            fee_category=item['fee_category'],
+            installment_id=installment_id,
+            description=item['description'],
+            amount=item['amount'],
+            discount_amount=item['discount'],
+            late_fee=item['late_fee'],
+            net_amount=net_item_amount,
+            applied_amount=applied_amount,
+        ))
+        ledger_entries.append(StudentLedger(
+            student=student,
+            transaction_date=payment_date,
+            transaction_type='credit',
+            fee_category=item['fee_category'],
+            payment=payment,
+            amount=net_item_amount,
+            description=f"Payment - {item['description']}",
+            reference_number=payment.payment_id
+        ))
+
+    PaymentItem.objects.bulk_create(payment_items)
+    StudentLedger.objects.bulk_create(ledger_entries)
+
+    return payment
+
+
+def record_allocated_payment(student, amount, payment_method, payment_date, collected_by=None,
+                             transaction_reference='', remarks=''):
+    """
+    Record a lump-sum payment spread over the student's outstanding installments,
+    oldest due date first and late fees before principal. Whatever is left once
+    everything is settled is booked as an advance payment.
+    """
+    allocations, unallocated = allocate_payment(student, amount)
+    apply_allocations(allocations, payment_date)
+    advance = advance_category() if needs_advance_category(allocations, unallocated) else None
+    return record_payment(
+        student,
+        allocation_items(allocations, unallocated, advance),
+        payment_method=payment_method,
+        payment_date=payment_date,
+        collected_by=collected_by,
+        transaction_reference=transaction_reference,
+        remarks=remarks,
+        installments_applied=True,
+    )
+
+
+def apply_to_installments(items, payment_date):
+    """
+    Add each item's amount to the installment it references. The cashier form
+    fills in the installment's outstanding total (late fee included) as the
+    amount and shows the late fee beside it, so only the amount is credited.
+    All touched installments are locked in one query and written back in one statement.
+    """
+    paid_by_installment = defaultdict(lambda: 0)
+    for item in items:
+        if item.get('installment_id'):
+            paid_by_installment[int(item['installment_id'])] += item['amount']
+
+    if not paid_by_installment:
+        return []
+
+    installments = PaymentInstallment.objects.select_for_update().filter(
+        id__in=paid_by_installment.keys()
+    )
+    touched = []
+    for installment in installments:
+        installment.paid_amount += paid_by_installment[installment.id]
+        installment.paid_date = payment_date
+        installment.update_status()
+        touched.append(installment)
+
+    PaymentInstallment.objects.bulk_update(
+        touched, ['paid_amount', 'paid_date', 'status', 'is_overdue']
+    )
+    return touched
+
+
+def delete_payments(payment_ids):
+    """
+    Delete payments with their items and ledger rows, and take back off the
+    installments what the items added to them (``PaymentItem.applied_amount``).
+    Items recorded before that was stored carry no installment, so their
+    installments are left as they are.
+
+    Each step is one set-based statement whatever the number of payments:
+    the per-row delete signals are skipped and the account summaries are
+    refreshed once at the end. Returns a dict of the numbers of ``payments``,
+    ``items``, ``ledger_entries`` and ``installments`` touched.
+    """
+    payments = Payment.objects.filter(pk__in=list(payment_ids))
+    affected = list(payments.values_list('student_id', 'payment_date'))
+    if not affected:
+        return {'payments': 0, 'items': 0, 'ledger_entries': 0, 'installments': 0}
+    items = PaymentItem.objects.filter(payment__in=payments)
+    entries = StudentLedger.objects.filter(payment__in=payments)
+    decimal = DecimalField(max_digits=10, decimal_places=2)
+    zero = Value(Decimal('0'), output_field=decimal)
+
+    # Installments: what the items applied back off, completed ones re-opened
+    paid_back = Subquery(
+        items.filter(installment=OuterRef('pk')).order_by().values('installment')
+        .annotate(total=Sum('applied_amount')).values('total'),
+        output_field=decimal,
+    )
+    installment_ids = set(items.exclude(installment=None).values_list('installment_id', flat=True))
+    installments = PaymentInstallment.objects.filter(pk__in=installment_ids)
+    installments.update(paid_amount=Greatest(F('paid_amount') - Coalesce(paid_back, zero), zero))
+    # Status and overdue flag as the model works them out (due date included), written back at once
+    reopened = list(installments.only('id', 'amount', 'late_fee', 'paid_amount', 'due_date', 'status', 'is_overdue'))
+    for installment in reopened:
+        installment.update_status()
+    PaymentInstallment.objects.bulk_update(reopened, ['status', 'is_overdue'])
+
+    # Raw deletes skip the per-row signals; incomes keep their row with the link cleared
+    Income.objects.filter(payment__in=payments).update(payment=None)
+    counts = {
+        'ledger_entries': entries._raw_delete(entries.db),
+        'items': items._raw_delete(items.db),
+        'installments': len(installment_ids),
+    }
+    counts['payments'] = payments._raw_delete(payments.db)
+
+    schedule_summary_refresh(student_id for student_id, _ in affected)
+    for payment_date in {payment_date for _, payment_date in affected}:
+        invalidate_closed_month_summaries(payment_date)
+    return counts
+
+
+def sweep_overdue_installments(today=None, chunk_size=5000):
+    """
+    Mark past-due pending installments as overdue and charge the late fee of
+    their plan's fee structure where none has been charged yet.
+
+    Each id range of ``chunk_size`` rows is a single UPDATE in its own
+    transaction; the late fee percentage is joined in with a subquery, so no
+    installment is loaded into Python. Returns the number of rows updated.
+    """
+    today = today or timezone.now().date()
+
+    # The fee structure the installment's plan was made for
+    late_fee_percentage = Subquery(
+        FeeStructure.objects.filter(
+            fee_category__paymentplan=OuterRef('payment_plan_id'),
+            fee_category__paymentplan__academic_year=F('academic_year'),
+            is_active=True,
+        ).values('late_fee_percentage')[:1]
+    )
+    decimal = DecimalField(max_digits=10, decimal_places=2)
+    charged_fee = Round(F('amount') * late_fee_percentage / 100, 2, output_field=decimal)
+    late_fee = Case(
+        When(late_fee=0, then=Coalesce(charged_fee, Value(0, output_field=decimal))),
+        default=F('late_fee'),
+        output_field=decimal,
+    )
+
+    # Only rows the UPDATE changes, so a second run on the same day selects nothing
+    due = PaymentInstallment.objects.filter(
+        status__in=['pending', 'overdue'], due_date__lt=today
+    ).filter(
+        Q(status='pending') | Q(is_overdue=False) | (Q(late_fee=0) & Q(GreaterThan(charged_fee, 0)))
+    ).order_by()
+
+    bounds = due.aggregate(first=Min('id'), last=Max('id'))
+    if bounds['first'] is None:
+        return 0
+
+    updated = 0
+    for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+        chunk = due.filter(id__gte=start, id__lt=start + chunk_size)
+        with transaction.atomic():
+            # UPDATE bypasses the post_save receivers, refresh the summaries explicitly
+            schedule_summary_refresh(chunk.values_list('payment_plan__student_id', flat=True).distinct())
+            updated += chunk.update(status='overdue', is_overdue=True, late_fee=late_fee)
+    return updated
+
+
+def assign_payment_plans(students, academic_year, fee_category, template, created_by=None,
+                         dry_run=False, batch_size=500):
+    """
+    Give every student in ``students`` a payment plan built from ``template`` (a dict
+    with ``plan_type``, ``total_amount``, ``number_of_installments``,
+    ``installment_frequency``, ``start_date`` and ``session_type``).
+
+    Students who already have a plan for this academic year and fee category
+    are skipped. All plans share one schedule and are written with batched
+    inserts; with ``dry_run`` nothing is written. Returns a dict with the
+    ``created`` and ``skipped`` students and the ``schedule``. Raises
+    ``PlanConflictError`` when a concurrent request gave some of the students
+    a plan after they were checked.
+    """
+    students = list(students)
+    total_amount = Decimal(template['total_amount'])
+    schedule = build_schedule(
+        template['plan_type'], total_amount, template['number_of_installments'], template['start_date'],
+        installment_frequency=template.get('installment_frequency') or 30,
+        due_day=resolve_due_day(academic_year, fee_category),
+    )
+
+    existing = set(PaymentPlan.objects.filter(
+        student__in=[student.id for student in students],
+        academic_year=academic_year, fee_category=fee_category,
+    ).values_list('student_id', flat=True))
+    to_create = [student for student in students if student.id not in existing]
+    result = {
+        'created': to_create,
+        'skipped': [student for student in students if student.id in existing],
+        'schedule': schedule,
+    }
+    if dry_run or not to_create:
+        return result
+
+    # Same figures PaymentPlan.save() would compute, bulk_create does not call it
+    number_of_installments = len(schedule)
+    try:
+        # A savepoint, so the caller's transaction survives the unique_together violation
+        with transaction.atomic():
+            plans = PaymentPlan.objects.bulk_create([
+                PaymentPlan(
+                    student=student,
+                    plan_type=template['plan_type'],
+                    academic_year=academic_year,
+                    total_amount=total_amount,
+                    advance_amount=0,
+                    balance_amount=total_amount,
+                    number_of_installments=number_of_installments,
+                    installment_amount=(total_amount / number_of_installments).quantize(Decimal('0.01')),
+                    installment_frequency=template.get('installment_frequency') or 30,
+                    start_date=template['start_date'],
+                    fee_category=fee_category,
+                    session_type=template.get('session_type') or 'morning',
+                    status='active',
+                    created_by=created_by,
+                )
+                for student in to_create
+            ], batch_size=batch_size)
+    except IntegrityError:
+        conflicting = set(PaymentPlan.objects.filter(
+            student__in=[student.id for student in to_create],
+            academic_year=academic_year, fee_category=fee_category,
+        ).values_list('student_id', flat=True))
+        if not conflicting:
+            raise
+        raise PlanConflictError([student for student in to_create if student.id in conflicting])
+    create_plan_installments(plans, schedule)
+    return result
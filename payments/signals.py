@@ -0,0 +1,75 @@
+import threading
+from datetime import date
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Payment, PaymentItem, PaymentInstallment, PaymentPlan, StudentAccountSummary
+from .reports import invalidate_payment_summaries, is_closed_range
+
+_pending = threading.local()
+
+
+def schedule_summary_refresh(student_ids):
+    """
+    Refresh the account summaries of these students once the current transaction commits.
+    Several changes to the same student inside one transaction cause a single refresh.
+    """
+    student_ids = {student_id for student_id in student_ids if student_id}
+    if not student_ids:
+        return
+
+    pending = getattr(_pending, 'student_ids', None)
+    if pending is None:
+        pending = _pending.student_ids = set()
+    pending.update(student_ids)
+    # The first callback to run refreshes everything collected so far, later ones find the set empty
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    student_ids = getattr(_pending, 'student_ids', None)
+    _pending.student_ids = None
+    if student_ids:
+        StudentAccountSummary.refresh(student_ids)
+
+
+def invalidate_closed_month_summaries(payment_date):
+    """
+    Cached payment summaries of closed months are stale once a payment dated in one changes.
+    The generation is bumped when the current transaction commits, so no reader caches the
+    old totals again; several changes inside one transaction cause a single bump.
+    """
+    if not (isinstance(payment_date, date) and is_closed_range(payment_date)):
+        return
+    _pending.summaries_stale = True
+    # As with schedule_summary_refresh, the first callback to run bumps, later ones find nothing to do
+    transaction.on_commit(_flush_summaries)
+
+
+def _flush_summaries():
+    if getattr(_pending, 'summaries_stale', False):
+        _pending.summaries_stale = False
+        invalidate_payment_summaries()
+
+
+@receiver([post_save, post_delete], sender=Payment)
+def refresh_summary_on_payment_change(sender, instance, **kwargs):
+    schedule_summary_refresh([instance.student_id])
+    invalidate_closed_month_summaries(instance.payment_date)
+
+
+@receiver([post_save, post_delete], sender=PaymentItem)
+def refresh_summary_on_payment_item_change(sender, instance, **kwargs):
+    payment = Payment.objects.filter(pk=instance.payment_id).values('student_id', 'payment_date').first()
+    if payment:
+        schedule_summary_refresh([payment['student_id']])
+        invalidate_closed_month_summaries(payment['payment_date'])
+
+
+@receiver([post_save, post_delete], sender=PaymentInstallment)
+def refresh_summary_on_installment_change(sender, instance, **kwargs):
+    student_id = PaymentPlan.objects.filter(pk=instance.payment_plan_id).values_list('student_id', flat=True).first()
+    schedule_summary_refresh([student_id])
+
@@ -20,6 +20,7 @@ urlpatterns = [
     path('student/installment/marked/<int:pk>/',views.mark_as_paid,name="mark_as_paid"),
     # Payment plans
     path('plan/create/<uuid:student_id>/', views.create_payment_plan, name='create_payment_plan'),
+    path('plan/bulk-assign/', views.bulk_assign_payment_plans, name='bulk_assign_payment_plans'),
     path('plan/edit/<int:pk>/', views.edit_payment_plan, name='edit_payment_plan'),
     path('plan/delete/<int:pk>/', views.delete_payment_plan, name='delete_payment_plan'),
     path('installment/edit/<int:pk>/', views.edit_payment_installment, name='edit_payment_installment'),
@@ -35,10 +36,13 @@ urlpatterns = [
     
     # Bulk operations
     path('reminders/bulk/', views.bulk_payment_reminder, name='bulk_reminder'),
+    path('import/', views.import_bank_payments, name='import_bank_payments'),
     
     # AJAX endpoints
     path('ajax/fee-structure/', views.get_fee_structure_amount, name='get_fee_structure_amount'),
     path('ajax/validate-amount/', views.validate_payment_amount, name='validate_payment_amount'),
+    path('ajax/plan-schedule/', views.payment_plan_schedule_preview, name='payment_plan_schedule_preview'),
+    path('ajax/allocation-preview/', views.payment_allocation_preview, name='payment_allocation_preview'),
 
     #invoice 
     path('invoice/<int:payment_id>/', views.generate_invoice, name='generate_invoice'),
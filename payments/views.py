@@ -7,19 +7,37 @@ from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
-from django.db.models import Sum, Q, F
+from django.utils.dateparse import parse_date
+from django.db.models import Sum, F
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
+import uuid
 from django.db import models
 from home.decorators import unauthenticated_user, user_controls
+from home.pagination import KeysetPaginationMixin
+from home.search import ranked_search
 from django.utils.decorators import method_decorator
 from Finance.models import Income, Expense
 from .models import (
     Student, Payment, PaymentItem, FeeCategory, FeeStructure,
-    StudentFeeAssignment, PaymentPlan, PaymentInstallment, StudentLedger, PaymentReminder
+    StudentFeeAssignment, PaymentPlan, PaymentInstallment, StudentLedger, PaymentReminder,
+    StudentAccountSummary
 )
-from .forms import PaymentForm, PaymentPlanForm, PaymentPlanEditForm, PaymentInstallmentEditForm, PaymentInstallmentAddForm
+from .forms import PaymentForm, PaymentPlanForm, PaymentPlanEditForm, PaymentInstallmentEditForm, PaymentInstallmentAddForm, BulkPaymentPlanForm, PaymentImportForm
+from .services import (
+    PlanConflictError, assign_payment_plans, record_allocated_payment, record_payment, resolve_fee_categories,
+    sweep_overdue_installments,
+)
+from .schedules import CENT, build_schedule, create_installments, resolve_due_day, schedule_as_json
+from .reports import AGING_BUCKET_CHOICES, defaulter_page, payment_summary
+from .imports import ImportFileError, import_payments, read_rows
+from .allocation import allocate_payment, allocation_as_json
+
+DEFAULTER_PAGE_SIZE = 50
+IMPORT_REJECTED_SESSION_KEY = 'payment_import_rejected'
+# Rejected rows listed after an import; the rest are only counted
+IMPORT_REJECTED_SHOWN = 500
 
 # @method_decorator(user_controls, name='dispatch')
 class PaymentDashboardView(LoginRequiredMixin, ListView):
@@ -284,6 +302,32 @@ def create_payment(request):
                 transaction_reference = request.POST.get('transaction_reference', '')
                 remarks = request.POST.get('remarks', '')
                 
+                # Lump sum spread over the outstanding installments (confirmed from the allocation preview)
+                if request.POST.get('allocation_mode') == 'auto':
+                    try:
+                        amount = Decimal(request.POST.get('allocate_amount') or '0').quantize(CENT)
+                    except ArithmeticError:
+                        amount = Decimal('0')
+                    if amount <= 0:
+                        messages.error(request, 'Amount to allocate must be greater than zero.')
+                        return redirect('create_payment')
+                    
+                    payment = record_allocated_payment(
+                        student,
+                        amount,
+                        payment_method=payment_method,
+                        payment_date=payment_date,
+                        collected_by=request.user,
+                        transaction_reference=transaction_reference,
+                        remarks=remarks,
+                    )
+                    
+                    messages.success(request, 
+                        f'Payment {payment.payment_id} created successfully! '
+                        f'Total amount: ${payment.net_amount:.2f}')
+                    
+                    return redirect('payment_receipt', payment_id=payment.id)
+                
                 # Parse payment items
                 payment_items_json = request.POST.get('payment_items')
                 if not payment_items_json:
@@ -301,39 +345,43 @@ def create_payment(request):
                     return redirect('create_payment')
                 
                 # Validate payment items
-                valid_items = []
+                parsed_items = []
                 for item in payment_items:
                     try:
                         fee_category_id = int(item.get('fee_category_id', 0))
                         amount = float(item.get('amount', 0))
                         discount = float(item.get('discount', 0))
                         late_fee = float(item.get('late_fee', 0))
-                        
-                        if fee_category_id <= 0:
-                            continue
-                        if amount <= 0:
-                            continue
-                            
-                        # Verify fee category exists
-                        try:
-                            fee_category = FeeCategory.objects.get(id=fee_category_id)
-                        except FeeCategory.DoesNotExist:
-                            messages.error(request, f'Invalid fee category ID: {fee_category_id}')
-                            return redirect('create_payment')
-                        
-                        valid_items.append({
-                            'fee_category_id': fee_category_id,
-                            'fee_category': fee_category,
-                            'amount': Decimal(str(amount)),
-                            'discount': Decimal(str(discount)),
-                            'late_fee': Decimal(str(late_fee)),
-                            'description': item.get('description', fee_category.name),
-                            'installment_id': item.get('installment_id')  # Capture installment ID
-                        })
-                        
                     except (ValueError, TypeError) as e:
                         messages.error(request, f'Invalid payment item data: {str(e)}')
                         return redirect('create_payment')
+
+                    if fee_category_id <= 0:
+                        continue
+                    if amount <= 0:
+                        continue
+
+                    parsed_items.append((item, fee_category_id, amount, discount, late_fee))
+
+                # Verify all fee categories exist with a single query
+                fee_categories = resolve_fee_categories(entry[1] for entry in parsed_items)
+
+                valid_items = []
+                for item, fee_category_id, amount, discount, late_fee in parsed_items:
+                    fee_category = fee_categories.get(fee_category_id)
+                    if fee_category is None:
+                        messages.error(request, f'Invalid fee category ID: {fee_category_id}')
+                        return redirect('create_payment')
+
+                    valid_items.append({
+                        'fee_category_id': fee_category_id,
+                        'fee_category': fee_category,
+                        'amount': Decimal(str(amount)),
+                        'discount': Decimal(str(discount)),
+                        'late_fee': Decimal(str(late_fee)),
+                        'description': item.get('description', fee_category.name),
+                        'installment_id': item.get('installment_id')  # Capture installment ID
+                    })
                 
                 if not valid_items:
                     messages.error(request, 'No valid payment items found.')
@@ -349,64 +397,17 @@ def create_payment(request):
                     messages.error(request, 'Net payment amount must be greater than zero.')
                     return redirect('create_payment')
                 
-                # Create payment record
-                payment = Payment.objects.create(
-                    student=student,
-                    total_amount=total_amount,
-                    discount_amount=total_discount,
-                    late_fee_amount=total_late_fee,
-                    net_amount=net_amount,
+                # Create payment, income, items and ledger rows and update installments in batches
+                payment = record_payment(
+                    student,
+                    valid_items,
                     payment_method=payment_method,
                     payment_date=payment_date,
+                    collected_by=request.user,
                     transaction_reference=transaction_reference,
                     remarks=remarks,
-                    payment_status='completed',
-                    collected_by=request.user,
-                    created_at=timezone.now(),
-                    updated_at=timezone.now()
                 )
                 
-                #income saving to db
-                income = Income.objects.create(perticulers = f"Fee payment of  {str(student.get_full_name())} against {remarks} by {payment_method}", amount = net_amount,bill_number = payment.payment_id ,date = payment_date )
-                income.save()
-
-                
-                # Create payment items and update installments
-                for item in valid_items:
-                    PaymentItem.objects.create(
-                        payment=payment,
-                        fee_category=item['fee_category'],
-                        description=item['description'],
-                        amount=item['amount'],
-                        discount_amount=item['discount'],
-                        late_fee=item['late_fee'],
-                        net_amount=item['amount'] - item['discount'] + item['late_fee']
-                    )
-                    
-                    # Create ledger entry for each item
-                    net_item_amount = item['amount'] - item['discount'] + item['late_fee']
-                    StudentLedger.objects.create(
-                        student=student,
-                        transaction_date=payment_date,
-                        transaction_type='credit',
-                        fee_category=item['fee_category'],
-                        payment=payment,
-                        amount=net_item_amount,
-                        description=f"Payment - {item['description']}",
-                        reference_number=payment.payment_id
-                    )
-                    
-                    # Update related installment if exists
-                    if item.get('installment_id'):
-                        try:
-                            installment = PaymentInstallment.objects.get(id=item['installment_id'])
-                            installment.paid_amount += item['amount']
-                            installment.paid_date = payment_date
-                            installment.update_status()
-                            installment.save()
-                        except PaymentInstallment.DoesNotExist:
-                            pass
-                
                 messages.success(request, 
                     f'Payment {payment.payment_id} created successfully! '
                     f'Total amount: ${net_amount:.2f}')
@@ -422,8 +423,8 @@ def create_payment(request):
             return redirect('create_payment')
     
     # GET request - show the form
+    # Students are picked with the typeahead (students.search_students_ajax), not listed
     context = {
-        'students': Student.objects.filter(is_active=True).order_by('first_name', 'last_name'),
         'fee_categories': FeeCategory.objects.all().order_by('name'),
         'payment_methods': Payment.PAYMENT_METHOD_CHOICES,
         'today': timezone.now().date(),
@@ -523,23 +524,21 @@ def payment_receipt(request, payment_id):
     return render(request, 'payments/receipt.html', context)
 
 
-class PaymentListView(LoginRequiredMixin, ListView):
+class PaymentListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """List all payments with filtering options"""
     model = Payment
     template_name = 'payments/payment_list.html'
     context_object_name = 'payments'
     paginate_by = 50
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        queryset = Payment.objects.select_related('student', 'collected_by').order_by('-created_at')
+        queryset = Payment.objects.select_related('student', 'collected_by').order_by('-created_at', '-id')
         
         # Apply filters
         student_name = self.request.GET.get('student_name')
         if student_name:
-            queryset = queryset.filter(
-                Q(student__first_name__icontains=student_name) |
-                Q(student__last_name__icontains=student_name)
-            )
+            queryset = ranked_search(queryset, student_name, 'student__search_text')
         
         payment_method = self.request.GET.get('payment_method')
         if payment_method:
@@ -558,6 +557,12 @@ class PaymentListView(LoginRequiredMixin, ListView):
             queryset = queryset.filter(payment_date__lte=date_to)
         
         return queryset
+
+    def get_keyset_ordering(self):
+        # Search results are ordered by relevance and paginated by offset
+        if self.request.GET.get('student_name'):
+            return None
+        return super().get_keyset_ordering()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -568,17 +573,18 @@ class PaymentListView(LoginRequiredMixin, ListView):
         return context
 
 
-class PendingInstallmentListView(LoginRequiredMixin, ListView):
+class PendingInstallmentListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """List pending and overdue installments"""
     model = PaymentInstallment
     template_name = 'payments/pending_installments_list.html'
     context_object_name = 'installments'
     paginate_by = 50
+    keyset_ordering = ('due_date', 'id')
 
     def get_queryset(self):
         queryset = PaymentInstallment.objects.select_related('payment_plan__student').filter(
             status__in=['pending', 'overdue', 'partially_paid']
-        ).order_by('due_date')
+        ).order_by('due_date', 'id')
 
         # Filter mode
         mode = self.request.GET.get('mode')
@@ -602,14 +608,16 @@ class PendingInstallmentListView(LoginRequiredMixin, ListView):
         # Student search
         search = self.request.GET.get('search')
         if search:
-             queryset = queryset.filter(
-                Q(payment_plan__student__first_name__icontains=search) |
-                Q(payment_plan__student__last_name__icontains=search) |
-                Q(payment_plan__student__student_id__icontains=search)
-            )
+            queryset = ranked_search(queryset, search, 'payment_plan__student__search_text')
 
         return queryset
 
+    def get_keyset_ordering(self):
+        # Search results are ordered by relevance and paginated by offset
+        if self.request.GET.get('search'):
+            return None
+        return super().get_keyset_ordering()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['mode'] = self.request.GET.get('mode', 'all')
@@ -665,6 +673,7 @@ def create_payment_plan(request, student_id):
                 installment_amount = balance_amount / number_of_installments if number_of_installments > 0 else balance_amount
                 
                 # Custom Installments Logic
+                custom_installments = None
                 if plan_type == 'custom':
                     custom_installments_json = request.POST.get('custom_installments')
                     if not custom_installments_json:
@@ -675,18 +684,18 @@ def create_payment_plan(request, student_id):
                     except json.JSONDecodeError:
                          raise ValueError("Invalid custom installments data")
                          
-                    if not custom_installments:
-                         raise ValueError("At least one installment is required")
-                         
-                    # Verify total amount matches
-                    installments_total = sum(Decimal(str(inst['amount'])) for inst in custom_installments)
-                    if abs(installments_total - balance_amount) > Decimal('0.01'):
-                         raise ValueError(f"Sum of installments ({installments_total}) must match balance amount ({balance_amount})")
-                         
-                    number_of_installments = len(custom_installments)
                     installment_amount = 0 # Variable for plan model, though individual installments differ
                     installment_frequency = 0 # Not applicable for custom
 
+                # Whole schedule is computed up front (validates custom installments too)
+                schedule = build_schedule(
+                    plan_type, balance_amount, number_of_installments, start_date,
+                    installment_frequency=installment_frequency,
+                    due_day=resolve_due_day(academic_year, fee_category),
+                    custom_installments=custom_installments,
+                )
+                number_of_installments = len(schedule)
+
                 # Create payment plan
                 session_type = request.POST.get('session_type', 'morning')
                 registration_fee_included = request.POST.get('registration_fee_included') == 'on'
@@ -743,7 +752,8 @@ def create_payment_plan(request, student_id):
                             perticulers=f"Registration Fee of {student.get_full_name()}",
                             amount=reg_fee_amount,
                             bill_number=reg_payment.payment_id,
-                            date=reg_payment.payment_date
+                            date=reg_payment.payment_date,
+                            payment=reg_payment,
                         )
 
                 
@@ -765,7 +775,7 @@ def create_payment_plan(request, student_id):
                     )
                     
                     #income saving to db
-                    Income.objects.create(perticulers = f"Advance payment of  {str(student.get_full_name())} against {fee_category.name if fee_category else 'fees'}", amount = advance_amount,bill_number = advance_payment.payment_id ,date = start_date )
+                    Income.objects.create(perticulers = f"Advance payment of  {str(student.get_full_name())} against {fee_category.name if fee_category else 'fees'}", amount = advance_amount,bill_number = advance_payment.payment_id ,date = start_date, payment = advance_payment)
 
 
                     # Create payment item for advance
@@ -780,44 +790,7 @@ def create_payment_plan(request, student_id):
                     )
                 
                 # Create installments
-                if plan_type == 'custom':
-                    for i, inst_data in enumerate(custom_installments):
-                         PaymentInstallment.objects.create(
-                            payment_plan=payment_plan,
-                            installment_number=i + 1,
-                            due_date=inst_data['date'],
-                            amount=Decimal(str(inst_data['amount'])),
-                            status='pending'
-                        )
-                else:
-                    # Logic for auto-generated installments
-                    current_date = start_date
-                    for i in range(number_of_installments):
-                        PaymentInstallment.objects.create(
-                            payment_plan=payment_plan,
-                            installment_number=i + 1,
-                            due_date=current_date,
-                            amount=installment_amount,
-                            status='pending'
-                        )
-                        
-                        # Calculate next due date based on frequency or plan type
-                        if plan_type == 'weekly':
-                            current_date += timedelta(weeks=1)
-                        elif plan_type == 'monthly': # Monthly
-                             # Add a month logic roughly or strict
-                             import calendar
-                             month = current_date.month - 1 + 1
-                             year = current_date.year + month // 12
-                             month = month % 12 + 1
-                             day = min(current_date.day, calendar.monthrange(year,month)[1])
-                             current_date = current_date.replace(year=year, month=month, day=day)
-                        elif plan_type == 'quarterly' or plan_type == '3_months':
-                             current_date += timedelta(days=90) # Approx
-                        elif plan_type == '6_months':
-                             current_date += timedelta(days=180) # Approx
-                        else:
-                             current_date += timedelta(days=installment_frequency)
+                create_installments(payment_plan, schedule)
                 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                     return JsonResponse({
@@ -884,20 +857,17 @@ def student_payment_details(request, student_id):
         status__in=['pending', 'overdue', 'partially_paid']
     ).order_by('due_date')
     
-    # Calculate totals
-    total_paid = payments.filter(payment_status='completed').aggregate(
-        Sum('net_amount')
-    )['net_amount__sum'] or 0
-    
-    total_outstanding = sum(inst.get_outstanding_amount() for inst in outstanding_installments)
+    # Totals are kept current in the account summary
+    summary = StudentAccountSummary.for_student(student)
     
     context = {
         'student': student,
         'payment_plans': payment_plans,
         'payments': payments,
         'outstanding_installments': outstanding_installments,
-        'total_paid': total_paid,
-        'total_outstanding': total_outstanding,
+        'total_paid': summary.total_paid,
+        'total_outstanding': summary.outstanding,
+        'account_summary': summary,
     }
     
     return render(request, 'payments/student_payment_details.html', context)
@@ -910,21 +880,14 @@ def overdue_payments_report(request):
         status='overdue'
     ).select_related('payment_plan__student').order_by('due_date')
     
-    # Calculate late fees and update status
-    for installment in overdue_installments:
-        if installment.late_fee == 0:  # Calculate late fee if not already calculated
-            days_overdue = (timezone.now().date() - installment.due_date).days
-            if days_overdue > 0:
-                # Get late fee percentage from fee structure
-                fee_assignment = installment.payment_plan.student.fee_assignments.first()
-                if fee_assignment:
-                    late_fee_percentage = fee_assignment.fee_structure.late_fee_percentage
-                    installment.late_fee = installment.amount * (late_fee_percentage / 100)
-                    installment.save()
+    # Statuses and late fees are maintained by sweep_overdue_installments, this view only reads
+    totals = overdue_installments.aggregate(
+        total_overdue_amount=Sum(F('amount') + F('late_fee') - F('paid_amount'))
+    )
     
     context = {
         'overdue_installments': overdue_installments,
-        'total_overdue_amount': sum(inst.get_outstanding_amount() for inst in overdue_installments),
+        'total_overdue_amount': totals['total_overdue_amount'] or 0,
     }
     
     return render(request, 'payments/overdue_report.html', context)
@@ -937,41 +900,16 @@ def payment_summary_report(request):
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
     
-    # Base queryset
-    payments = Payment.objects.filter(payment_status='completed')
-    
-    if date_from:
-        payments = payments.filter(payment_date__gte=date_from)
-    if date_to:
-        payments = payments.filter(payment_date__lte=date_to)
-    
-    # Summary statistics
-    total_payments = payments.count()
-    total_amount = payments.aggregate(Sum('net_amount'))['net_amount__sum'] or 0
-    total_discount = payments.aggregate(Sum('discount_amount'))['discount_amount__sum'] or 0
-    total_late_fees = payments.aggregate(Sum('late_fee_amount'))['late_fee_amount__sum'] or 0
-    
-    # Payment method breakdown
-    payment_method_summary = payments.values('payment_method').annotate(
-        count=models.Count('id'),
-        total=Sum('net_amount')
-    ).order_by('payment_method')
-    
-    # Daily collection summary
-    daily_summary = payments.values('payment_date').annotate(
-        count=models.Count('id'),
-        total=Sum('net_amount')
-    ).order_by('-payment_date')[:30]
+    # Totals and all breakdowns come from one grouped query, cached for closed months
+    summary = payment_summary(
+        date_from=parse_date(date_from) if date_from else None,
+        date_to=parse_date(date_to) if date_to else None,
+    )
     
     context = {
         'date_from': date_from,
         'date_to': date_to,
-        'total_payments': total_payments,
-        'total_amount': total_amount,
-        'total_discount': total_discount,
-        'total_late_fees': total_late_fees,
-        'payment_method_summary': payment_method_summary,
-        'daily_summary': daily_summary,
+        **summary,
     }
     
     return render(request, 'payments/payment_summary_report.html', context)
@@ -980,26 +918,35 @@ def payment_summary_report(request):
 @unauthenticated_user
 def defaulter_report(request):
     """Generate defaulter report"""
-    # Get students with overdue payments
-    overdue_students = Student.objects.filter(
-        payment_plans__installments__status='overdue'
-    ).distinct().annotate(
-        overdue_amount=Sum(
-            F('payment_plans__installments__amount') + 
-            F('payment_plans__installments__late_fee') - 
-            F('payment_plans__installments__paid_amount'),
-            filter=Q(payment_plans__installments__status='overdue')
-        ),
-        overdue_count=models.Count(
-            'payment_plans__installments',
-            filter=Q(payment_plans__installments__status='overdue')
-        )
-    ).order_by('-overdue_amount')
-    
+    aging = request.GET.get('aging', '')
+    today = timezone.now().date()
+
+    # Rows, grand totals and the keyset page come from one query over the summary table
+    rows, totals, next_cursor, previous_cursor = defaulter_page(
+        after=request.GET.get('after'), before=request.GET.get('before'), aging=aging,
+        page_size=DEFAULTER_PAGE_SIZE, today=today,
+    )
+
+    students = Student.objects.select_related('class_room').in_bulk([row.student_id for row in rows])
+    defaulter_students = []
+    for row in rows:
+        student = students.get(row.student_id)
+        if student is None:
+            continue
+        student.overdue_amount = row.overdue_amount
+        student.overdue_count = row.overdue_count
+        student.oldest_due_date = row.next_due_date
+        student.days_overdue = (today - row.next_due_date).days if row.next_due_date else None
+        defaulter_students.append(student)
+
     context = {
-        'defaulter_students': overdue_students,
-        'total_defaulters': overdue_students.count(),
-        'total_overdue_amount': sum(s.overdue_amount or 0 for s in overdue_students),
+        'defaulter_students': defaulter_students,
+        'total_defaulters': totals['total_defaulters'],
+        'total_overdue_amount': totals['total_overdue_amount'],
+        'aging': aging,
+        'aging_buckets': AGING_BUCKET_CHOICES,
+        'next_cursor': next_cursor,
+        'previous_cursor': previous_cursor,
     }
     
     return render(request, 'payments/defaulter_report.html', context)
@@ -1090,21 +1037,9 @@ def export_payment_data(request):
 
 def calculate_student_balance(student):
     """Calculate current balance for a student"""
-    # Get all completed payments
-    total_paid = Payment.objects.filter(
-        student=student,
-        payment_status='completed'
-    ).aggregate(Sum('net_amount'))['net_amount__sum'] or 0
-    
-    # Get total outstanding installments
-    total_outstanding = PaymentInstallment.objects.filter(
-        payment_plan__student=student,
-        status__in=['pending', 'overdue', 'partially_paid']
-    ).aggregate(
-        total=Sum(
-            F('amount') + F('late_fee') - F('paid_amount')
-        )
-    )['total'] or 0
+    summary = StudentAccountSummary.for_student(student)
+    total_paid = summary.total_paid
+    total_outstanding = summary.outstanding
     
     return {
         'total_paid': total_paid,
@@ -1115,26 +1050,7 @@ def calculate_student_balance(student):
 
 def update_overdue_installments():
     """Update overdue installments and calculate late fees"""
-    today = timezone.now().date()
-    
-    # Get pending installments that are past due date
-    pending_installments = PaymentInstallment.objects.filter(
-        due_date__lt=today,
-        status='pending'
-    )
-    
-    for installment in pending_installments:
-        installment.status = 'overdue'
-        installment.is_overdue = True
-        
-        # Calculate late fee if not already calculated
-        if installment.late_fee == 0:
-            fee_assignment = installment.payment_plan.student.fee_assignments.first()
-            if fee_assignment:
-                late_fee_percentage = fee_assignment.fee_structure.late_fee_percentage
-                installment.late_fee = installment.amount * (late_fee_percentage / 100)
-        
-        installment.save()
+    return sweep_overdue_installments()
 
 
 @unauthenticated_user
@@ -1197,6 +1113,73 @@ def get_fee_structure_amount(request):
         return JsonResponse({'error': 'Fee structure not found'}, status=404)
 
 
+@unauthenticated_user
+def payment_plan_schedule_preview(request):
+    """Preview the installment schedule of the plan being filled in"""
+    # Either may be blank while the form is being filled in; the due day then stays unknown
+    try:
+        academic_year = int(request.GET.get('academic_year') or 0) or None
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Invalid academic year'}, status=400)
+    try:
+        fee_category = int(request.GET.get('fee_category') or 0) or None
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Invalid fee category'}, status=400)
+
+    try:
+        total_amount = Decimal(request.GET.get('total_amount') or '0')
+        advance_amount = Decimal(request.GET.get('advance_amount') or '0')
+        plan_type = request.GET.get('plan_type', 'monthly')
+        start_date = datetime.strptime(request.GET.get('start_date', ''), '%Y-%m-%d').date()
+        custom_installments = None
+        if plan_type == 'custom':
+            custom_installments = json.loads(request.GET.get('custom_installments') or '[]')
+
+        schedule = build_schedule(
+            plan_type, total_amount - advance_amount,
+            request.GET.get('number_of_installments') or 1, start_date,
+            installment_frequency=request.GET.get('installment_frequency') or 30,
+            due_day=resolve_due_day(academic_year, fee_category),
+            custom_installments=custom_installments,
+        )
+    except ArithmeticError:
+        return JsonResponse({'success': False, 'message': 'Invalid amount'}, status=400)
+    except (ValueError, TypeError, KeyError) as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'installments': schedule_as_json(schedule),
+        'total': str(sum(entry.amount for entry in schedule)),
+    })
+
+
+@unauthenticated_user
+def payment_allocation_preview(request):
+    """Preview how a lump sum would be spread over a student's outstanding installments"""
+    try:
+        student_id = uuid.UUID(request.GET.get('student_id') or '')
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Invalid student'}, status=400)
+    student = Student.objects.filter(pk=student_id).first()
+    if student is None:
+        return JsonResponse({'success': False, 'message': 'Student not found'}, status=404)
+    try:
+        amount = Decimal(request.GET.get('amount') or '0').quantize(CENT)
+    except ArithmeticError:
+        return JsonResponse({'success': False, 'message': 'Invalid amount'}, status=400)
+    if amount <= 0:
+        return JsonResponse({'success': False, 'message': 'Amount must be greater than zero'}, status=400)
+
+    # Read only: the split is worked out again under lock when the payment is saved
+    allocations, unallocated = allocate_payment(student, amount, lock=False)
+    return JsonResponse({
+        'success': True,
+        'amount': str(amount),
+        **allocation_as_json(allocations, unallocated),
+    })
+
+
 @unauthenticated_user
 def validate_payment_amount(request):
     """Validate payment amount against outstanding balance"""
@@ -1325,6 +1308,94 @@ def generate_invoice_quick(request, payment_id):
 
 
 @csrf_protect
+@unauthenticated_user
+def bulk_assign_payment_plans(request):
+    """Create the same payment plan for every active student of a class (preview first)"""
+    form = BulkPaymentPlanForm(request.POST or None)
+    result = None
+    
+    if request.method == 'POST' and form.is_valid():
+        data = form.cleaned_data
+        students = Student.objects.filter(
+            class_room=data['class_room'], is_active=True
+        ).order_by('first_name', 'last_name')
+        dry_run = request.POST.get('action') != 'apply'
+        
+        try:
+            with transaction.atomic():
+                result = assign_payment_plans(
+                    students, data['academic_year'], data['fee_category'], data,
+                    created_by=request.user, dry_run=dry_run,
+                )
+        except PlanConflictError as e:
+            messages.error(request, f'No payment plans were created. {e}. Submit again to assign the others.')
+        except ValueError as e:
+            messages.error(request, f'Error creating payment plans: {str(e)}')
+        else:
+            if not dry_run:
+                messages.success(
+                    request,
+                    f"{len(result['created'])} payment plan(s) created for {data['class_room']}, "
+                    f"{len(result['skipped'])} student(s) already had one."
+                )
+                return redirect('payment_dashboard')
+    
+    context = {
+        'form': form,
+        'result': result,
+    }
+    return render(request, 'payments/bulk_assign_plans.html', context)
+
+
+@csrf_protect
+@unauthenticated_user
+def import_bank_payments(request):
+    """Import a bank-transfer or card settlement statement (preview first)"""
+    form = PaymentImportForm(request.POST or None, request.FILES or None)
+    result = None
+    # Rows the last import rejected, kept across the redirect that follows it
+    rejected = request.session.pop(IMPORT_REJECTED_SESSION_KEY, None) if request.method == 'GET' else None
+    
+    if request.method == 'POST' and form.is_valid():
+        statement = form.cleaned_data['statement']
+        dry_run = request.POST.get('action') != 'apply'
+        
+        try:
+            result = import_payments(
+                read_rows(statement, statement.name), dry_run=dry_run, collected_by=request.user
+            )
+        except ImportFileError as e:
+            messages.error(request, str(e))
+        else:
+            if not dry_run:
+                messages.success(
+                    request,
+                    f"{len(result.imported)} payment(s) imported totalling AED {result.total_amount:,.2f}, "
+                    f"{len(result.errors)} row(s) rejected."
+                )
+                request.session[IMPORT_REJECTED_SESSION_KEY] = [
+                    {
+                        'row_number': row.row_number,
+                        'student': row.student.get_full_name() if row.student else row.student_key,
+                        'transaction_reference': row.transaction_reference,
+                        'payment_date': row.payment_date.isoformat() if row.payment_date else '',
+                        'amount': str(row.amount) if row.amount is not None else '',
+                        'error': row.error,
+                    }
+                    for row in result.errors[:IMPORT_REJECTED_SHOWN]
+                ]
+                # A reload must not post the statement again
+                return redirect('import_bank_payments')
+    
+    context = {
+        'form': form,
+        'result': result,
+        'rejected': rejected,
+        'rejected_shown': IMPORT_REJECTED_SHOWN,
+    }
+    return render(request, 'payments/import_payments.html', context)
+
+
 @unauthenticated_user
 def edit_payment_plan(request, pk):
     """Edit an existing payment plan"""
@@ -0,0 +1,121 @@
+"""
+Changes applied to many students at once from the student list.
+
+Status, class and (de)activation changes are one UPDATE statement over the
+selected students; deletes run in batches through the ORM so the cascades
+(documents, notes, payment plans, payments, ledger) and their signals behave
+as for a single delete. Each call runs in one transaction and records a
+``StudentAuditLog`` entry with the affected row counts.
+"""
+import logging
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from home.models import ClassRooms
+from . import stats, typeahead
+from .models import Student, StudentAuditLog
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = 500
+PHOTO_FIELDS = ('child_photo', 'father_photo', 'mother_photo')
+
+BULK_ACTIONS = [
+    ('status', 'Change status'),
+    ('class', 'Move to class'),
+    ('activate', 'Activate'),
+    ('deactivate', 'Deactivate'),
+    ('delete', 'Delete'),
+]
+
+# The same changes as enable_student / disable_student
+ACTIVATE = {'is_active': True, 'status': 'enrolled'}
+DEACTIVATE = {'is_active': False, 'status': 'withdrawn'}
+
+
+class BulkActionError(ValueError):
+    pass
+
+
+def _changes(action, value):
+    if action == 'status':
+        if value not in dict(Student.STATUS_CHOICES):
+            raise BulkActionError("Select a valid status.")
+        return {'status': value}
+    if action == 'class':
+        # An empty value takes the students out of their class
+        if not value:
+            return {'class_room': None}
+        class_room = ClassRooms.objects.filter(pk=value).first() if str(value).isdigit() else None
+        if class_room is None:
+            raise BulkActionError("Select a valid class.")
+        return {'class_room': class_room}
+    if action == 'activate':
+        return dict(ACTIVATE)
+    if action == 'deactivate':
+        return dict(DEACTIVATE)
+    raise BulkActionError("Unknown bulk action.")
+
+
+def _delete(student_ids):
+    """Delete in batches; returns the deleted rows per model, cascades included"""
+    affected = {}
+    photos = []
+    for start in range(0, len(student_ids), DELETE_BATCH_SIZE):
+        students = Student.objects.filter(pk__in=student_ids[start:start + DELETE_BATCH_SIZE])
+        for names in students.values_list(*PHOTO_FIELDS):
+            photos += [(field, name) for field, name in zip(PHOTO_FIELDS, names) if name]
+        _, counts = students.delete()
+        for label, count in counts.items():
+            affected[label] = affected.get(label, 0) + count
+
+    def remove_photos():
+        for field, name in photos:
+            Student._meta.get_field(field).storage.delete(name)
+
+    # The files go only once the rows are gone for good
+    transaction.on_commit(remove_photos)
+    return affected
+
+
+def apply_bulk_action(action, student_ids, value='', user=None):
+    """
+    Apply ``action`` (see ``BULK_ACTIONS``) to the students with these pks.
+    Returns the audit entry; ``entry.affected`` holds the changed row counts,
+    ``students.Student`` being the number of students changed.
+    """
+    try:
+        student_ids = list(dict.fromkeys(str(uuid.UUID(str(pk))) for pk in student_ids if pk))
+    except ValueError:
+        raise BulkActionError("Invalid student selection.")
+    if not student_ids:
+        raise BulkActionError("No students were selected.")
+
+    with transaction.atomic():
+        if action == 'delete':
+            affected = _delete(student_ids)
+        else:
+            changes = _changes(action, value)
+            updated = Student.objects.filter(pk__in=student_ids).update(updated_at=timezone.now(), **changes)
+            affected = {Student._meta.label: updated}
+        affected.setdefault(Student._meta.label, 0)
+
+        entry = StudentAuditLog.objects.create(
+            action=action,
+            value='' if action in ('delete', 'activate', 'deactivate') else str(value or ''),
+            student_ids=student_ids,
+            affected=affected,
+            performed_by=user if user is not None and user.is_authenticated else None,
+        )
+        # update() skips the signals that keep these current; deletes sent them already
+        if action != 'delete':
+            typeahead.schedule_invalidate()
+            stats.schedule_invalidate()
+
+    logger.info(
+        "Bulk %s%s on %d selected students by %s: %s", action, f" ({value})" if entry.value else '',
+        len(student_ids), entry.performed_by or 'anonymous', affected,
+    )
+    return entry
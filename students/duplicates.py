@@ -0,0 +1,149 @@
+"""
+Finding students registered twice.
+
+Every student stores a ``duplicate_key`` built from the first and last name:
+the words are case-folded and transliterated to plain Latin letters (accents
+stripped, Arabic script spelled out), the article "al"/"el" is dropped (also
+when written joined to the name), and each word is reduced to its Soundex
+code. The codes are sorted, so the key ignores spelling variants that sound
+alike (Mohammed / Muhammad, Yousef / Yusuf, Aisha / Ayesha), the name order
+(first and last name swapped) and how "Al Mansoori" is written. A composite
+index on (duplicate_key, date_of_birth) serves the lookup of likely
+duplicates of one student and the GROUP BY behind the batch report of all
+likely duplicates.
+"""
+from datetime import date
+
+from django.db.models import Count
+
+from home.search import normalize
+
+# Arabic letters spelled out; short vowels are not written, so neither are they here
+ARABIC_LETTERS = {
+    'ا': 'a', 'أ': 'a', 'إ': 'i', 'آ': 'a', 'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j',
+    'ح': 'h', 'خ': 'kh', 'د': 'd', 'ذ': 'dh', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh',
+    'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh', 'ف': 'f', 'ق': 'q',
+    'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h', 'و': 'w', 'ي': 'y', 'ى': 'a',
+    'ة': 'a', 'ء': '', 'ؤ': '', 'ئ': '',
+}
+# Latin letters NFKD does not take apart
+LATIN_LETTERS = {'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ł': 'l', 'đ': 'd', 'ı': 'i', 'þ': 'th'}
+PARTICLES = {'al', 'el'}
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def transliterate(text):
+    """Lowercase Latin letters and spaces only"""
+    # The Arabic article is written joined to the name
+    words = [f'al {word[2:]}' if word.startswith('ال') and len(word) > 2 else word for word in (text or '').split()]
+    text = normalize(' '.join(words))
+    text = ''.join(ARABIC_LETTERS.get(char, LATIN_LETTERS.get(char, char)) for char in text)
+    return ''.join(char if 'a' <= char <= 'z' else ' ' for char in text)
+
+
+def name_words(*names):
+    words = []
+    for word in transliterate(' '.join(name or '' for name in names)).split():
+        if word in PARTICLES:
+            continue
+        # "Almansoori" written as one word
+        if word.startswith('al') and len(word) >= 6:
+            word = word[2:]
+        words.append(word)
+    return words
+
+
+def soundex(word):
+    """The four-character American Soundex code of a lowercase word"""
+    code, previous = word[0].upper(), SOUNDEX_CODES.get(word[0])
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters of the same code, vowels do
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def duplicate_key(first_name, last_name):
+    """The stored key: the sorted Soundex codes of the name words"""
+    return ' '.join(sorted(soundex(word) for word in name_words(first_name, last_name)))[:100]
+
+
+def _swapped_date(day):
+    """The date with day and month exchanged, a common slip when typing dates"""
+    try:
+        swapped = date(day.year, day.day, day.month)
+    except ValueError:
+        return None
+    return swapped if swapped != day else None
+
+
+def _codes(name):
+    return [soundex(word) for word in name_words(name)]
+
+
+def _match(first_name, last_name, student):
+    if name_words(first_name, last_name) == name_words(student.first_name, student.last_name):
+        return 'same name'
+    if _codes(first_name) == _codes(student.first_name) and _codes(last_name) == _codes(student.last_name):
+        return 'similar spelling'
+    return 'name order swapped'
+
+
+def duplicate_candidates(first_name, last_name, date_of_birth, exclude=None, limit=10):
+    """
+    Students that are likely the same child: the same key and date of birth
+    (or the birth date with day and month swapped). Each carries ``match``,
+    why it was picked; exact name matches come first.
+    """
+    from .models import Student
+
+    key = duplicate_key(first_name, last_name)
+    if not key or not date_of_birth:
+        return []
+    dates = [day for day in (date_of_birth, _swapped_date(date_of_birth)) if day]
+
+    students = Student.objects.filter(duplicate_key=key, date_of_birth__in=dates).select_related('class_room')
+    if exclude is not None:
+        students = students.exclude(pk=exclude)
+    candidates = list(students.order_by('created_at')[:limit])
+    for student in candidates:
+        student.match = _match(first_name, last_name, student)
+        if student.date_of_birth != date_of_birth:
+            student.match += ', day and month of birth swapped'
+    order = {'same name': 0, 'name order swapped': 1}
+    candidates.sort(key=lambda student: order.get(student.match, 2))
+    return candidates
+
+
+def duplicate_groups(queryset=None):
+    """
+    Every set of students sharing a key and date of birth, largest first:
+    one grouped query for the sets, one for their students.
+    """
+    from .models import Student
+
+    queryset = Student.objects.all() if queryset is None else queryset
+    groups = queryset.exclude(duplicate_key='').values('duplicate_key', 'date_of_birth').annotate(
+        students=Count('pk')
+    ).filter(students__gt=1).order_by('-students', 'duplicate_key', 'date_of_birth')
+    groups = {(group['duplicate_key'], group['date_of_birth']): [] for group in groups}
+    if not groups:
+        return []
+
+    members = queryset.filter(
+        duplicate_key__in={key for key, _ in groups}, date_of_birth__in={day for _, day in groups}
+    ).select_related('class_room').order_by('created_at')
+    for student in members:
+        group = groups.get((student.duplicate_key, student.date_of_birth))
+        if group is not None:
+            group.append(student)
+    return list(groups.values())
@@ -0,0 +1,182 @@
+"""
+Exporting the filtered student list as CSV or XLSX.
+
+The caller picks column sets (profile, parents, emergency contacts, class);
+the student ID and name always come first. Only the chosen columns are read,
+as tuples from ``values_list().iterator()`` in chunks, so exporting the whole
+register never builds Student instances. CSV rows are streamed to the client
+as they are read. An XLSX workbook can only be sent once it is complete, so it
+is written row by row by openpyxl's write-only mode into a temporary file,
+which is then streamed.
+
+Typed-in text that a spreadsheet would run as a formula is kept inert: in CSV
+with a leading apostrophe, in XLSX by writing it as a string cell.
+"""
+import csv
+import re
+import tempfile
+from datetime import datetime
+
+from django.utils import timezone
+
+from .models import Student
+
+EXPORT_CHUNK_SIZE = 2000
+
+IDENTITY_COLUMNS = (
+    ('student_id', 'Student ID'),
+    ('first_name', 'First Name'),
+    ('last_name', 'Last Name'),
+)
+COLUMN_SETS = {
+    'profile': (
+        ('family_name', 'Family Name'),
+        ('gender', 'Gender'),
+        ('date_of_birth', 'Date of Birth'),
+        ('nationality', 'Nationality'),
+        ('religion', 'Religion'),
+        ('languages_spoken', 'Languages Spoken'),
+        ('email', 'Email'),
+        ('phone_number', 'Phone'),
+        ('full_home_address', 'Home Address'),
+        ('city', 'City'),
+        ('status', 'Status'),
+        ('is_active', 'Active'),
+        ('created_at', 'Created'),
+    ),
+    'parents': (
+        ('father_name', 'Father Name'),
+        ('father_nationality', 'Father Nationality'),
+        ('father_mobile', 'Father Mobile'),
+        ('father_email', 'Father Email'),
+        ('father_place_of_work', 'Father Place of Work'),
+        ('mother_name', 'Mother Name'),
+        ('mother_nationality', 'Mother Nationality'),
+        ('mother_mobile', 'Mother Mobile'),
+        ('mother_email', 'Mother Email'),
+        ('mother_place_of_work', 'Mother Place of Work'),
+        ('home_telephone', 'Home Telephone'),
+    ),
+    'emergency': (
+        ('first_contact_person', 'First Contact'),
+        ('first_contact_relationship', 'First Contact Relationship'),
+        ('first_contact_telephone', 'First Contact Telephone'),
+        ('second_contact_person', 'Second Contact'),
+        ('second_contact_relationship', 'Second Contact Relationship'),
+        ('second_contact_telephone', 'Second Contact Telephone'),
+    ),
+    'class': (
+        ('class_room__class_name', 'Class'),
+        ('year_of_admission', 'Year of Admission'),
+        ('days_per_week', 'Days per Week'),
+        ('hours_required', 'Hours Required'),
+        ('date_start', 'Start Date'),
+        ('date_end', 'End Date'),
+    ),
+}
+COLUMN_SET_CHOICES = [
+    ('profile', 'Profile'),
+    ('parents', 'Parents'),
+    ('emergency', 'Emergency contacts'),
+    ('class', 'Class'),
+]
+DEFAULT_COLUMN_SETS = ('profile',)
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# CSV text starting with these is run as a formula by spreadsheet programs
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# ... unless it is a phone number or a number such as "+971 50 123 4567" or "-5"
+PHONE_OR_NUMBER = re.compile(r'[+-]?[\d\s().\-/]+')
+
+# Stored codes written as their labels
+DISPLAY_VALUES = {
+    'gender': dict(Student.GENDER_CHOICES),
+    'status': dict(Student.STATUS_CHOICES),
+    'days_per_week': dict(Student.DAYS_CHOICES),
+}
+
+
+def export_columns(column_sets):
+    """(field, header) pairs of the chosen column sets, in ``COLUMN_SET_CHOICES`` order"""
+    chosen = [name for name, _ in COLUMN_SET_CHOICES if name in column_sets] or list(DEFAULT_COLUMN_SETS)
+    return list(IDENTITY_COLUMNS) + [column for name in chosen for column in COLUMN_SETS[name]]
+
+
+def export_rows(queryset, columns):
+    """The rows of ``queryset`` as tuples of the columns' values, read in chunks"""
+    fields = [field for field, _ in columns]
+    displays = [DISPLAY_VALUES.get(field) for field in fields]
+    values = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in values:
+        yield tuple(
+            _cell(display.get(value, value) if display else value)
+            for display, value in zip(displays, row)
+        )
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, datetime):
+        # Spreadsheets have no time zones; write local time
+        return timezone.localtime(value).replace(tzinfo=None) if timezone.is_aware(value) else value
+    return value
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not PHONE_OR_NUMBER.fullmatch(value):
+        # A leading apostrophe keeps typed-in text such as "=HYPERLINK(...)" inert
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """A file-like object whose ``write`` returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(columns, rows):
+    """The CSV lines, header first; the byte order mark makes Excel read it as UTF-8"""
+    writer = csv.writer(_Echo())
+    yield '﻿' + writer.writerow([header for _, header in columns])
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def xlsx_file(columns, rows):
+    """A temporary file holding the workbook, positioned at its start"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Students')
+    header_font = Font(bold=True)
+    header = []
+    for _, title in columns:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = header_font
+        header.append(cell)
+    sheet.append(header)
+    for row in rows:
+        sheet.append([_xlsx_cell(sheet, value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def _xlsx_cell(sheet, value):
+    """openpyxl writes text starting with "=" as a formula; such text is written as a string cell instead"""
+    if isinstance(value, str) and value.startswith('='):
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.data_type = 's'
+        return cell
+    return value
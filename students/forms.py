@@ -1,9 +1,11 @@
 from django import forms
-from django.core.validators import RegexValidator, EmailValidator
+from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from datetime import date, datetime
-import re
 from .models import Student, StudentDocument
+from .validation import (
+    FIELD_VALIDATORS, check_age_at_enrollment, check_date_of_birth, check_date_start, check_year_of_admission,
+)
 
 class StudentForm(forms.ModelForm):
     # Custom validators
@@ -125,139 +127,53 @@ class StudentForm(forms.ModelForm):
                 self.fields[field_name].widget.attrs['placeholder'] = placeholder
 
     def clean_first_name(self):
-        first_name = self.cleaned_data.get('first_name', '').strip()
-        if first_name and len(first_name) < 2:
-            raise ValidationError("First name must be at least 2 characters long")
-        return first_name
+        return self.check_text_field('first_name')
     
     def clean_last_name(self):
-        last_name = self.cleaned_data.get('last_name', '').strip()
-        if last_name and len(last_name) < 2:
-            raise ValidationError("Last name must be at least 2 characters long")
-        return last_name
+        return self.check_text_field('last_name')
 
     def clean_date_of_birth(self):
-        dob = self.cleaned_data.get('date_of_birth')
-        if dob:
-            today = date.today()
-            age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-            
-            if dob >= today:
-                raise ValidationError("Date of birth cannot be in the future")
-            if age < 1:
-                raise ValidationError("Child must be at least 1 year old")
-            if age > 18:
-                raise ValidationError("Child must be under 18 years old")
-        return dob
+        return check_date_of_birth(self.cleaned_data.get('date_of_birth'))
 
     def clean_age_at_enrollment(self):
-        age = self.cleaned_data.get('age_at_enrollment')
-        dob = self.cleaned_data.get('date_of_birth')
-        
-        if age is not None:
-            if age < 1 or age > 18:
-                raise ValidationError("Age must be between 1 and 18")
-            
-            # Cross-validate with date of birth if provided
-            if dob:
-                today = date.today()
-                calculated_age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-                
-                if abs(calculated_age - age) > 1:
-                    raise ValidationError(
-                        f"Age ({age}) doesn't match the date of birth provided (calculated age: {calculated_age})"
-                    )
-        
-        return age
+        # Cross-validated with the date of birth if provided
+        return check_age_at_enrollment(
+            self.cleaned_data.get('age_at_enrollment'), self.cleaned_data.get('date_of_birth')
+        )
 
     def clean_year_of_admission(self):
-        year = self.cleaned_data.get('year_of_admission')
-        if year:
-            current_year = datetime.now().year
-            if year < current_year - 1 or year > current_year + 2:
-                raise ValidationError(
-                    f"Year of admission must be between {current_year - 1} and {current_year + 2}"
-                )
-        return year
+        return check_year_of_admission(self.cleaned_data.get('year_of_admission'))
 
     def clean_father_email(self):
-        email = self.cleaned_data.get('father_email', '').strip()
-        if email:
-            # Additional email validation
-            try:
-                EmailValidator()(email)
-            except ValidationError:
-                raise ValidationError("Please enter a valid email address")
-        return email
+        return self.check_text_field('father_email')
 
     def clean_mother_email(self):
-        email = self.cleaned_data.get('mother_email', '').strip()
-        if email:
-            try:
-                EmailValidator()(email)
-            except ValidationError:
-                raise ValidationError("Please enter a valid email address")
-        return email
+        return self.check_text_field('mother_email')
 
     def clean_email(self):
-        email = self.cleaned_data.get('email', '').strip()
-        if email:
-            try:
-                EmailValidator()(email)
-            except ValidationError:
-                raise ValidationError("Please enter a valid email address")
-        return email
+        return self.check_text_field('email')
 
     def clean_child_emirates_id(self):
-        emirates_id = self.cleaned_data.get('child_emirates_id', '').strip()
-        if emirates_id:
-            # Remove any non-digit characters for validation
-            digits_only = re.sub(r'\D', '', emirates_id)
-            if len(digits_only) != 15:
-                raise ValidationError("Emirates ID must be exactly 15 digits")
-            return emirates_id
-        return emirates_id
-
-    def validate_phone_number(self, phone_number, field_name):
-        """Helper method to validate phone numbers"""
-        if phone_number:
-            # Remove all non-digit characters to count digits
-            digits_only = re.sub(r'\D', '', phone_number)
-            if len(digits_only) < 7:
-                raise ValidationError(f"{field_name} must contain at least 7 digits")
-            if not re.match(r'^[\+]?[\d\s\-\(\)]+$', phone_number):
-                raise ValidationError(f"Please enter a valid {field_name.lower()}")
-        return phone_number
+        return self.check_text_field('child_emirates_id')
+
+    def check_text_field(self, field_name):
+        """Run the stripped value through the field's check in ``FIELD_VALIDATORS``"""
+        return FIELD_VALIDATORS[field_name](self.cleaned_data.get(field_name, '').strip())
 
     def clean_father_mobile(self):
-        return self.validate_phone_number(
-            self.cleaned_data.get('father_mobile', '').strip(), 
-            'Father\'s mobile number'
-        )
+        return self.check_text_field('father_mobile')
 
     def clean_mother_mobile(self):
-        return self.validate_phone_number(
-            self.cleaned_data.get('mother_mobile', '').strip(), 
-            'Mother\'s mobile number'
-        )
+        return self.check_text_field('mother_mobile')
 
     def clean_phone_number(self):
-        return self.validate_phone_number(
-            self.cleaned_data.get('phone_number', '').strip(), 
-            'Phone number'
-        )
+        return self.check_text_field('phone_number')
 
     def clean_first_contact_telephone(self):
-        return self.validate_phone_number(
-            self.cleaned_data.get('first_contact_telephone', '').strip(), 
-            'First contact telephone'
-        )
+        return self.check_text_field('first_contact_telephone')
 
     def clean_second_contact_telephone(self):
-        return self.validate_phone_number(
-            self.cleaned_data.get('second_contact_telephone', '').strip(), 
-            'Second contact telephone'
-        )
+        return self.check_text_field('second_contact_telephone')
 
     def clean_child_photo(self):
         photo = self.cleaned_data.get('child_photo')
@@ -303,15 +219,7 @@ class StudentForm(forms.ModelForm):
         return file
 
     def clean_date_start(self):
-        start_date = self.cleaned_data.get('date_start')
-        if start_date:
-            today = date.today()
-            if start_date < today:
-                # Allow past dates but warn if too far in the past
-                days_diff = (today - start_date).days
-                if days_diff > 365:  # More than a year ago
-                    raise ValidationError("Start date seems too far in the past")
-        return start_date
+        return check_date_start(self.cleaned_data.get('date_start'))
 
     def clean_date_end(self):
         end_date = self.cleaned_data.get('date_end')
@@ -0,0 +1,75 @@
+# management/commands/benchmark_validation.py
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from students import validation
+from students.forms import StudentForm
+from students.views import student_validate_field
+
+# What typing a few admission form fields sends, one request per keystroke
+TYPED_VALUES = [
+    ('first_name', 'Mariam'),
+    ('father_name', "Yousef O'Brien"),
+    ('father_mobile', '+971 50 123 4567'),
+    ('mother_email', 'mother@example.com'),
+    ('child_emirates_id', '784123412345671'),
+    ('date_of_birth', '2021-03-14'),
+    ('year_of_admission', '2026'),
+]
+
+
+def keystrokes():
+    return [(field, value[:length]) for field, value in TYPED_VALUES for length in range(1, len(value) + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Measure admission form field validation requests per second'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help='Times the keystrokes are replayed (default: 20)')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        # An unsaved user passes the login check without touching the database
+        user = get_user_model()(username='benchmark')
+        requests = []
+        for field, value in keystrokes():
+            request = factory.post(
+                '/admissions/students/validate-field/', {'field_name': field, 'field_value': value},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            )
+            request.user = user
+            request._dont_enforce_csrf_checks = True
+            requests.append(request)
+        self.stdout.write(f'{len(requests)} keystrokes x {options["rounds"]} rounds')
+
+        def legacy(request):
+            # What the endpoint did before: a whole form bound to the one field
+            field = request.POST['field_name']
+            form = StudentForm(data={field: request.POST['field_value']})
+            form.is_valid()
+            return form.errors.get(field, [])
+
+        def cold(request):
+            validation._validate.cache_clear()
+            return student_validate_field(request)
+
+        self.report('full StudentForm (before)', requests, options['rounds'], legacy)
+        self.report('endpoint, nothing memoised', requests, options['rounds'], cold)
+        validation._validate.cache_clear()
+        self.report('endpoint, memoised', requests, options['rounds'], student_validate_field)
+
+    def report(self, label, requests, rounds, handle):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for request in requests:
+                handle(request)
+        elapsed = time.perf_counter() - started
+        total = rounds * len(requests)
+        self.stdout.write(
+            f'{label:<28} {total / elapsed:10.0f} requests/s   {elapsed * 1000 / total:8.3f} ms per request'
+        )
@@ -0,0 +1,66 @@
+# management/commands/find_duplicate_students.py
+
+import csv
+
+from django.core.management.base import BaseCommand
+
+from students.duplicates import duplicate_groups, duplicate_key
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'List students that are likely registered twice (similar name and same date of birth)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--active', action='store_true', help='Only compare active students')
+        parser.add_argument('--csv', metavar='FILE', help='Also write the groups to a CSV file')
+        parser.add_argument(
+            '--refresh-keys', action='store_true',
+            help='Recompute every stored duplicate key first (after changing the key rules)',
+        )
+
+    def handle(self, *args, **options):
+        if options['refresh_keys']:
+            self.refresh_keys()
+
+        students = Student.objects.filter(is_active=True) if options['active'] else Student.objects.all()
+        groups = duplicate_groups(students)
+
+        rows = []
+        for number, group in enumerate(groups, 1):
+            first = group[0]
+            self.stdout.write(f'\nGroup {number}: born {first.date_of_birth}, key "{first.duplicate_key}"')
+            for student in group:
+                class_name = student.class_room.class_name if student.class_room_id else '-'
+                self.stdout.write(
+                    f'  {student.student_id:<14} {student.get_full_name():<40} {class_name:<12} '
+                    f'{student.status or "-":<12} created {student.created_at:%Y-%m-%d}'
+                )
+                rows.append([
+                    number, student.student_id, student.first_name, student.last_name, student.date_of_birth,
+                    class_name, student.status, student.is_active, student.created_at.date(),
+                ])
+
+        if options['csv']:
+            with open(options['csv'], 'w', newline='', encoding='utf-8') as output:
+                writer = csv.writer(output)
+                writer.writerow([
+                    'group', 'student_id', 'first_name', 'last_name', 'date_of_birth',
+                    'class', 'status', 'is_active', 'created',
+                ])
+                writer.writerows(rows)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{len(groups)} group(s) of likely duplicates covering {len(rows)} student(s).'
+        ))
+
+    def refresh_keys(self):
+        students = list(Student.objects.only('id', 'first_name', 'last_name', 'duplicate_key'))
+        changed = []
+        for student in students:
+            key = duplicate_key(student.first_name, student.last_name)
+            if key != student.duplicate_key:
+                student.duplicate_key = key
+                changed.append(student)
+        Student.objects.bulk_update(changed, ['duplicate_key'], batch_size=500)
+        self.stdout.write(f'Refreshed {len(changed)} of {len(students)} duplicate keys.')
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+from home.search import create_trigram_index, normalize
+
+
+def fill_search_text(apps, schema_editor):
+    Student = apps.get_model('students', 'Student')
+    students = list(Student.objects.only('id', 'first_name', 'last_name', 'student_id'))
+    for student in students:
+        student.search_text = normalize(student.first_name, student.last_name, student.student_id)
+    Student.objects.bulk_update(students, ['search_text'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0009_alter_student_child_emirates_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='search_text',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        create_trigram_index('students_student', 'search_text', 'student_search_trgm_idx'),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:31
+
+import unicodedata
+
+from django.db import migrations, models
+
+# students.duplicates.duplicate_key as it was when this migration was written,
+# copied so that later changes to the live key do not change this migration
+
+ARABIC_LETTERS = {
+    'ا': 'a', 'أ': 'a', 'إ': 'i', 'آ': 'a', 'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j',
+    'ح': 'h', 'خ': 'kh', 'د': 'd', 'ذ': 'dh', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh',
+    'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh', 'ف': 'f', 'ق': 'q',
+    'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h', 'و': 'w', 'ي': 'y', 'ى': 'a',
+    'ة': 'a', 'ء': '', 'ؤ': '', 'ئ': '',
+}
+LATIN_LETTERS = {'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ł': 'l', 'đ': 'd', 'ı': 'i', 'þ': 'th'}
+PARTICLES = {'al', 'el'}
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def normalize(*values):
+    text = ' '.join(str(value) for value in values if value)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().replace('_', ' ').split())
+
+
+def transliterate(text):
+    words = [f'al {word[2:]}' if word.startswith('ال') and len(word) > 2 else word for word in (text or '').split()]
+    text = normalize(' '.join(words))
+    text = ''.join(ARABIC_LETTERS.get(char, LATIN_LETTERS.get(char, char)) for char in text)
+    return ''.join(char if 'a' <= char <= 'z' else ' ' for char in text)
+
+
+def name_words(*names):
+    words = []
+    for word in transliterate(' '.join(name or '' for name in names)).split():
+        if word in PARTICLES:
+            continue
+        if word.startswith('al') and len(word) >= 6:
+            word = word[2:]
+        words.append(word)
+    return words
+
+
+def soundex(word):
+    code, previous = word[0].upper(), SOUNDEX_CODES.get(word[0])
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def duplicate_key(first_name, last_name):
+    return ' '.join(sorted(soundex(word) for word in name_words(first_name, last_name)))[:100]
+
+
+def fill_duplicate_key(apps, schema_editor):
+    Student = apps.get_model('students', 'Student')
+    students = list(Student.objects.only('id', 'first_name', 'last_name'))
+    for student in students:
+        student.duplicate_key = duplicate_key(student.first_name, student.last_name)
+    Student.objects.bulk_update(students, ['duplicate_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0011_studentauditlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='duplicate_key',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_duplicate_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['duplicate_key', 'date_of_birth'], name='student_duplicate_idx'),
+        ),
+    ]
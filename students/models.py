@@ -6,6 +6,9 @@ from django.urls import reverse
 from PIL import Image
 import os
 from home.models import ClassRooms
+from home.sequences import reserve_ids, highest_suffix
+from home.search import normalize
+from .duplicates import duplicate_key
 
 
 User  = get_user_model()
@@ -39,6 +42,9 @@ class Student(models.Model):
     # Primary Key
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     student_id = models.CharField(max_length=20, unique=True, blank=True)
+    search_text = models.CharField(max_length=255, blank=True, editable=False)
+    # Phonetic name key for spotting duplicates, see students.duplicates
+    duplicate_key = models.CharField(max_length=100, blank=True, editable=False)
     
     # Child Information
     first_name = models.CharField(max_length=100)
@@ -126,6 +132,7 @@ class Student(models.Model):
             models.Index(fields=['student_id']),
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['duplicate_key', 'date_of_birth'], name='student_duplicate_idx'),
         ]
     
     def __str__(self):
@@ -150,24 +157,28 @@ class Student(models.Model):
             self.phone_number = self.father_mobile
         elif not self.phone_number and self.mother_mobile:
             self.phone_number = self.mother_mobile
+
+        self.search_text = normalize(self.first_name, self.last_name, self.student_id)
+        self.duplicate_key = duplicate_key(self.first_name, self.last_name)
             
         super().save(*args, **kwargs)
     
     def generate_student_id(self):
         """Generate unique student ID"""
+        return self.allocate_student_ids(1)[0]
+
+    @classmethod
+    def allocate_student_ids(cls, count):
+        """Reserve a block of consecutive student IDs for the current year (bulk imports)"""
         import datetime
         year = datetime.datetime.now().year
-        last_student = Student.objects.filter(
-            student_id__startswith=f'BS{year}'
-        ).order_by('-student_id').first()
-        
-        if last_student:
-            last_number = int(last_student.student_id[-4:])
-            new_number = last_number + 1
-        else:
-            new_number = 1
-        
-        return f'BS{year}{new_number:04d}'
+        prefix = f'BS{year}'
+
+        numbers = reserve_ids(
+            prefix, count,
+            seed=lambda: highest_suffix(cls.objects.all(), 'student_id', prefix, width=4)
+        )
+        return [f'{prefix}{number:04d}' for number in numbers]
 
 
 class StudentDocument(models.Model):
@@ -280,4 +291,22 @@ class Notification(models.Model):
         if not self.is_sent:
             self.is_sent = True
             self.sent_at = timezone.now()
-            self.save(update_fields=['is_sent', 'sent_at'])
\ No newline at end of file
+            self.save(update_fields=['is_sent', 'sent_at'])
+
+
+class StudentAuditLog(models.Model):
+    """A change applied to many students at once from the student list"""
+    action = models.CharField(max_length=20)
+    # The status or class set by the action, if any
+    value = models.CharField(max_length=100, blank=True)
+    student_ids = models.JSONField(default=list)
+    # Rows changed per model (deletes include the cascaded records)
+    affected = models.JSONField(default=dict)
+    performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.action} ({len(self.student_ids)} students) at {self.created_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from home.models import ClassRooms
+from . import stats, typeahead
+from .models import Student
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_typeahead(sender, **kwargs):
+    typeahead.schedule_invalidate()
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=ClassRooms)
+@receiver(post_delete, sender=ClassRooms)
+def invalidate_stats(sender, **kwargs):
+    stats.schedule_invalidate()
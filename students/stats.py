@@ -0,0 +1,166 @@
+"""
+Aggregate student statistics for the dashboard and the student list.
+
+Every count comes from one grouped query over the students table: counts by
+status, class, gender, nationality, days per week, year of admission and
+admission month, each with its active count, grouped all at once (GROUPING
+SETS on PostgreSQL, the equivalent UNION ALL of GROUP BYs elsewhere). The
+result is kept in the shared cache (settings.CACHES), under a generation
+counter that the student signals bump once a write commits, so every worker
+process sees the bump; writes that skip the signals (bulk_create, update) call
+``invalidate``.
+"""
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from home.models import ClassRooms
+from .models import Student
+
+GENERATION_KEY = 'student_stats:generation'
+# Recomputed at least daily, in case an invalidation was lost
+STATS_TIMEOUT = 24 * 60 * 60
+# Admission months shown, the current one included
+ADMISSION_MONTHS = 12
+
+DIMENSIONS = ('status', 'class_room_id', 'gender', 'nationality', 'days_per_week', 'year_of_admission', 'month')
+GROUPS = {
+    'status': 'by_status',
+    'class_room_id': 'by_class',
+    'gender': 'by_gender',
+    'nationality': 'by_nationality',
+    'days_per_week': 'by_days_per_week',
+    'year_of_admission': 'by_year',
+}
+
+
+def _key(generation, today):
+    # Keyed by month as well: "this month" moves on even when no student changes
+    return f'student_stats:{generation}:{today:%Y-%m}'
+
+
+def invalidate():
+    generation = cache.get_or_set(GENERATION_KEY, 1, None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, generation + 1, None)
+    # The database cache only culls expired rows once it is full
+    cache.delete(_key(generation, timezone.localdate()))
+
+
+def schedule_invalidate():
+    """Invalidate once the current transaction commits, so no reader caches the old counts again"""
+    transaction.on_commit(invalidate)
+
+
+def student_stats():
+    """The cached statistics payload (JSON-serialisable)"""
+    today = timezone.localdate()
+    key = _key(cache.get_or_set(GENERATION_KEY, 1, None), today)
+    stats = cache.get(key)
+    if stats is None:
+        stats = _compute_student_stats(today)
+        cache.set(key, stats, STATS_TIMEOUT)
+    return stats
+
+
+def _month_key(value):
+    # SQLite returns the truncated timestamp as text, PostgreSQL as an aware datetime
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:7]
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return f'{value:%Y-%m}'
+
+
+def _previous_month(day):
+    return date(day.year - 1, 12, 1) if day.month == 1 else date(day.year, day.month - 1, 1)
+
+
+def _compute_student_stats(today):
+    source = Student.objects.order_by().annotate(month=TruncMonth('created_at')).values(*DIMENSIONS, 'is_active')
+    inner_sql, params = source.query.sql_with_params()
+    measures = 'COUNT(*), SUM(CASE WHEN is_active THEN 1 ELSE 0 END)'
+    columns = ', '.join(DIMENSIONS)
+
+    if connection.vendor == 'postgresql':
+        grouping = ' '.join(f"WHEN GROUPING({name}) = 0 THEN '{name}'" for name in DIMENSIONS)
+        sets = ', '.join(f'({name})' for name in DIMENSIONS)
+        sql = (
+            f'WITH source AS ({inner_sql}) '
+            f"SELECT CASE {grouping} ELSE 'total' END, {columns}, {measures} FROM source "
+            f'GROUP BY GROUPING SETS ((), {sets})'
+        )
+    else:
+        selects = [f"SELECT 'total', {', '.join('NULL' for _ in DIMENSIONS)}, {measures} FROM source"]
+        for name in DIMENSIONS:
+            values = ', '.join(column if column == name else 'NULL' for column in DIMENSIONS)
+            selects.append(f"SELECT '{name}', {values}, {measures} FROM source GROUP BY {name}")
+        sql = f'WITH source AS ({inner_sql}) ' + ' UNION ALL '.join(selects)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    labels = {
+        'status': dict(Student.STATUS_CHOICES),
+        'gender': dict(Student.GENDER_CHOICES),
+        'days_per_week': dict(Student.DAYS_CHOICES),
+        'class_room_id': dict(ClassRooms.objects.values_list('id', 'class_name')),
+    }
+    stats = {'total': 0, 'active': 0, **{group: [] for group in GROUPS.values()}}
+    months = {}
+    for grouping, *values, count, active in rows:
+        active = int(active or 0)
+        if grouping == 'total':
+            stats.update(total=count, active=active)
+        elif grouping == 'month':
+            months[_month_key(values[DIMENSIONS.index('month')])] = (count, active)
+        else:
+            value = values[DIMENSIONS.index(grouping)]
+            if grouping == 'class_room_id':
+                label = labels['class_room_id'].pop(value, 'Unassigned')
+            else:
+                label = labels.get(grouping, {}).get(value, value)
+            stats[GROUPS[grouping]].append({
+                'value': value, 'label': '' if label is None else str(label), 'count': count, 'active': active,
+            })
+
+    # Classes nobody is in yet are still listed
+    stats['by_class'] += [
+        {'value': pk, 'label': name, 'count': 0, 'active': 0} for pk, name in labels['class_room_id'].items()
+    ]
+    stats['by_class'].sort(key=lambda row: (row['value'] is None, row['label']))
+    stats['by_year'].sort(key=lambda row: row['value'], reverse=True)
+    for group in ('by_status', 'by_gender', 'by_nationality', 'by_days_per_week'):
+        stats[group].sort(key=lambda row: (-row['count'], row['label']))
+
+    # Month-over-month admissions, oldest first, months without admissions included
+    month = today.replace(day=1)
+    timeline = [month]
+    for _ in range(ADMISSION_MONTHS):
+        timeline.insert(0, _previous_month(timeline[0]))
+    admissions, previous = [], None
+    for month in timeline:
+        count, active = months.get(f'{month:%Y-%m}', (0, 0))
+        if previous is not None:
+            admissions.append({
+                'month': f'{month:%Y-%m}',
+                'label': f'{month:%b %Y}',
+                'count': count,
+                'active': active,
+                'change': count - previous,
+                'change_percent': round((count - previous) * 100 / previous, 1) if previous else None,
+            })
+        previous = count
+    stats['admissions_by_month'] = admissions
+    stats['this_month'] = admissions[-1]['count']
+    stats['this_month_active'] = admissions[-1]['active']
+    stats['generated_at'] = timezone.now().isoformat()
+    return stats
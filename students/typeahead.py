@@ -0,0 +1,175 @@
+"""
+Typeahead search for picking a student (payment and payment plan screens).
+
+Every student contributes a few index terms: the normalised words of the
+child's and parents' names and the student ID, and the digits of the parent
+phone numbers (every tail of at least six digits as well, so a number typed
+without country code or trunk zero still matches). The students' entries are
+kept in the cache and each process searches them as one sorted list of terms:
+a query word matches every term it is a prefix of, found by binary search, so
+answering never touches the database.
+
+Saving or deleting students bumps a generation counter once the transaction
+commits; a rolled back transaction never does. The index is cached under its
+generation and built from the database by the first lookup that finds none,
+so a cached index is never modified afterwards and concurrent writers cannot
+overwrite each other's changes. Each process keeps the decoded index in
+memory until the generation moves, so a lookup costs one cache read plus the
+in-memory search. Writes that skip the model signals (bulk_create, update)
+call ``invalidate`` themselves.
+"""
+import bisect
+import heapq
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+
+from home.search import normalize
+
+INDEX_KEY = 'student_typeahead:index'
+GENERATION_KEY = 'student_typeahead:generation'
+# Rebuilt from the database at least daily, in case an update was lost
+INDEX_TIMEOUT = 24 * 60 * 60
+# Shortest tail of a phone number that is indexed on its own
+MIN_PHONE_DIGITS = 6
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+
+NAME_FIELDS = ('first_name', 'last_name', 'family_name', 'student_id', 'father_name', 'mother_name')
+PHONE_FIELDS = ('father_mobile', 'mother_mobile', 'phone_number', 'first_contact_telephone')
+INDEX_FIELDS = NAME_FIELDS + PHONE_FIELDS + ('id', 'is_active', 'class_room__class_name')
+
+# (generation, sorted (term, pk) pairs, entries by pk) of this process, replaced as a whole
+_local = (None, [], {})
+
+
+def _terms(student):
+    terms = set(normalize(*(getattr(student, field) for field in NAME_FIELDS)).split())
+    for field in PHONE_FIELDS:
+        digits = re.sub(r'\D', '', getattr(student, field) or '')
+        if len(digits) >= MIN_PHONE_DIGITS:
+            terms.update(digits[start:] for start in range(len(digits) - MIN_PHONE_DIGITS + 1))
+    return terms
+
+
+def _entry(student):
+    """The cached record of a student: its index terms and what a result shows"""
+    return {
+        'terms': sorted(_terms(student)),
+        'id': str(student.pk),
+        'student_id': student.student_id,
+        'name': student.get_full_name(),
+        'father_name': student.father_name,
+        'mother_name': student.mother_name,
+        'class_room': student.class_room.class_name if student.class_room_id else '',
+        'is_active': student.is_active,
+        # Ranking keys, not part of a result
+        '_student_id': normalize(student.student_id),
+        '_name': normalize(student.get_full_name()),
+    }
+
+
+def _build():
+    from .models import Student
+
+    students = Student.objects.select_related('class_room').only(*INDEX_FIELDS)
+    return {str(student.pk): _entry(student) for student in students.iterator(chunk_size=2000)}
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def _entries(generation):
+    key = f'{INDEX_KEY}:{generation}'
+    entries = cache.get(key)
+    if entries is None:
+        entries = _build()
+        cache.set(key, entries, INDEX_TIMEOUT)
+    return entries
+
+
+def _load():
+    """The in-memory index of this process, reloaded when another process changed it"""
+    global _local
+    generation = _generation()
+    if _local[0] != generation:
+        students = _entries(generation)
+        terms = sorted((term, pk) for pk, entry in students.items() for term in entry['terms'])
+        _local = (generation, terms, students)
+    return _local
+
+
+def schedule_invalidate():
+    """Invalidate once the current transaction commits (post_save, post_delete)"""
+    transaction.on_commit(invalidate)
+
+
+def invalidate():
+    """Rebuild the index from the database on the next lookup"""
+    generation = _generation()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, generation + 1, None)
+    # Nothing reads the superseded index any more
+    cache.delete(f'{INDEX_KEY}:{generation}')
+
+
+def _matching(terms, word):
+    """Student pks with a term starting with ``word``"""
+    matches = set()
+    position = bisect.bisect_left(terms, (word,))
+    while position < len(terms) and terms[position][0].startswith(word):
+        matches.add(terms[position][1])
+        position += 1
+    return matches
+
+
+def _query_words(query):
+    """Normalised query words; a phone number typed in groups becomes one word of its digits"""
+    words = []
+    for word in normalize(query).split():
+        if re.fullmatch(r'[\d+()\-]+', word):
+            digits = re.sub(r'\D', '', word)
+            if words and words[-1].isdigit():
+                digits = words.pop() + digits
+            words.append(digits)
+        else:
+            words.append(word)
+    # A leading trunk zero is not part of the stored international number
+    return [word.lstrip('0') if word.isdigit() and len(word) >= MIN_PHONE_DIGITS else word for word in words if word]
+
+
+def lookup(query, limit=DEFAULT_LIMIT, active_only=False):
+    """
+    The best ``limit`` students for a typeahead query: every word must prefix
+    one of their terms. Exact student ID matches come first, then students
+    whose own name starts with the query, then by name.
+    """
+    words = _query_words(query)
+    if not words:
+        return []
+    _, terms, entries = _load()
+
+    candidates = None
+    for word in sorted(words, key=len, reverse=True):
+        matches = _matching(terms, word)
+        candidates = matches if candidates is None else candidates & matches
+        if not candidates:
+            return []
+
+    term = ' '.join(words)
+    students = [entries[pk] for pk in candidates or ()]
+    if active_only:
+        students = [student for student in students if student['is_active']]
+    best = heapq.nsmallest(min(max(limit, 1), MAX_LIMIT), students, key=lambda student: (
+        student['_student_id'] != term,
+        not student['_name'].startswith(term),
+        student['_name'],
+    ))
+    return [
+        {key: value for key, value in student.items() if key != 'terms' and not key.startswith('_')}
+        for student in best
+    ]
@@ -7,6 +7,7 @@ from . import views
 urlpatterns = [
     # Main student views
     path('students/', views.student_list, name='students'),
+    path('students/data/', views.student_list_data, name='student_list_data'),
 
     path('create/', views.student_create, name='student_create'),
     path('student_detail/<uuid:pk>/', views.student_detail, name='student_detail'),
@@ -38,6 +39,7 @@ urlpatterns = [
 
     # AJAX validation endpoint
     path('students/validate-field/', views.student_validate_field, name='student_validate_field'),
+    path('students/check-duplicate/', views.student_check_duplicate, name='student_check_duplicate'),
 
     # Notification URLs
     path('notifications/', views.notification_list, name='notification_list'),
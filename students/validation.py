@@ -0,0 +1,162 @@
+"""
+Standalone validators of single admission form fields.
+
+The as-you-type check of the admission form (``student_validate_field``)
+looks a field up in ``FIELD_VALIDATORS`` and runs only its own form field
+parsing and checks, never a whole ``StudentForm``. That way it runs no other
+field's ``clean_*`` method, no cross-field ``clean()`` and no database query.
+Results are memoised per field and value, so a value that comes back (an
+undo, the same phone number typed again) is answered from memory. The form's
+own ``clean_*`` methods call the same checks, so a value accepted while
+typing is accepted when the form is submitted.
+"""
+import re
+from datetime import date
+from functools import lru_cache, partial
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.validators import EmailValidator
+
+PHONE_PATTERN = re.compile(r'^[\+]?[\d\s\-\(\)]+$')
+MIN_PHONE_DIGITS = 7
+MEMO_SIZE = 4096
+
+_email_validator = EmailValidator()
+
+
+def _age(birth_date, today):
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+def check_name(value, label):
+    if value and len(value) < 2:
+        raise ValidationError(f"{label} must be at least 2 characters long")
+    return value
+
+
+def check_phone(value, label):
+    if value:
+        if len(re.sub(r'\D', '', value)) < MIN_PHONE_DIGITS:
+            raise ValidationError(f"{label} must contain at least {MIN_PHONE_DIGITS} digits")
+        if not PHONE_PATTERN.match(value):
+            raise ValidationError(f"Please enter a valid {label.lower()}")
+    return value
+
+
+def check_email(value):
+    if value:
+        try:
+            _email_validator(value)
+        except ValidationError:
+            raise ValidationError("Please enter a valid email address")
+    return value
+
+
+def check_emirates_id(value):
+    if value and len(re.sub(r'\D', '', value)) != 15:
+        raise ValidationError("Emirates ID must be exactly 15 digits")
+    return value
+
+
+def check_date_of_birth(value, today=None):
+    if value:
+        today = today or date.today()
+        if value >= today:
+            raise ValidationError("Date of birth cannot be in the future")
+        age = _age(value, today)
+        if age < 1:
+            raise ValidationError("Child must be at least 1 year old")
+        if age > 18:
+            raise ValidationError("Child must be under 18 years old")
+    return value
+
+
+def check_age_at_enrollment(value, date_of_birth=None, today=None):
+    if value is not None:
+        if value < 1 or value > 18:
+            raise ValidationError("Age must be between 1 and 18")
+        if date_of_birth:
+            calculated_age = _age(date_of_birth, today or date.today())
+            if abs(calculated_age - value) > 1:
+                raise ValidationError(
+                    f"Age ({value}) doesn't match the date of birth provided (calculated age: {calculated_age})"
+                )
+    return value
+
+
+def check_year_of_admission(value, today=None):
+    if value:
+        current_year = (today or date.today()).year
+        if value < current_year - 1 or value > current_year + 2:
+            raise ValidationError(f"Year of admission must be between {current_year - 1} and {current_year + 2}")
+    return value
+
+
+def check_date_start(value, today=None):
+    today = today or date.today()
+    # Past dates are allowed, but not by more than a year
+    if value and value < today and (today - value).days > 365:
+        raise ValidationError("Start date seems too far in the past")
+    return value
+
+
+# Field -> check of its parsed value. Checks that compare dates take ``today``
+FIELD_VALIDATORS = {
+    'first_name': partial(check_name, label="First name"),
+    'last_name': partial(check_name, label="Last name"),
+    'email': check_email,
+    'father_email': check_email,
+    'mother_email': check_email,
+    'father_mobile': partial(check_phone, label="Father's mobile number"),
+    'mother_mobile': partial(check_phone, label="Mother's mobile number"),
+    'phone_number': partial(check_phone, label="Phone number"),
+    'first_contact_telephone': partial(check_phone, label="First contact telephone"),
+    'second_contact_telephone': partial(check_phone, label="Second contact telephone"),
+    'child_emirates_id': check_emirates_id,
+    'date_of_birth': check_date_of_birth,
+    'age_at_enrollment': check_age_at_enrollment,
+    'year_of_admission': check_year_of_admission,
+    'date_start': check_date_start,
+}
+DATED_FIELDS = {'date_of_birth', 'age_at_enrollment', 'year_of_admission', 'date_start'}
+
+
+def is_validated_field(field_name):
+    """
+    Fields of the admission form the endpoint can check on their own; the
+    class (a database lookup) and the photos are only checked on submit.
+    """
+    field = _form_fields().get(field_name)
+    return field is not None and not isinstance(field, (forms.ModelChoiceField, forms.FileField))
+
+
+def validate_field(field_name, value, today=None):
+    """
+    The error messages of ``value`` typed into ``field_name`` (an empty list
+    when it is valid). Fields without a registered check are only parsed
+    and run through their field validators.
+    """
+    return list(_validate(field_name, '' if value is None else str(value), today or date.today()))
+
+
+@lru_cache(maxsize=None)
+def _form_fields():
+    """The fields of one unbound form, with the pattern validators ``StudentForm`` adds to them"""
+    from .forms import StudentForm
+
+    return StudentForm().fields
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _validate(field_name, value, today):
+    # ``today`` is part of the key so results of date checks expire at midnight
+    field = _form_fields()[field_name]
+    try:
+        cleaned = field.clean(value)
+        check = FIELD_VALIDATORS.get(field_name)
+        if check:
+            check(cleaned, today=today) if field_name in DATED_FIELDS else check(cleaned)
+    except ValidationError as e:
+        return tuple(e.messages)
+    return ()
@@ -4,10 +4,11 @@ from django.contrib import messages
 from .forms import * 
 from .models import * 
 from home.decorators import unauthenticated_user
-from payments.models import PaymentPlan, Payment, PaymentInstallment, PaymentItem, PaymentReminder
+from payments.models import PaymentPlan, Payment, PaymentInstallment, PaymentItem, PaymentReminder, StudentAccountSummary
 
 
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_http_methods
@@ -17,7 +18,16 @@ from django.db import transaction
 from datetime import datetime
 import logging
 import json
+import uuid
 from django.db.models import Sum, Q, F
+from django.db.models.functions import Coalesce
+from decimal import Decimal
+from home.models import ClassRooms
+from home.pagination import Keyset
+from home.search import search
+from . import bulk, exports, typeahead, validation
+from .duplicates import duplicate_candidates
+from .stats import student_stats
 
 
 # Set up logging
@@ -26,14 +36,114 @@ logger = logging.getLogger(__name__)
 
 @unauthenticated_user
 def student_list(request):
-    students = Student.objects.all()
-
+    """The list shell; rows are fetched page by page from ``student_list_data``"""
     context = {
-        "students":students
+        "status_choices": Student.STATUS_CHOICES,
+        "class_rooms": ClassRooms.objects.order_by('class_name'),
+        "stats": student_stats(),
+        "export_column_sets": exports.COLUMN_SET_CHOICES,
+        "bulk_actions": bulk.BULK_ACTIONS,
+        "balance": request.GET.get('balance'),
+        "sort": request.GET.get('sort'),
     }
     return render(request,'students/all-students.html',context)
 
 
+# The columns of the student list; Student rows have sixty-odd columns, only these are read
+STUDENT_LIST_FIELDS = (
+    'id', 'student_id', 'first_name', 'last_name', 'nationality', 'email', 'phone_number',
+    'status', 'is_active', 'year_of_admission', 'created_at', 'class_room__class_name',
+)
+# Sort key -> keyset ordering (ending with the unique id); the balance sorts use annotations
+STUDENT_LIST_SORTS = {
+    'created': ('-created_at', '-id'),
+    'name': ('first_name', 'last_name', 'id'),
+    'student_id': ('student_id', 'id'),
+    'year': ('-year_of_admission', 'id'),
+    'balance': ('-balance_due', 'id'),
+    'overdue': ('-overdue_due', 'id'),
+}
+STUDENT_LIST_PAGE_SIZE = 50
+
+
+def filter_student_list(params):
+    """The students matching the list filters: status, class, year, balance and search"""
+    students = Student.objects.select_related('class_room').only(*STUDENT_LIST_FIELDS)
+
+    status = params.get('status')
+    if status:
+        students = students.filter(status=status)
+    class_room = params.get('class')
+    if class_room:
+        students = students.filter(class_room_id=class_room) if class_room.isdigit() else students.none()
+    year = params.get('year')
+    if year:
+        students = students.filter(year_of_admission=year) if year.isdigit() else students.none()
+
+    # Balance filters and sorting read the indexed account summary columns
+    balance = params.get('balance')
+    if balance == 'outstanding':
+        students = students.filter(account_summary__outstanding__gt=0)
+    elif balance == 'overdue':
+        students = students.filter(account_summary__overdue_count__gt=0)
+
+    if params.get('q'):
+        students = search(students, params['q'])
+    return students
+
+
+def sort_student_list(students, sort):
+    """``students`` with what the ``sort`` key needs annotated, and its ordering"""
+    sort = sort if sort in STUDENT_LIST_SORTS else 'created'
+    if sort == 'balance':
+        students = students.annotate(balance_due=Coalesce('account_summary__outstanding', Decimal('0')))
+    elif sort == 'overdue':
+        students = students.annotate(overdue_due=Coalesce('account_summary__overdue_amount', Decimal('0')))
+    return students, STUDENT_LIST_SORTS[sort]
+
+
+def _student_row(student):
+    return {
+        'id': str(student.pk),
+        'student_id': student.student_id,
+        'name': student.get_full_name(),
+        'initials': f"{student.first_name[:1]}{student.last_name[:1]}",
+        'nationality': student.nationality,
+        'email': student.email,
+        'phone': student.phone_number,
+        'status': student.status,
+        'status_display': student.get_status_display() if student.status else '',
+        'is_active': student.is_active,
+        'year': student.year_of_admission,
+        'class_room': student.class_room.class_name if student.class_room else '',
+        'created': student.created_at.strftime('%b %d, %Y'),
+        'detail_url': reverse('student_detail', args=[student.pk]),
+        'update_url': reverse('student_update', args=[student.pk]),
+        'toggle_url': reverse('disable_student' if student.is_active else 'enable_student', args=[student.pk]),
+    }
+
+
+@unauthenticated_user
+def student_list_data(request):
+    """
+    JSON pages of the student list. Filters as in ``filter_student_list``,
+    ``sort`` one of ``STUDENT_LIST_SORTS`` and ``after`` the cursor returned
+    as ``next`` by the previous page.
+    """
+    students, ordering = sort_student_list(filter_student_list(request.GET), request.GET.get('sort'))
+
+    try:
+        page_size = min(max(int(request.GET.get('length', STUDENT_LIST_PAGE_SIZE)), 1), 200)
+    except ValueError:
+        page_size = STUDENT_LIST_PAGE_SIZE
+
+    rows, next_cursor, _ = Keyset(ordering).page(students, request.GET.get('after'), page_size)
+    return JsonResponse({
+        'results': [_student_row(student) for student in rows],
+        'next': next_cursor,
+    })
+
+
 
 @unauthenticated_user
 @csrf_protect
@@ -201,16 +311,12 @@ def student_validate_field(request):
         if not field_name:
             return JsonResponse({'error': 'Field name is required'}, status=400)
         
+        if not validation.is_validated_field(field_name):
+            return JsonResponse({'error': 'This field cannot be validated on its own'}, status=400)
+
         try:
-            # Create a temporary form instance with just this field for validation
-            form_data = {field_name: field_value}
-            form = StudentForm(data=form_data)
-            
-            # Validate the entire form to trigger clean methods
-            form.is_valid()
-            
-            # Get errors for the specific field
-            field_errors = form.errors.get(field_name, [])
+            # Only this field's own checks run, see ``students.validation``
+            field_errors = validation.validate_field(field_name, field_value)
             
             response_data = {
                 'valid': len(field_errors) == 0,
@@ -276,18 +382,17 @@ def validate_student_data(cleaned_data):
     if first_contact_person and not first_contact_telephone:
         errors['first_contact_telephone'] = ['Phone number is required when emergency contact person is provided.']
     
-    # Check for duplicate students (same name + DOB)
+    # Check for duplicate students (same or similar name + DOB)
     if cleaned_data.get('first_name') and cleaned_data.get('last_name') and cleaned_data.get('date_of_birth'):
-        existing_student = Student.objects.filter(
-            first_name__iexact=cleaned_data['first_name'],
-            last_name__iexact=cleaned_data['last_name'],
-            date_of_birth=cleaned_data['date_of_birth']
-        ).first()
+        candidates = duplicate_candidates(
+            cleaned_data['first_name'], cleaned_data['last_name'], cleaned_data['date_of_birth'], limit=1
+        )
         
-        if existing_student:
+        if candidates:
+            existing_student = candidates[0]
             errors['__all__'] = [
-                f'A student with the same name and date of birth already exists (ID: {existing_student.student_id}). '
-                'Please verify the details or contact administration.'
+                f'A student with a similar name and date of birth already exists (ID: {existing_student.student_id}, '
+                f'{existing_student.match}). Please verify the details or contact administration.'
             ]
     
     return errors
@@ -303,24 +408,37 @@ def student_check_duplicate(request):
         last_name = request.POST.get('last_name', '').strip()
         date_of_birth = request.POST.get('date_of_birth')
         
+        # The student being edited, left out of the candidates
+        exclude = request.POST.get('exclude') or None
+        if exclude is not None:
+            try:
+                exclude = uuid.UUID(exclude)
+            except ValueError:
+                return JsonResponse({'error': 'Invalid student to exclude'}, status=400)
+        
         if first_name and last_name and date_of_birth:
             try:
                 # Parse date
                 dob = datetime.strptime(date_of_birth, '%Y-%m-%d').date()
                 
-                # Check for existing student
-                existing_student = Student.objects.filter(
-                    first_name__iexact=first_name,
-                    last_name__iexact=last_name,
-                    date_of_birth=dob
-                ).first()
+                # Same or similar name (spelling, name order) with the same date of birth
+                candidates = duplicate_candidates(first_name, last_name, dob, exclude=exclude)
                 
-                if existing_student:
+                if candidates:
+                    existing_student = candidates[0]
                     return JsonResponse({
                         'duplicate_found': True,
                         'message': f'A student with similar details already exists (ID: {existing_student.student_id})',
                         'student_id': existing_student.student_id,
-                        'student_name': existing_student.get_full_name()
+                        'student_name': existing_student.get_full_name(),
+                        'candidates': [{
+                            'student_id': student.student_id,
+                            'student_name': student.get_full_name(),
+                            'date_of_birth': student.date_of_birth.isoformat(),
+                            'class_room': student.class_room.class_name if student.class_room_id else '',
+                            'match': student.match,
+                            'detail_url': reverse('student_detail', args=[student.pk]),
+                        } for student in candidates],
                     })
                 else:
                     return JsonResponse({
@@ -496,20 +614,17 @@ def student_detail(request, pk):
         status__in=['pending', 'overdue', 'partially_paid']
     ).order_by('due_date')
     
-    # Calculate totals
-    total_paid = payments.filter(payment_status='completed').aggregate(
-        Sum('net_amount')
-    )['net_amount__sum'] or 0
-    
-    total_outstanding = sum(inst.get_outstanding_amount() for inst in outstanding_installments)
+    # Totals are kept current in the account summary
+    summary = StudentAccountSummary.for_student(student)
 
     context = {
         'student': student,
         'payment_plans': payment_plans,
         'payments': payments,
         'outstanding_installments': outstanding_installments,
-        'total_paid': total_paid,
-        'total_outstanding': total_outstanding,
+        'total_paid': summary.total_paid,
+        'total_outstanding': summary.outstanding,
+        'account_summary': summary,
         "document_form":document_form,
         "form":form
     }
@@ -588,26 +703,68 @@ def delete_document(request, pk):
     
 
 @unauthenticated_user
+@require_http_methods(["POST"])
 def bulk_action(request):
-    # Implement bulk action logic here
-    messages.success(request, "Bulk action completed.")
-    return redirect('student_list')
+    """Apply one of ``bulk.BULK_ACTIONS`` to the students ticked in the list"""
+    action = request.POST.get('action')
+    try:
+        entry = bulk.apply_bulk_action(
+            action, request.POST.getlist('student_ids'), request.POST.get('value', ''), request.user
+        )
+    except bulk.BulkActionError as e:
+        messages.error(request, str(e))
+        return redirect('students')
+
+    selected = len(entry.student_ids)
+    changed = entry.affected[Student._meta.label]
+    if action == 'delete':
+        messages.success(request, f"Deleted {changed} of {selected} selected student(s).")
+    else:
+        messages.success(request, f"{dict(bulk.BULK_ACTIONS)[action]}: {changed} of {selected} selected student(s) updated.")
+    return redirect('students')
 
 @unauthenticated_user
 def export_students(request):
-    # Implement export logic here
-    messages.success(request, "Students exported.")
-    return redirect('student_list')
+    """
+    The filtered student list (filters and ``sort`` as in ``student_list_data``)
+    as ``format`` csv or xlsx, with the ``columns`` sets of ``exports.COLUMN_SETS``.
+    """
+    students, ordering = sort_student_list(filter_student_list(request.GET), request.GET.get('sort'))
+    columns = exports.export_columns(request.GET.getlist('columns'))
+    rows = exports.export_rows(students.order_by(*ordering), columns)
+    filename = f"students_{timezone.localdate():%Y-%m-%d}"
+
+    if request.GET.get('format') == 'xlsx':
+        return FileResponse(
+            exports.xlsx_file(columns, rows), as_attachment=True, filename=f'{filename}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    response = StreamingHttpResponse(exports.csv_stream(columns, rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
 
 @unauthenticated_user
 def search_students_ajax(request):
-    # Implement AJAX search logic here
-    return render(request, 'students/search_results.html')
+    """
+    Typeahead matches for ``q`` (name, student ID, parent name or phone) from
+    the cached index. ``limit`` caps the results, ``active=1`` leaves out
+    disabled students. The query is echoed back so the caller can drop
+    answers that arrive after a newer keystroke's.
+    """
+    query = request.GET.get('q', '')
+    try:
+        limit = int(request.GET.get('limit', typeahead.DEFAULT_LIMIT))
+    except ValueError:
+        limit = typeahead.DEFAULT_LIMIT
+    return JsonResponse({
+        'query': query,
+        'results': typeahead.lookup(query, limit, active_only=request.GET.get('active') == '1'),
+    })
 
 @unauthenticated_user
 def student_stats_ajax(request):
-    # Implement AJAX stats logic here
-    return render(request, 'students/student_stats.html')
+    """Counts by status, class, gender, nationality, days per week, admission year and month"""
+    return JsonResponse(student_stats())
 
 
 # notes add update 
@@ -680,7 +837,6 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.utils import timezone
 from .models import Notification
 from django.views.decorators.csrf import csrf_exempt
 
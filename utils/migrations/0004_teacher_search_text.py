@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+from home.search import create_trigram_index, normalize
+
+
+def fill_search_text(apps, schema_editor):
+    Teacher = apps.get_model('utils', 'Teacher')
+    teachers = list(Teacher.objects.only('id', 'first_name', 'last_name', 'teacher_id', 'email', 'position'))
+    for teacher in teachers:
+        teacher.search_text = normalize(
+            teacher.first_name, teacher.last_name, teacher.teacher_id, teacher.email, teacher.position
+        )
+    Teacher.objects.bulk_update(teachers, ['search_text'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utils', '0003_monthlysalary_sick_leave_alter_attendance_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacher',
+            name='search_text',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        create_trigram_index('utils_teacher', 'search_text', 'teacher_search_trgm_idx'),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from home.sequences import reserve_ids, highest_suffix
+from home.search import normalize
 
 class Teacher(models.Model):
     """Model for managing teachers and staff members"""
@@ -35,6 +37,7 @@ class Teacher(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     full_name = models.CharField(max_length=200, blank=True)
+    search_text = models.CharField(max_length=255, blank=True, editable=False)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
     date_of_birth = models.DateField(null=True, blank=True)
     nationality = models.CharField(max_length=100)
@@ -121,19 +124,11 @@ class Teacher(models.Model):
     def save(self, *args, **kwargs):
         # Generate teacher ID
         if not self.teacher_id:
-            last_teacher = Teacher.objects.order_by('-id').first()
-            if last_teacher and last_teacher.teacher_id:
-                try:
-                    last_num = int(last_teacher.teacher_id.split('-')[1])
-                    new_num = last_num + 1
-                except (IndexError, ValueError):
-                    new_num = 1
-            else:
-                new_num = 1
-            self.teacher_id = f'TCH-{new_num:05d}'
+            self.teacher_id = self.allocate_teacher_ids(1)[0]
         
         # Calculate full name
         self.full_name = f"{self.first_name} {self.last_name}"
+        self.search_text = normalize(self.first_name, self.last_name, self.teacher_id, self.email, self.position)
         
         # Calculate total salary
         self.total_salary = self.basic_salary + self.accommodation_allowance + self.transportation_allowance
@@ -150,6 +145,15 @@ class Teacher(models.Model):
         
         super().save(*args, **kwargs)
     
+    @classmethod
+    def allocate_teacher_ids(cls, count):
+        """Reserve a block of consecutive teacher IDs (bulk imports)"""
+        numbers = reserve_ids(
+            'TCH-', count,
+            seed=lambda: highest_suffix(cls.objects.all(), 'teacher_id', 'TCH-')
+        )
+        return [f'TCH-{number:05d}' for number in numbers]
+
     def __str__(self):
         return f"{self.full_name} ({self.teacher_id}) - {self.get_position_display()}"
     
@@ -10,6 +10,7 @@ from .models import Teacher
 from .forms import TeacherForm
 from Finance.models import Expense
 from home.decorators import unauthenticated_user
+from home.search import ranked_search
 
 
 
@@ -23,13 +24,7 @@ def teacher_list(request):
     # Search functionality
     search_query = request.GET.get('search', '')
     if search_query:
-        teachers = teachers.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(teacher_id__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(position__icontains=search_query)
-        )
+        teachers = ranked_search(teachers, search_query)
     
     context = {
         'teachers': teachers,